@@ -0,0 +1,51 @@
+"""
+Single-pass aggregate counts.
+
+The statistics endpoints used to issue one ``COUNT(*)`` query per figure (and
+minimal_app's ``/api/stats`` loaded every participant row to count them in
+Python), on every dashboard refresh.  ``AggregateQuery`` computes all the
+named counts of a table in a single ``SELECT`` using ``COUNT(*) FILTER
+(WHERE ...)`` aggregates, falling back to ``SUM(CASE ...)`` where the
+database has no ``FILTER`` clause.  The dashboards now read maintained
+counters (``dashboard_counters``), which use it for their full recount.
+"""
+
+import sqlalchemy as sa
+
+
+def supports_filter_clause(dialect):
+    """Whether aggregate ``FILTER (WHERE ...)`` is available"""
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 30)
+    return False
+
+
+class AggregateQuery:
+    """Named counts over one table, each with its own condition.
+
+    A condition is a SQL expression, a callable returning one (for values
+    such as "today" that must be evaluated per snapshot), or ``None`` to
+    count every row.
+    """
+
+    def __init__(self, model, counts):
+        self.model = model
+        self.counts = dict(counts)
+
+    def statement(self, dialect):
+        use_filter = supports_filter_clause(dialect)
+        columns = []
+        for name, condition in self.counts.items():
+            if callable(condition):
+                condition = condition()
+            if condition is None:
+                column = sa.func.count()
+            elif use_filter:
+                column = sa.func.count().filter(condition)
+            else:
+                column = sa.func.coalesce(sa.func.sum(sa.case((condition, 1), else_=0)), 0)
+            columns.append(column.label(name))
+        return sa.select(*columns).select_from(self.model.__table__)
+
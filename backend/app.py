@@ -1,16 +1,11 @@
-from flask import Flask, request, jsonify, send_file, render_template_string, send_from_directory, after_this_request
+from flask import Flask, request, jsonify, send_file, render_template_string, send_from_directory
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 import sqlalchemy as sa
 from datetime import datetime, timedelta
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import logging
 import pdfkit
-from jinja2 import Template
 import tempfile
 import uuid
 import pandas as pd
@@ -20,8 +15,33 @@ from threading import Timer
 import schedule
 import time
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.base import JobLookupError
 import base64
+import io
 import mimetypes
+from certificate_renderer import RendererPool
+from certificate_templates import CertificateTemplateRegistry, TemplateNotFound
+from certificate_cache import CertificateCache, certificate_key
+from certificate_assets import CertificateAssetRegistry
+from bulk_jobs import create_bulk_job_models, BulkJobEngine, JobStateError
+from certificate_dispatch import CertificateDispatcher
+from scheduler_leader import create_scheduler_run_model, ClusterScheduler
+from program_reminders import ProgramReminderPlanner
+from mail_transport import MailTransport
+from email_outbox import create_outbox_model, OutboxDispatcher
+from email_templates import EmailTemplateRegistry
+from pdf_delivery import pdf_response
+from fanout import FanOutExecutor
+from response_cache import ResponseCache
+from keyset_listing import KeysetListing, ListingError
+from participant_search import ParticipantSearch
+from check_in_batch import BatchCheckIn, BatchError
+from check_in_tokens import CheckInTokens, InvalidToken
+from report_export import stream_rows, statement_header, csv_response, xlsx_response
+from dashboard_counters import create_counter_model, DashboardCounters, Count, NOT_NULL, COUNTER_RECONCILE_SECONDS
+from bulk_import import BulkImporter, collect_import, stream_import, wants_stream, read_spreadsheet_chunks
+from functools import partial
+import itertools
 
 app = Flask(__name__, 
             static_folder='../frontend/build/static',
@@ -287,9 +307,9 @@ def serve_asset(filename):
         print(f"Error serving asset: {str(e)}")
         return str(e), 500
 
-# Initialize scheduler for program notifications
+# Initialize scheduler for program notifications; it is started per process
+# by cluster_scheduler, which lets only the elected leader run the jobs
 scheduler = BackgroundScheduler()
-scheduler.start()
 
 # Database configuration
 # PostgreSQL configuration
@@ -311,6 +331,9 @@ EMAIL_USER = os.environ.get('EMAIL_USER', 'sylvia4douglas@gmail.com')
 EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD', 'your-app-password')
 EMAIL_FROM = os.environ.get('EMAIL_FROM', 'MDCAN BDM 2025 <sylvia4douglas@gmail.com>')
 
+# Pooled SMTP sessions shared by all outbound mail
+mail_transport = MailTransport(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD)
+
 # File upload configuration
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 BROCHURE_FOLDER = os.path.join(UPLOAD_FOLDER, 'brochures')
@@ -396,7 +419,9 @@ class Participant(db.Model):
         db.CheckConstraint(registration_type.in_(['participant', 'speaker', 'organizer', 'sponsor', 'volunteer']), name='valid_registration_type'),
         db.CheckConstraint(registration_status.in_(['registered', 'confirmed', 'attended', 'cancelled']), name='valid_registration_status'),
         db.Index('idx_email_status', 'email', 'certificate_status'),
+        db.Index('idx_participants_email_lower', sa.func.lower(email)),
         db.Index('idx_created_type', 'created_at', 'certificate_type'),
+        db.Index('idx_participants_created_id', 'created_at', 'id'),
         db.Index('idx_registration_type_status', 'registration_type', 'registration_status'),
     )
 
@@ -413,6 +438,26 @@ class Participant(db.Model):
         random_suffix = random.randint(1000, 9999)
         return f"MDCAN-BDM-2025-{timestamp}-{random_suffix}"
 
+    @staticmethod
+    def generate_certificate_numbers(count, taken=None):
+        """Generate ``count`` distinct certificate numbers for a bulk import.
+        
+        Numbers already in ``taken`` are avoided and new ones are added to it,
+        so an import done in chunks cannot collide with itself.
+        """
+        import random
+        taken = set() if taken is None else taken
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        # Widen the suffix range with the size of the import
+        upper = max(10000, 1000 + (count + len(taken)) * 10)
+        numbers = []
+        while len(numbers) < count:
+            number = f"MDCAN-BDM-2025-{timestamp}-{random.randint(1000, upper)}"
+            if number not in taken:
+                taken.add(number)
+                numbers.append(number)
+        return numbers
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -778,6 +823,102 @@ class CheckIn(db.Model):
         db.session.commit()
         return setting
 
+# Bulk certificate jobs and their per-participant checkpoints
+BulkJob, BulkJobItem = create_bulk_job_models(db)
+
+# Durable queue of outbound email drained by a background dispatcher
+EmailOutbox = create_outbox_model(db)
+
+# Scheduled jobs live in a shared job store and run in one elected process
+SchedulerRun = create_scheduler_run_model(db)
+cluster_scheduler = ClusterScheduler(app, db, scheduler, SchedulerRun)
+
+# Polled read-only endpoints answer from a short-lived cache with ETags;
+# write handlers invalidate the groups they change
+response_cache = ResponseCache()
+STATS_CACHE_TTL_SECONDS = int(os.environ.get('STATS_CACHE_TTL_SECONDS', 5))
+
+# Dashboard counts kept up to date by every write, so statistics endpoints
+# read the counters table instead of scanning participants
+DashboardCounter = create_counter_model(db)
+dashboard_counters = DashboardCounters(db, DashboardCounter)
+dashboard_counters.register('participants', Participant, {
+    'total': Count(),
+    'by_certificate_type': Count(group_by='certificate_type'),
+    'by_certificate_status': Count(group_by='certificate_status'),
+    'by_registration_type': Count(group_by='registration_type'),
+    'by_registration_status': Count(group_by='registration_status'),
+    'fee_paid': Count(registration_fee_paid=True),
+    'checked_in': Count(first_attendance_date=NOT_NULL),  # set by a participant's first check-in
+    'registrations': Count(by_day='created_at')
+})
+dashboard_counters.register('certificate_logs', CertificateLog, {
+    'total': Count(),
+    'sent': Count(by_day='timestamp', action='sent', status='success')
+})
+dashboard_counters.register('check_ins', CheckIn, {
+    'by_day': Count(group_by='check_in_day'),
+    'materials_received': Count(group_by='check_in_day', materials_received=True)
+})
+dashboard_counters.register('programs', ConferenceProgram, {
+    'total': Count(),
+    'by_type': Count(group_by='program_type')
+})
+dashboard_counters.register('session_registrations', SessionRegistration, {
+    'total': Count(),
+    'by_attendance': Count(group_by='attendance_status')
+})
+dashboard_counters.attach()
+
+# Check-in desk search over name, email and certificate number
+participant_search = ParticipantSearch(db, Participant, CheckIn)
+participant_search.attach()
+check_in_batch = BatchCheckIn(db, Participant, CheckIn, counters=dashboard_counters)
+check_in_tokens = CheckInTokens()
+
+# PDF renderer configuration - locate wkhtmltopdf once and keep a pool of
+# long-lived renderer processes instead of starting one per certificate
+WKHTMLTOPDF_PATHS = [
+    r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe',
+    r'C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe',
+    r'C:\wkhtmltopdf\bin\wkhtmltopdf.exe',
+    '/usr/bin/wkhtmltopdf',
+    '/usr/local/bin/wkhtmltopdf'
+]
+WKHTMLTOPDF_PATH = next((path for path in WKHTMLTOPDF_PATHS if os.path.exists(path)), None)
+if WKHTMLTOPDF_PATH:
+    print(f"Found wkhtmltopdf at: {WKHTMLTOPDF_PATH}")
+
+certificate_renderer = RendererPool(wkhtmltopdf_path=WKHTMLTOPDF_PATH)
+
+# Rendered certificate PDFs keyed by everything that affects their content
+certificate_cache = CertificateCache()
+CERTIFICATE_RENDER_FIELDS = ('name', 'certificate_type', 'certificate_number')
+
+# Signatures and logos, resolved and validated once at startup (before any
+# gunicorn workers are forked) instead of being searched for on every render
+CERTIFICATE_ASSET_DIRS = [
+    os.path.join(os.getcwd(), 'frontend', 'public'),
+    os.path.join(os.getcwd(), 'public'),
+    os.path.join(os.getcwd(), 'backend', 'static'),
+    os.getcwd()
+]
+CERTIFICATE_ASSET_FILES = {
+    'president_signature': ['president-signature.png', 'president-signature-placeholder.jpg', 'president-signature.jpg'],
+    'chairman_signature': ['chairman-signature.png', 'chairman-signature-placeholder.png', 'Dr. Augustine Duru.jpg'],
+    'mdcan_logo': ['mdcan-logo.png', 'mdcan_logo.jpeg', 'logo-mdcan.jpeg'],
+    'coalcity_logo': ['coalcity-logo.png', 'coal_city_logo.png'],
+}
+certificate_assets = CertificateAssetRegistry()
+for asset_name, file_options in CERTIFICATE_ASSET_FILES.items():
+    certificate_assets.define(
+        asset_name,
+        [os.path.join(directory, f) for directory in CERTIFICATE_ASSET_DIRS for f in file_options],
+        fallback=os.path.join(CERTIFICATE_ASSET_DIRS[0], file_options[0])
+    )
+certificate_assets.load()
+app.before_request(certificate_assets.refresh_if_stale)
+
 # Certificate HTML template
 CERTIFICATE_HTML = """
 <!DOCTYPE html>
@@ -1146,101 +1287,32 @@ SERVICE_CONTENT = """
 </div>
 """
 
-def generate_certificate_pdf(participant_name, certificate_type='participation'):
-    """Generate a PDF certificate for the participant"""
+# Certificate templates are compiled once per type; content is rendered as a partial
+certificate_templates = CertificateTemplateRegistry(
+    context_builder=lambda participant: {'participant_name': participant.name},
+    type_getter=lambda participant: participant.certificate_type
+)
+certificate_templates.register(
+    'participation',
+    CERTIFICATE_HTML,
+    partials={'certificate_content': PARTICIPATION_CONTENT},
+    context={'certificate_title': 'CERTIFICATE OF PARTICIPATION'}
+)
+certificate_templates.register(
+    'service',
+    CERTIFICATE_HTML,
+    partials={'certificate_content': SERVICE_CONTENT},
+    context={'certificate_title': 'ACKNOWLEDGEMENT OF SERVICE'}
+)
+
+def generate_certificate_pdf(participant_name, certificate_type='participation', certificate_number=None, participant_id=None):
+    """Generate a PDF certificate for the participant and return its bytes (None on failure)"""
     try:
-        # Get base directory and potential signature file locations
-        base_dir = os.getcwd()
-        print(f"Current working directory: {base_dir}")
         print(f"Generating {certificate_type} certificate for: {participant_name}")
-        print(f"Using certificate template: {'PARTICIPATION_CONTENT' if certificate_type == 'participation' else 'SERVICE_CONTENT'}")
         
-        possible_directories = [
-            os.path.join(base_dir, 'frontend', 'public'),
-            os.path.join(base_dir, 'public'),
-            os.path.join(base_dir, 'backend', 'static'),
-            os.path.join(base_dir)
-        ]
-        
-        # Check if directories exist
-        for directory in possible_directories:
-            if os.path.exists(directory):
-                print(f"Directory exists: {directory}")
-            else:
-                print(f"Directory does not exist: {directory}")
-        
-        # Define file basenames
-        president_file_options = ['president-signature.png', 'president-signature-placeholder.jpg', 'president-signature.jpg']
-        chairman_file_options = ['chairman-signature.png', 'chairman-signature-placeholder.png', 'Dr. Augustine Duru.jpg']
-        mdcan_logo_options = ['mdcan-logo.png', 'mdcan_logo.jpeg', 'logo-mdcan.jpeg']
-        coalcity_logo_options = ['coalcity-logo.png', 'coal_city_logo.png']
-        
-        # Function to find first existing file from options in directories
-        def find_file(file_options, directories):
-            for directory in possible_directories:
-                for file_option in file_options:
-                    file_path = os.path.join(directory, file_option)
-                    if os.path.exists(file_path):
-                        print(f"Found file: {file_path}")
-                        return file_path
-            
-            # If no file found, use a direct reference to frontend/public
-            for file_option in file_options:
-                direct_path = os.path.join(base_dir, 'frontend', 'public', file_option)
-                if os.path.exists(direct_path):
-                    print(f"Found direct file: {direct_path}")
-                    return direct_path
-            
-            # Return the first option (even if not found) as fallback
-            fallback = os.path.join(possible_directories[0], file_options[0])
-            print(f"Using fallback path: {fallback}")
-            return fallback
-        
-        # Find signature files
-        president_signature = find_file(president_file_options, possible_directories)
-        chairman_signature = find_file(chairman_file_options, possible_directories)
-        mdcan_logo = find_file(mdcan_logo_options, possible_directories)
-        coalcity_logo = find_file(coalcity_logo_options, possible_directories)
-        
-        # Log paths for debugging
-        print(f"Using files for certificate generation:")
-        print(f"President signature: {president_signature}")
-        print(f"Chairman signature: {chairman_signature}")
-        print(f"MDCAN logo: {mdcan_logo}")
-        print(f"Coal City logo: {coalcity_logo}")
-        
-        # Determine certificate title and content
-        if certificate_type == 'service':
-            certificate_title = 'ACKNOWLEDGEMENT OF SERVICE'
-            print("Using SERVICE_CONTENT template:")
-            print(SERVICE_CONTENT)
-            content_template = Template(SERVICE_CONTENT)
-        else:
-            certificate_title = 'CERTIFICATE OF PARTICIPATION'
-            print("Using PARTICIPATION_CONTENT template:")
-            print(PARTICIPATION_CONTENT)
-            content_template = Template(PARTICIPATION_CONTENT)
-        
-        # Generate content
-        certificate_content = content_template.render(participant_name=participant_name)
-        
-        # Log signature paths for debugging
-        print(f"MDCAN logo path: {mdcan_logo}")
-        print(f"Coal City logo path: {coalcity_logo}")
-        print(f"President signature path: {president_signature}")
-        print(f"Chairman signature path: {chairman_signature}")
-        
-        # Create HTML from template
-        template = Template(CERTIFICATE_HTML)
-        html_content = template.render(
-            certificate_title=certificate_title,
-            certificate_content=certificate_content,
-            participant_name=participant_name,
-            president_signature=president_signature,
-            chairman_signature=chairman_signature,
-            mdcan_logo=mdcan_logo,
-            coalcity_logo=coalcity_logo
-        )
+        # Signature and logo paths come from the registry loaded at startup
+        assets = certificate_assets.paths()
+        compiled = certificate_templates.get(certificate_type)
         
         # Generate PDF
         options = {
@@ -1257,70 +1329,49 @@ def generate_certificate_pdf(participant_name, certificate_type='participation')
             'disable-smart-shrinking': None
         }
         
-        try:
-            # Create temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            
-            # Try to find wkhtmltopdf in common locations
-            wkhtmltopdf_paths = [
-                r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe',
-                r'C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe',
-                r'C:\wkhtmltopdf\bin\wkhtmltopdf.exe',
-                '/usr/bin/wkhtmltopdf',
-                '/usr/local/bin/wkhtmltopdf'
-            ]
-            
-            # Check if any of the paths exist
-            wkhtmltopdf_path = None
-            for path in wkhtmltopdf_paths:
-                if os.path.exists(path):
-                    wkhtmltopdf_path = path
-                    print(f"Found wkhtmltopdf at: {path}")
-                    break
-            
-            if wkhtmltopdf_path:
-                # Use the found path
-                config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
-                pdfkit.from_string(html_content, temp_file.name, options=options, configuration=config)
-            else:
-                # Try default installation
-                pdfkit.from_string(html_content, temp_file.name, options=options)
-            
-            return temp_file.name
-        except Exception as e:
-            print(f"Error in PDF generation: {e}")
-            
-            # Alternative: Save HTML and notify
-            html_file = tempfile.NamedTemporaryFile(delete=False, suffix='.html')
-            with open(html_file.name, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            print(f"HTML file saved as fallback: {html_file.name}")
+        # Reuse a previously rendered PDF when nothing that affects it changed
+        cache_key = certificate_key(participant_name, compiled.cert_type, certificate_number,
+                                    compiled.version, options=options,
+                                    asset_fingerprints=certificate_assets.fingerprints())
+        pdf_bytes = certificate_cache.get(cache_key, participant_id)
+        if pdf_bytes is not None:
+            print(f"Using cached certificate PDF for: {participant_name}")
+        else:
+            # Create HTML from the precompiled certificate template
+            print(f"Using compiled {compiled.cert_type} template v{compiled.version}")
+            html_content = compiled.render(participant_name=participant_name, **assets)
             
-            # Return None to indicate failure in PDF generation
-            return None
+            try:
+                # Render through the persistent wkhtmltopdf pool
+                pdf_bytes = certificate_renderer.render(html_content, options=options)
+                certificate_cache.put(cache_key, pdf_bytes, participant_id)
+            except Exception as e:
+                print(f"Error in PDF generation: {e}")
+                
+                # Alternative: Save HTML and notify, one file per participant so
+                # concurrent failures don't overwrite each other's fallback
+                fallback_id = secure_filename(str(participant_id or certificate_number or ''))
+                if fallback_id:
+                    html_fallback = os.path.join(tempfile.gettempdir(),
+                                                 f'mdcan-certificate-fallback-{fallback_id}.html')
+                    with open(html_fallback, 'w', encoding='utf-8') as f:
+                        f.write(html_content)
+                    print(f"HTML file saved as fallback: {html_fallback}")
+                else:
+                    print(f"No HTML fallback saved for {participant_name}: no participant id or certificate number")
+                
+                # Return None to indicate failure in PDF generation
+                return None
+        
+        return pdf_bytes
         
     except Exception as e:
         print(f"Error generating certificate PDF: {e}")
         return None
 
-def send_email_with_certificate(participant_name, participant_email, pdf_path, certificate_type='participation'):
-    """Send email with certificate attachment"""
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = participant_email
-        
-        # Set subject based on certificate type
-        if certificate_type == 'service':
-            msg['Subject'] = "Your MDCAN BDM 14th - 2025 Acknowledgement of Service"
-            certificate_name = "Acknowledgement of Service"
-        else:
-            msg['Subject'] = "Your MDCAN BDM 14th - 2025 Certificate of Participation"
-            certificate_name = "Certificate of Participation"
-        
-        # Create HTML email
-        html_body = f"""
+# Email bodies are compiled once per kind; only the recipient's fields are
+# substituted when a message is built
+CERTIFICATE_EMAIL_HTML = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -1357,16 +1408,16 @@ def send_email_with_certificate(participant_name, participant_email, pdf_path, c
                 </div>
                 
                 <div class="content">
-                    <p>Dear {participant_name},</p>
+                    <p>Dear {name},</p>
                     
-                    <p>{"Thank you for your exceptional service and contribution to the success of" if certificate_type == 'service' else "Congratulations! Thank you for participating in"} the MDCAN BDM 14th - 2025 conference held in Enugu from 1st – 6th September, 2025.</p>
+                    <p>{intro} the MDCAN BDM 14th - 2025 conference held in Enugu from 1st – 6th September, 2025.</p>
                     
                     <div class="certificate-info">
                         <p><strong>Your {certificate_name} is attached to this email.</strong></p>
                         <p>You can download and save it for your records or print it if needed.</p>
                     </div>
                     
-                    <p>{"We deeply appreciate your dedication and hard work in making this conference a success." if certificate_type == 'service' else "We appreciate your valuable participation and hope you found the conference beneficial."}</p>
+                    <p>{closing}</p>
                     
                     <p>If you have any questions or need further assistance, please don't hesitate to contact us.</p>
                 </div>
@@ -1379,20 +1430,16 @@ def send_email_with_certificate(participant_name, participant_email, pdf_path, c
             </div>
         </body>
         </html>
-        """
-        
-        # Add HTML body
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        # Add plain text alternative for email clients that don't support HTML
-        text_body = f"""
-Dear {participant_name},
+"""
+
+CERTIFICATE_EMAIL_TEXT = """
+Dear {name},
 
-{"Thank you for your exceptional service and contribution to the success of" if certificate_type == 'service' else "Congratulations! Thank you for participating in"} the MDCAN BDM 14th - 2025 conference held in Enugu from 1st – 6th September, 2025.
+{intro} the MDCAN BDM 14th - 2025 conference held in Enugu from 1st – 6th September, 2025.
 
 Please find attached your {certificate_name}.
 
-{"We deeply appreciate your dedication and hard work in making this conference a success." if certificate_type == 'service' else "We appreciate your valuable participation and hope you found the conference beneficial."}
+{closing}
 
 Best regards,
 MDCAN BDM 2025 Organizing Committee
@@ -1403,47 +1450,9 @@ LOC Chairman
 Dr. Augustine Duru
 LOC Secretary
 MDCAN Sec. Gen.
-        """
-        
-        msg.attach(MIMEText(text_body, 'plain'))
-        
-        # Attach PDF
-        if pdf_path and os.path.exists(pdf_path):
-            with open(pdf_path, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                filename = f"MDCAN_BDM_2025_{'Service' if certificate_type == 'service' else 'Certificate'}_{participant_name.replace(' ', '_')}.pdf"
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= "{filename}"'
-                )
-                msg.attach(part)
-        
-        # Send email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_FROM, participant_email, text)
-        server.quit()
-        
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
+"""
 
-def send_notification_email(participant_email, participant_name, subject, message):
-    """Send notification email to participant"""
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = participant_email
-        msg['Subject'] = subject
-        
-        # Create HTML email template
-        html_body = f"""
+NOTIFICATION_EMAIL_HTML = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -1480,7 +1489,7 @@ def send_notification_email(participant_email, participant_name, subject, messag
                 </div>
                 
                 <div class="content">
-                    <p>Dear {participant_name},</p>
+                    <p>Dear {name},</p>
                     
                     {message}
                     
@@ -1495,21 +1504,63 @@ def send_notification_email(participant_email, participant_name, subject, messag
             </div>
         </body>
         </html>
-        """
+"""
+
+email_templates = EmailTemplateRegistry(EMAIL_FROM)
+email_templates.register(
+    'certificate_participation',
+    "Your MDCAN BDM 14th - 2025 Certificate of Participation",
+    CERTIFICATE_EMAIL_HTML, CERTIFICATE_EMAIL_TEXT,
+    certificate_name="Certificate of Participation",
+    intro="Congratulations! Thank you for participating in",
+    closing="We appreciate your valuable participation and hope you found the conference beneficial."
+)
+email_templates.register(
+    'certificate_service',
+    "Your MDCAN BDM 14th - 2025 Acknowledgement of Service",
+    CERTIFICATE_EMAIL_HTML, CERTIFICATE_EMAIL_TEXT,
+    certificate_name="Acknowledgement of Service",
+    intro="Thank you for your exceptional service and contribution to the success of",
+    closing="We deeply appreciate your dedication and hard work in making this conference a success."
+)
+email_templates.register('notification', '{subject}', NOTIFICATION_EMAIL_HTML)
+
+def send_email_with_certificate(participant_name, participant_email, pdf_bytes, certificate_type='participation', raise_errors=False):
+    """Send email with certificate attachment"""
+    try:
+        attachments = []
+        if pdf_bytes:
+            filename = f"MDCAN_BDM_2025_{'Service' if certificate_type == 'service' else 'Certificate'}_{participant_name.replace(' ', '_')}.pdf"
+            attachments.append((filename, pdf_bytes))
+        
+        kind = 'certificate_service' if certificate_type == 'service' else 'certificate_participation'
+        msg = email_templates.build(kind, participant_email, attachments, name=participant_name)
+        
+        # Send email over a pooled SMTP session
+        mail_transport.send(msg, EMAIL_FROM, [participant_email])
         
-        msg.attach(MIMEText(html_body, 'html'))
+        return True
+    except Exception as e:
+        print(f"Error sending email: {e}")
+        if raise_errors:
+            raise
+        return False
+
+
+def send_notification_email(participant_email, participant_name, subject, message, raise_errors=False):
+    """Send notification email to participant"""
+    try:
+        msg = email_templates.build('notification', participant_email,
+                                    subject=subject, name=participant_name, message=message)
         
-        # Send email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_FROM, participant_email, text)
-        server.quit()
+        # Send email over a pooled SMTP session
+        mail_transport.send(msg, EMAIL_FROM, [participant_email])
         
         return True
     except Exception as e:
         print(f"Error sending notification email: {e}")
+        if raise_errors:
+            raise
         return False
 
 
@@ -1525,22 +1576,174 @@ def send_push_notification(subscription_data, title, message):
         return False
 
 
-def send_program_reminder():
-    """Send reminders for upcoming programs"""
+def deliver_notification_email(message, payload):
+    """Outbox sender for welcome, session, announcement, reminder and notification emails"""
+    send_notification_email(message.recipient, payload.get('name', ''), message.subject,
+                            payload.get('message', ''), raise_errors=True)
+
+def deliver_certificate_email(message, payload):
+    """Outbox sender that renders (usually from cache) and emails a certificate"""
+    participant = db.session.get(Participant, message.participant_id)
+    if participant is None:
+        return
+    
+    pdf_bytes = generate_certificate_pdf(participant.name, participant.certificate_type,
+                                         participant.certificate_number, participant.id)
+    if not pdf_bytes:
+        raise RuntimeError('Failed to generate certificate PDF')
+    send_email_with_certificate(participant.name, message.recipient, pdf_bytes,
+                                participant.certificate_type, raise_errors=True)
+    
+    participant.certificate_status = 'sent'
+    participant.certificate_sent_at = datetime.utcnow()
+    db.session.add(CertificateLog(
+        participant_id=participant.id,
+        action='sent',
+        status='success',
+        email_subject=message.subject
+    ))
+    db.session.commit()
+
+def certificate_email_dead(message, payload):
+    """Mark a participant's certificate failed once its email is dead-lettered"""
+    participant = db.session.get(Participant, message.participant_id)
+    if participant is None:
+        return
+    participant.certificate_status = 'failed'
+    db.session.add(CertificateLog(
+        participant_id=participant.id,
+        action='sent',
+        status='failed',
+        error_message=message.last_error,
+        email_subject=message.subject
+    ))
+
+email_outbox = OutboxDispatcher(app, db, EmailOutbox)
+email_outbox.register('certificate', deliver_certificate_email, on_dead=certificate_email_dead)
+for email_kind in ('welcome', 'session_confirmation', 'announcement', 'program_reminder', 'notification'):
+    email_outbox.register(email_kind, deliver_notification_email)
+
+def notification_outbox_entry(kind, participant, subject, message, idempotency_key):
+    """Outbox row for a templated notification email to one participant"""
+    return {
+        'kind': kind,
+        'recipient': participant.email,
+        'subject': subject,
+        'payload': {'name': participant.name, 'message': message},
+        'participant_id': participant.id,
+        'idempotency_key': idempotency_key
+    }
+
+def check_in_code_html(participant):
+    """Welcome email block with the participant's signed QR check-in code"""
+    if not check_in_tokens.enabled:
+        return ''
+    token = check_in_tokens.issue(participant.id, participant.certificate_number)
+    qr_image = ''
+    if check_in_tokens.qr_available():
+        qr_image = f'<img src="{request.host_url.rstrip("/")}/api/check-in/qr/{token}" alt="Check-in QR code" width="200" height="200"><br>'
+    return f"""
+        <p><strong>Your Check-in Code:</strong><br>
+        {qr_image}<code>{token}</code><br>
+        Show this code at the registration desk for a quick check-in.</p>"""
+
+def queue_certificate_email(participant, resend=False, commit=True):
+    """Queue a participant's certificate email; repeated calls send it once"""
+    idempotency_key = f"certificate:{participant.id}:{participant.certificate_number or ''}"
+    if resend:
+        # An explicit resend is a new message, de-duplicated per minute
+        idempotency_key += f":resend:{datetime.utcnow().strftime('%Y%m%d%H%M')}"
+    return email_outbox.enqueue(
+        'certificate', participant.email,
+        subject=f"Your {participant.certificate_type.title()} Certificate - MDCAN BDM 2025",
+        idempotency_key=idempotency_key,
+        participant_id=participant.id,
+        commit=commit
+    )
+
+# Notification, announcement and reminder deliveries run concurrently with a
+# cap per channel; emails are handed to the outbox first so failures are retried
+notification_fanout = FanOutExecutor()
+
+# How long freshly queued fan-out emails are left to the fan-out before the
+# outbox dispatcher may pick them up (e.g. if this process dies mid-delivery)
+FANOUT_HANDOFF_SECONDS = int(os.environ.get('FANOUT_HANDOFF_SECONDS', 120))
+
+def push_delivery(participant, title, message):
+    """Fan-out delivery tuple for one participant's push notification"""
+    return ('push', participant.email, partial(send_push_notification, participant.push_subscription, title, message))
+
+def start_notification_fanout(notification, email_entries, push_deliveries, total_recipients):
+    """Commit a notification's outbox emails, then deliver email and push in the background.
+
+    The aggregated per-recipient report is written to notification.delivery_stats
+    when the fan-out finishes.  Returns the initial delivery statistics.
+    """
+    email_keys = set(email_outbox.enqueue_many(email_entries, commit=False, defer_seconds=FANOUT_HANDOFF_SECONDS))
+    statistics = {
+        'state': 'delivering',
+        'email_queued': len(email_keys),
+        'push_queued': len(push_deliveries),
+        'total_recipients': total_recipients
+    }
+    notification.delivery_stats = json.dumps(statistics)
+    db.session.commit()
+    notification_id = notification.id
+    
+    deliveries = [('email', entry['recipient'], partial(email_outbox.deliver_now, entry['idempotency_key']))
+                  for entry in email_entries if entry['idempotency_key'] in email_keys]
+    deliveries.extend(push_deliveries)
+    
+    def record_delivery_stats(report):
+        email = report['channels'].get('email', {})
+        push = report['channels'].get('push', {})
+        with app.app_context():
+            record = db.session.get(Notification, notification_id)
+            if record is None:
+                return
+            record.delivery_stats = json.dumps({
+                'state': 'completed',
+                'email_sent': email.get('sent', 0),
+                'email_retrying': email.get('retrying', 0),
+                'email_failed': email.get('dead', 0) + email.get('failed', 0),
+                'email_handed_off': email.get('skipped', 0),  # delivered by the outbox dispatcher
+                'push_sent': push.get('sent', 0),
+                'push_failed': push.get('failed', 0),
+                'total_recipients': total_recipients,
+                'duration_seconds': report['duration_seconds'],
+                'deliveries_per_second': report['deliveries_per_second'],
+                'errors': report['errors']
+            })
+            db.session.commit()
+    
+    notification_fanout.submit(deliveries, record_delivery_stats, name=f'notification-{notification_id}')
+    return statistics
+
+def send_program_reminder(program_id=None):
+    """Send reminders for upcoming programs, or for one program when its reminder job fires"""
     try:
         # Use application context for database operations
         with app.app_context():
-            # Get programs starting in the next hour that haven't sent reminders
             upcoming_time = datetime.utcnow() + timedelta(hours=1)
             current_time = datetime.utcnow()
             
-            programs = ConferenceProgram.query.filter(
-                ConferenceProgram.start_time.between(current_time, upcoming_time),
+            query = ConferenceProgram.query.filter(
                 ConferenceProgram.notification_sent == False,
                 ConferenceProgram.status == 'scheduled'
-            ).all()
+            )
+            if program_id is not None:
+                # Planned at start_time - reminder_minutes; still sent if late, until the program starts
+                query = query.filter(ConferenceProgram.id == program_id, ConferenceProgram.start_time > current_time)
+            else:
+                # Manual trigger: programs starting in the next hour that haven't sent reminders
+                query = query.filter(ConferenceProgram.start_time.between(current_time, upcoming_time))
+            programs = query.all()
             
             for program in programs:
+                if program_id is None:
+                    # Sent ahead of its planned job
+                    program_reminders.cancel(program.id)
+                
                 # Get participants for this program
                 if program.requires_registration:
                     # Get registered participants
@@ -1576,33 +1779,88 @@ def send_program_reminder():
                 <p>Please ensure you arrive on time. Looking forward to seeing you there!</p>
                 """
                 
+                reminder_emails = []
+                push_deliveries = []
                 for participant in participants:
-                    # Send email notification
+                    # Queue email notification
                     if participant.email_notifications:
-                        send_notification_email(participant.email, participant.name, subject, message)
+                        reminder_emails.append(notification_outbox_entry(
+                            'program_reminder', participant, subject, message,
+                            f"program_reminder:{program.id}:{participant.id}"))
                     
-                    # Send push notification
+                    # Queue push notification
                     if participant.push_notifications and participant.push_subscription:
-                        send_push_notification(
-                            participant.push_subscription,
+                        push_deliveries.append(push_delivery(
+                            participant,
                             f"MDCAN BDM 2025: {program.title}",
                             f"Starting at {program.start_time.strftime('%I:%M %p')} in {program.venue}"
-                        )
+                        ))
                 
-                # Mark notification as sent
+                # Record the reminder so its delivery statistics can be inspected
+                notification = Notification(
+                    title=subject,
+                    message=message,
+                    notification_type='program_reminder',
+                    target_audience='specific_program' if program.requires_registration else 'all',
+                    target_program_id=program.id,
+                    scheduled_time=datetime.utcnow(),
+                    sent_at=datetime.utcnow(),
+                    status='sent'
+                )
+                db.session.add(notification)
                 program.notification_sent = True
-                db.session.commit()
+                
+                # Queue the emails and mark the reminder sent in one transaction
+                start_notification_fanout(notification, reminder_emails, push_deliveries, len(participants))
             
         return len(programs)
     except Exception as e:
         print(f"Error sending program reminders: {e}")
         return 0
 
+# One reminder job per program, planned whenever a program is saved
+program_reminders = ProgramReminderPlanner(db, scheduler, ConferenceProgram, send_program_reminder)
+
+def plan_program_reminder(program):
+    """Schedule, move or cancel a saved program's reminder job"""
+    try:
+        return program_reminders.plan(program)
+    except Exception as e:
+        # The program is saved; the startup sync plans its reminder again
+        print(f"Error planning reminder for program {program.id}: {e}")
+        return None
+
 # API Routes
+# Paged participant listing: newest first by (created_at, id), with column
+# selection and filters on the indexed columns
+participant_listing = KeysetListing(
+    Participant,
+    fields=[column.name for column in Participant.__table__.columns],
+    default_fields=[column.name for column in Participant.__table__.columns if column.name != 'push_subscription'],
+    filters=['email', 'registration_type', 'registration_status', 'certificate_type', 'certificate_status'],
+    sorts=['created_at', 'name', 'email'],
+    default_sort='-created_at'
+)
+
 @app.route('/api/participants', methods=['GET'])
 def get_participants():
-    participants = Participant.query.order_by(Participant.created_at.desc()).all()
-    return jsonify([p.to_dict() for p in participants])
+    """List participants; with limit/cursor/fields/sort or a filter, one keyset page"""
+    if not participant_listing.requested(request.args):
+        participants = Participant.query.order_by(Participant.created_at.desc()).all()
+        return jsonify([p.to_dict() for p in participants])
+    
+    try:
+        page = participant_listing.page(db.session, request.args)
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'participants': page['items'],
+        'count': len(page['items']),
+        'limit': page['limit'],
+        'sort': page['sort'],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more']
+    })
 
 @app.route('/api/participants', methods=['POST'])
 def add_participant():
@@ -1654,70 +1912,151 @@ def send_certificate(participant_id):
     participant = Participant.query.get_or_404(participant_id)
     
     try:
-        # Generate certificate PDF
-        pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-        if not pdf_path:
+        # Render now so template/asset problems are reported to the caller;
+        # the PDF stays in the certificate cache for the outbox dispatcher
+        if not generate_certificate_pdf(participant.name, participant.certificate_type,
+                                        participant.certificate_number, participant.id):
             return jsonify({'error': 'Failed to generate certificate PDF'}), 500
         
-        # Send email
-        if send_email_with_certificate(participant.name, participant.email, pdf_path, participant.certificate_type):
-            participant.certificate_status = 'sent'
-            participant.certificate_sent_at = datetime.utcnow()
-            db.session.commit()
-            
-            # Clean up temporary PDF file
-            if os.path.exists(pdf_path):
-                os.unlink(pdf_path)
-            
-            return jsonify({'message': 'Certificate sent successfully'})
-        else:
-            participant.certificate_status = 'failed'
-            db.session.commit()
-            return jsonify({'error': 'Failed to send email'}), 500
+        message = queue_certificate_email(participant, resend=participant.certificate_status in ('sent', 'resent'))
+        return jsonify({
+            'message': 'Certificate queued for delivery',
+            'outbox_id': message.id,
+            'status': message.status
+        }), 202
             
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def process_certificate_job_item(participant_id, params):
+    """Render one participant's certificate and queue its email as part of a bulk job"""
+    participant = db.session.get(Participant, participant_id)
+    if participant is None:
+        return 'skipped'
+    if participant.certificate_status == 'sent' and not params.get('resend'):
+        return 'skipped'
+    
+    # Rendering here warms the certificate cache, so the outbox dispatcher
+    # only has to attach and send
+    if not generate_certificate_pdf(participant.name, participant.certificate_type,
+                                    participant.certificate_number, participant.id):
         participant.certificate_status = 'failed'
+        db.session.add(CertificateLog(
+            participant_id=participant.id,
+            action='sent',
+            status='failed',
+            error_message='Failed to generate certificate PDF',
+            email_subject=f"Your {participant.certificate_type.title()} Certificate - MDCAN BDM 2025"
+        ))
         db.session.commit()
-        return jsonify({'error': str(e)}), 500
+        raise RuntimeError('Failed to generate certificate PDF')
+    
+    queue_certificate_email(participant, resend=bool(params.get('resend')))
+    return 'succeeded'
+
+certificate_jobs = BulkJobEngine(app, db, BulkJob, BulkJobItem)
+certificate_jobs.register('send_certificates', process_certificate_job_item)
+certificate_dispatch = CertificateDispatcher(db, scheduler, certificate_jobs, Participant, CheckIn)
+
+def submit_certificate_job(query, source, concurrency=None):
+    """Queue a background certificate job for the participants matched by query.
+
+    Participants an active certificate job still has pending are left out,
+    so a repeated bulk send does not render or send them twice.
+    """
+    statement = query.with_entities(Participant.id).order_by(Participant.id).statement
+    return certificate_jobs.submit_unclaimed('send_certificates', statement, params={'source': source},
+                                             concurrency=concurrency)
+
+def certificate_job_response(job):
+    """Accepted response pointing clients at the job progress endpoint"""
+    return jsonify({
+        'message': f'Certificate job {job.id} queued for {job.total} participants',
+        'job_id': job.id,
+        'status_url': f'/api/certificate-jobs/{job.id}',
+        'job': job.to_dict()
+    }), 202
 
 @app.route('/api/send-all-certificates', methods=['POST'])
 def send_all_certificates():
-    participants = Participant.query.filter_by(certificate_status='pending').all()
+    data = request.get_json(silent=True) or {}
+    try:
+        job = submit_certificate_job(Participant.query.filter_by(certificate_status='pending'),
+                                     'send_all', data.get('concurrency'))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to queue certificates: {str(e)}'}), 500
     
-    sent_count = 0
-    failed_count = 0
+    if job is None:
+        return jsonify({
+            'message': 'Certificates sent: 0, Failed: 0',
+            'sent_count': 0,
+            'failed_count': 0
+        })
+    return certificate_job_response(job)
+
+SERVICE_ROLES = ['volunteer', 'organizer', 'staff', 'committee', 'organizing committee']
+# Sheet columns an upsert re-upload may change, and the fields they set
+UPLOAD_UPDATE_COLUMNS = {
+    'name': 'name',
+    'organization': 'organization',
+    'position': 'position',
+    'role': 'certificate_type'
+}
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+def normalize_participant_upload(df, certificate_numbers=None):
+    """Clean and validate a chunk of an uploaded participant sheet column-wise.
     
-    for participant in participants:
-        try:
-            pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-            if pdf_path and send_email_with_certificate(participant.name, participant.email, pdf_path, participant.certificate_type):
-                participant.certificate_status = 'sent'
-                participant.certificate_sent_at = datetime.utcnow()
-                sent_count += 1
-                
-                # Clean up temporary PDF file
-                if os.path.exists(pdf_path):
-                    os.unlink(pdf_path)
-            else:
-                participant.certificate_status = 'failed'
-                failed_count += 1
-        except Exception as e:
-            print(f"Error sending certificate to {participant.name}: {e}")
-            participant.certificate_status = 'failed'
-            failed_count += 1
+    Returns ``(rows, rejected)``: ``(row_number, values)`` pairs ready for
+    insertion and ``(row_number, error)`` pairs, numbered as in the sheet.
+    ``certificate_numbers`` collects the numbers issued across chunks.
+    """
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    row_numbers = pd.Series(df.index + 2, index=df.index)
     
-    db.session.commit()
+    def text(column):
+        if column not in df.columns:
+            return pd.Series('', index=df.index)
+        return df[column].fillna('').astype(str).str.strip().replace('nan', '')
     
-    return jsonify({
-        'message': f'Certificates sent: {sent_count}, Failed: {failed_count}',
-        'sent_count': sent_count,
-        'failed_count': failed_count
+    frame = pd.DataFrame({
+        'name': text('name'),
+        'email': text('email'),
+        'organization': text('organization'),
+        'position': text('position')
     })
+    # Certificate type follows the role/position column
+    frame['certificate_type'] = text('role').str.lower().isin(SERVICE_ROLES).map(
+        {True: 'service', False: 'participation'})
+    frame['certificate_status'] = 'pending'
+    frame['registration_source'] = 'bulk_upload'
+    
+    missing = (frame['name'] == '') | (frame['email'] == '')
+    invalid = ~missing & ~frame['email'].str.match(EMAIL_PATTERN)
+    rejected = sorted(
+        [(int(row), 'Missing name or email') for row in row_numbers[missing]] +
+        [(int(row), 'Invalid email address') for row in row_numbers[invalid]]
+    )
+    
+    valid = frame[~(missing | invalid)].copy()
+    valid['certificate_number'] = Participant.generate_certificate_numbers(len(valid), certificate_numbers)
+    rows = list(zip(row_numbers[valid.index].astype(int).tolist(), valid.to_dict('records')))
+    return rows, rejected
 
 @app.route('/api/upload-excel', methods=['POST'])
 def upload_excel():
-    """Upload Excel file with participant data and generate certificates"""
+    """Upload an Excel/CSV file of participants.
+    
+    ?mode=upsert updates participants already registered under the same email
+    instead of rejecting them; ?stream=1 streams the per-row report as NDJSON.
+    """
     try:
+        mode = (request.args.get('mode') or request.form.get('mode') or 'insert').lower()
+        if mode not in ('insert', 'upsert'):
+            return jsonify({'error': 'Import mode must be insert or upsert'}), 400
+        
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
         
@@ -1725,151 +2064,159 @@ def upload_excel():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not file.filename.lower().endswith(('.xlsx', '.xls')):
-            return jsonify({'error': 'Please upload an Excel file (.xlsx or .xls)'}), 400
+        if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+            return jsonify({'error': 'Please upload an Excel or CSV file (.xlsx, .xls or .csv)'}), 400
         
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join(tempfile.gettempdir(), filename)
-        file.save(temp_path)
-        
-        # Read Excel file
+        # Read the upload in chunks straight from the request stream
         try:
-            df = pd.read_excel(temp_path)
+            chunks = read_spreadsheet_chunks(file.stream, file.filename)
+            first_chunk = next(chunks, None)
         except Exception as e:
-            os.remove(temp_path)
             return jsonify({'error': f'Error reading Excel file: {str(e)}'}), 400
+        if first_chunk is None:
+            return jsonify({'error': 'The uploaded file has no rows'}), 400
         
         # Validate required columns
         required_columns = ['name', 'email']
-        missing_columns = [col for col in required_columns if col.lower() not in df.columns.str.lower()]
+        columns = first_chunk.columns.astype(str).str.strip().str.lower()
+        missing_columns = [col for col in required_columns if col not in columns]
         if missing_columns:
-            os.remove(temp_path)
             return jsonify({'error': f'Missing required columns: {", ".join(missing_columns)}'}), 400
         
-        # Normalize column names
-        df.columns = df.columns.str.lower()
-        
-        # Process each participant
-        added_count = 0
-        failed_count = 0
-        failed_records = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Extract data from row
-                name = str(row['name']).strip()
-                email = str(row['email']).strip()
-                organization = str(row.get('organization', '')).strip() if pd.notna(row.get('organization')) else ''
-                position = str(row.get('position', '')).strip() if pd.notna(row.get('position')) else ''
-                
-                # Determine certificate type based on role/position
-                role = str(row.get('role', '')).strip().lower() if pd.notna(row.get('role')) else ''
-                certificate_type = 'service' if role in ['volunteer', 'organizer', 'staff', 'committee', 'organizing committee'] else 'participation'
-                
-                # Skip if name or email is missing
-                if not name or not email or name == 'nan' or email == 'nan':
-                    failed_count += 1
-                    failed_records.append({'row': index + 2, 'error': 'Missing name or email'})
-                    continue
-                
-                # Check if participant already exists
-                existing = Participant.query.filter_by(email=email).first()
-                if existing:
-                    failed_count += 1
-                    failed_records.append({'row': index + 2, 'error': 'Email already exists'})
-                    continue
-                
-                # Create new participant
-                participant = Participant(
-                    name=name,
-                    email=email,
-                    organization=organization,
-                    position=position,
-                    certificate_type=certificate_type,
-                    certificate_status='pending'
-                )
-                
-                db.session.add(participant)
-                added_count += 1
-                
-            except Exception as e:
-                failed_count += 1
-                failed_records.append({'row': index + 2, 'error': str(e)})
-        
-        # Commit all changes
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            os.remove(temp_path)
-            return jsonify({'error': f'Database error: {str(e)}'}), 500
-        
-        # Clean up temp file
-        os.remove(temp_path)
-        
+        # Each chunk is validated, deduplicated and inserted as it is read
+        certificate_numbers = set()
+        normalized = (normalize_participant_upload(chunk, certificate_numbers)
+                      for chunk in itertools.chain([first_chunk], chunks))
+        update_columns = [field for column, field in UPLOAD_UPDATE_COLUMNS.items() if column in columns]
+        events = BulkImporter(db, Participant, mode=mode, update_columns=update_columns,
+                              counters=dashboard_counters).run_chunks(normalized)
+        if wants_stream(request):
+            return stream_import(events)
+        
+        failed_records, summary = collect_import(events)
+        if mode == 'upsert':
+            message = (f"Successfully processed {summary['added'] + summary['updated'] + summary['unchanged']} participants "
+                       f"({summary['added']} new, {summary['updated']} updated, {summary['unchanged']} unchanged)")
+        else:
+            message = f"Successfully processed {summary['added']} participants"
         return jsonify({
-            'message': f'Successfully processed {added_count} participants',
-            'added_count': added_count,
-            'failed_count': failed_count,
-            'failed_records': failed_records[:10]  # Return first 10 failed records
+            'message': message,
+            'mode': mode,
+            'added_count': summary['added'],
+            'inserted_count': summary['added'],
+            'updated_count': summary['updated'],
+            'unchanged_count': summary['unchanged'],
+            'failed_count': summary['failed'],
+            'duplicate_count': summary['duplicates'],
+            'duration_seconds': summary['duration_seconds'],
+            'failed_records': failed_records
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
 @app.route('/api/bulk-send-certificates', methods=['POST'])
 def bulk_send_certificates():
     """Send certificates to all participants from uploaded Excel data"""
+    data = request.get_json(silent=True) or {}
     try:
-        # Get all participants with pending certificates
-        participants = Participant.query.filter_by(certificate_status='pending').all()
-        
-        if not participants:
+        # Queue all participants with pending certificates
+        job = submit_certificate_job(Participant.query.filter_by(certificate_status='pending'),
+                                     'bulk_send', data.get('concurrency'))
+        if job is None:
             return jsonify({'message': 'No participants with pending certificates found'}), 404
         
-        sent_count = 0
-        failed_count = 0
-        failed_emails = []
-        
-        for participant in participants:
-            try:
-                # Generate and send certificate
-                pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-                send_certificate_email(participant.email, participant.name, pdf_path, participant.certificate_type)
-                
-                # Update participant status
-                participant.certificate_status = 'sent'
-                participant.certificate_sent_at = datetime.utcnow()
-                
-                sent_count += 1
-                
-                # Clean up PDF file
-                try:
-                    os.unlink(pdf_path)
-                except:
-                    pass
-                    
-            except Exception as e:
-                failed_count += 1
-                failed_emails.append({'email': participant.email, 'error': str(e)})
-                print(f"Failed to send certificate to {participant.email}: {str(e)}")
-        
-        # Save changes to database
-        try:
-            db.session.commit()
-        except Exception as e:
-            print(f"Database error: {str(e)}")
+        return certificate_job_response(job)
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Bulk sending failed: {str(e)}'}), 500
+
+@app.route('/api/certificate-jobs', methods=['GET'])
+def get_certificate_jobs():
+    """List recent bulk certificate jobs"""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify([job.to_dict() for job in certificate_jobs.recent(limit)])
+
+@app.route('/api/certificate-jobs/<int:job_id>', methods=['GET'])
+def get_certificate_job(job_id):
+    """Progress, throughput and recent failures of a bulk certificate job"""
+    job = certificate_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    result = job.to_dict()
+    result['failures'] = certificate_jobs.failures(job_id, limit=request.args.get('failures', 20, type=int))
+    return jsonify(result)
+
+@app.route('/api/certificate-jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_certificate_job(job_id):
+    """Stop a bulk certificate job once in-flight participants finish"""
+    try:
+        job = certificate_jobs.cancel(job_id)
+    except JobStateError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'message': f'Certificate job {job_id} cancelled', 'job': job.to_dict()})
+
+@app.route('/api/certificate-jobs/<int:job_id>/resume', methods=['POST'])
+def resume_certificate_job(job_id):
+    """Resume a cancelled, failed or interrupted bulk certificate job"""
+    data = request.get_json(silent=True) or {}
+    try:
+        job = certificate_jobs.resume(job_id, retry_failed=bool(data.get('retry_failed')))
+    except JobStateError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'message': f'Certificate job {job_id} resumed', 'job': job.to_dict()}), 202
+
+@app.route('/api/email-outbox', methods=['GET'])
+def get_email_outbox():
+    """Outbox counts by status and kind, plus recent messages (e.g. ?status=dead)"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    messages = email_outbox.messages(request.args.get('status'), request.args.get('kind'), limit)
+    return jsonify({
+        'summary': email_outbox.summary(),
+        'messages': [message.to_dict() for message in messages]
+    })
+
+@app.route('/api/email-outbox/<int:message_id>/retry', methods=['POST'])
+def retry_email_outbox_message(message_id):
+    """Requeue a dead-lettered (or waiting) email for immediate delivery"""
+    if not email_outbox.retry(message_id):
+        return jsonify({'error': 'Message not found or not retryable'}), 404
+    return jsonify({'message': f'Email {message_id} requeued'}), 202
+
+@app.route('/api/scheduler/jobs', methods=['GET'])
+def get_scheduler_jobs():
+    """Upcoming and running scheduled jobs, recent runs and the current scheduler leader"""
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    try:
         return jsonify({
-            'message': f'Bulk certificate sending completed. Sent: {sent_count}, Failed: {failed_count}',
-            'sent_count': sent_count,
-            'failed_count': failed_count,
-            'failed_emails': failed_emails[:10]  # Return first 10 failed emails
+            'scheduler': cluster_scheduler.stats(),
+            'upcoming': cluster_scheduler.upcoming(),
+            'running': cluster_scheduler.running(),
+            'recent_runs': cluster_scheduler.recent(limit)
         })
-        
     except Exception as e:
-        return jsonify({'error': f'Bulk sending failed: {str(e)}'}), 500
+        print(f"Error listing scheduler jobs: {e}")
+        return jsonify({'error': f'Failed to list scheduler jobs: {str(e)}'}), 500
+
+@app.route('/api/certificates/assets', methods=['GET'])
+def list_certificate_assets():
+    """Show which signature and logo files certificates are rendered with"""
+    return jsonify(certificate_assets.describe())
+
+@app.route('/api/certificates/assets/reload', methods=['POST'])
+def reload_certificate_assets():
+    """Re-resolve certificate assets after signatures or logos were replaced"""
+    try:
+        changes = certificate_assets.reload()
+        return jsonify({
+            'message': f'Certificate assets reloaded ({len(changes)} changed)',
+            'changed': {name: {'old': old, 'new': new} for name, (old, new) in changes.items()},
+            'assets': certificate_assets.describe()
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to reload certificate assets: {str(e)}'}), 500
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -1908,6 +2255,27 @@ def health_check():
             health['database']['error'] = str(db_error)
             health['status'] = 'degraded'
         
+        # PDF renderer pool status
+        health['pdf_renderer'] = certificate_renderer.stats()
+        health['certificate_cache'] = certificate_cache.stats()
+        health['certificate_jobs'] = certificate_jobs.stats()
+        health['certificate_dispatch'] = certificate_dispatch.stats()
+        health['scheduler'] = cluster_scheduler.stats()
+        health['program_reminders'] = program_reminders.stats()
+        health['mail_transport'] = mail_transport.stats()
+        health['email_outbox'] = email_outbox.stats()
+        health['notification_fanout'] = notification_fanout.stats()
+        health['email_templates'] = email_templates.stats()
+        health['certificate_assets'] = {
+            'version': certificate_assets.version,
+            'missing': certificate_assets.describe()['missing']
+        }
+        health['dashboard_counters'] = dashboard_counters.stats()
+        health['response_cache'] = response_cache.stats()
+        health['participant_search'] = participant_search.stats()
+        health['check_in_batch'] = check_in_batch.stats()
+        health['check_in_tokens'] = check_in_tokens.stats()
+        
         # Get available API endpoints
         rules = []
         for rule in app.url_map.iter_rules():
@@ -1947,89 +2315,61 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat()
         }), 500
 
+# The server version does not change while the app runs
+_database_version = None
+
+def get_database_version():
+    global _database_version
+    if _database_version is None:
+        with db.engine.connect() as conn:
+            _database_version = conn.execute(sa.text("SELECT version();")).scalar()
+    return _database_version
+
 @app.route('/api/stats', methods=['GET'])
+@response_cache.cached('stats', ttl=STATS_CACHE_TTL_SECONDS)
 def get_statistics():
-    """Get application statistics with robust error handling for missing fields"""
+    """Get application statistics from the dashboard counters"""
     try:
-        # Basic stats that should work even with schema discrepancies
+        counts = dashboard_counters.read()
+        participants = counts['participants']
+        logs = counts['certificate_logs']
+        certificate_types = participants['by_certificate_type']
+        certificate_status = participants['by_certificate_status']
+        registration_status = participants['by_registration_status']
+        today = datetime.utcnow().date().isoformat()
         stats = {
             'participants': {
-                'total': 0,
-                'participation_certificates': 0,
-                'service_certificates': 0,
-                'certificates_sent': 0,
-                'certificates_pending': 0,
-                'certificates_failed': 0
+                'total': participants['total'],
+                'participation_certificates': certificate_types.get('participation', 0),
+                'service_certificates': certificate_types.get('service', 0),
+                'certificates_sent': certificate_status.get('sent', 0),
+                'certificates_pending': certificate_status.get('pending', 0),
+                'certificates_failed': certificate_status.get('failed', 0)
+            },
+            'registration': {
+                'registered': registration_status.get('registered', 0),
+                'confirmed': registration_status.get('confirmed', 0),
+                'attended': registration_status.get('attended', 0),
+                'cancelled': registration_status.get('cancelled', 0)
+            },
+            'payment': {
+                'paid': participants['fee_paid'],
+                'unpaid': participants['total'] - participants['fee_paid']
             },
             'recent_activity': {
-                'registrations_today': 0,
-                'certificates_sent_today': 0
+                'registrations_today': participants['registrations'].get(today, 0),
+                'certificates_sent_today': logs['sent'].get(today, 0)
             },
             'system': {
                 'database_type': 'PostgreSQL',
-                'total_logs': 0,
+                'total_logs': logs['total'],
                 'status': 'Connected'
             }
         }
         
-        # Safely try to get counts with error handling for each query
-        try:
-            stats['participants']['total'] = Participant.query.count()
-        except Exception as e:
-            print(f"Error getting participant count: {e}")
-        
-        try:
-            stats['participants']['participation_certificates'] = Participant.query.filter_by(certificate_type='participation').count()
-        except Exception as e:
-            print(f"Error getting participation certificate count: {e}")
-        
-        try:
-            stats['participants']['service_certificates'] = Participant.query.filter_by(certificate_type='service').count()
-        except Exception as e:
-            print(f"Error getting service certificate count: {e}")
-        
-        try:
-            stats['participants']['certificates_sent'] = Participant.query.filter_by(certificate_status='sent').count()
-        except Exception as e:
-            print(f"Error getting certificates sent count: {e}")
-        
-        try:
-            stats['participants']['certificates_pending'] = Participant.query.filter_by(certificate_status='pending').count()
-        except Exception as e:
-            print(f"Error getting certificates pending count: {e}")
-        
-        try:
-            stats['participants']['certificates_failed'] = Participant.query.filter_by(certificate_status='failed').count()
-        except Exception as e:
-            print(f"Error getting certificates failed count: {e}")
-        
-        try:
-            stats['recent_activity']['registrations_today'] = Participant.query.filter(
-                Participant.created_at >= datetime.utcnow().date()
-            ).count()
-        except Exception as e:
-            print(f"Error getting registrations today count: {e}")
-        
-        try:
-            stats['recent_activity']['certificates_sent_today'] = CertificateLog.query.filter(
-                CertificateLog.timestamp >= datetime.utcnow().date(),
-                CertificateLog.action == 'sent',
-                CertificateLog.status == 'success'
-            ).count()
-        except Exception as e:
-            print(f"Error getting certificates sent today count: {e}")
-            
-        try:
-            stats['system']['total_logs'] = CertificateLog.query.count()
-        except Exception as e:
-            print(f"Error getting total logs count: {e}")
-        
         # Add database schema version and connection info
         try:
-            with db.engine.connect() as conn:
-                result = conn.execute(sa.text("SELECT version();"))
-                version = result.scalar()
-                stats['system']['database_version'] = version
+            stats['system']['database_version'] = get_database_version()
         except Exception as e:
             stats['system']['database_version'] = 'Unknown'
             print(f"Error getting database version: {e}")
@@ -2123,6 +2463,7 @@ def register_participant():
         <strong>Email:</strong> {participant.email}<br>
         <strong>Registration Type:</strong> {participant.registration_type.title()}<br>
         <strong>Registration Number:</strong> {participant.certificate_number}</p>
+        {check_in_code_html(participant)}
         <p><strong>What's Next?</strong></p>
         <ul>
             <li>You'll receive updates about the conference program</li>
@@ -2134,10 +2475,13 @@ def register_participant():
         """
         if participant.email_notifications:
             try:
-                send_notification_email(participant.email, participant.name, welcome_subject, welcome_message)
-                logger.info(f"Welcome email sent to: {participant.email}")
+                entry = notification_outbox_entry('welcome', participant, welcome_subject, welcome_message,
+                                                  f"welcome:{participant.id}")
+                email_outbox.enqueue(**entry)
+                logger.info(f"Welcome email queued for: {participant.email}")
             except Exception as email_error:
-                logger.error(f"Failed to send welcome email: {email_error}")
+                db.session.rollback()
+                logger.error(f"Failed to queue welcome email: {email_error}")
         return jsonify({
             'message': 'Registration successful!',
             'participant': participant.to_dict(),
@@ -2173,6 +2517,10 @@ def update_participant(participant_id):
         participant.updated_at = datetime.utcnow()
         db.session.commit()
         
+        # Drop cached PDFs if a field printed on the certificate changed
+        if any(field in data for field in CERTIFICATE_RENDER_FIELDS):
+            certificate_cache.invalidate(participant.id)
+        
         return jsonify({
             'message': 'Registration updated successfully',
             'participant': participant.to_dict()
@@ -2209,8 +2557,14 @@ def get_participant_dashboard(participant_email):
             Notification.created_at >= datetime.utcnow() - timedelta(days=7)
         ).order_by(Notification.created_at.desc()).limit(5).all()
         
+        check_in_token = None
+        if check_in_tokens.enabled:
+            check_in_token = check_in_tokens.issue(participant.id, participant.certificate_number)
         dashboard_data = {
             'participant': participant.to_dict(),
+            'check_in_token': check_in_token,
+            'check_in_qr_url': (f'/api/check-in/qr/{check_in_token}'
+                                if check_in_token and check_in_tokens.qr_available() else None),
             'registered_sessions': [
                 {
                     'registration': reg.to_dict(),
@@ -2237,6 +2591,7 @@ def get_participant_dashboard(participant_email):
 # ============================================================================
 
 @app.route('/api/programs', methods=['GET'])
+@response_cache.cached('programs')
 def get_programs():
     """Get all conference programs with optional filtering"""
     try:
@@ -2308,6 +2663,8 @@ def create_program():
         
         db.session.add(program)
         db.session.commit()
+        response_cache.invalidate('programs')
+        plan_program_reminder(program)
         
         return jsonify({
             'message': 'Program created successfully',
@@ -2370,6 +2727,9 @@ def update_program(program_id):
         
         program.updated_at = datetime.utcnow()
         db.session.commit()
+        response_cache.invalidate('programs')
+        # Moves the reminder with the program, or drops it when cancelled
+        plan_program_reminder(program)
         
         return jsonify({
             'message': 'Program updated successfully',
@@ -2425,6 +2785,7 @@ def register_for_program(program_id):
         
         db.session.add(registration)
         db.session.commit()
+        response_cache.invalidate('programs')  # registration_count changed
         
         # Send confirmation email
         if participant.email_notifications:
@@ -2446,7 +2807,13 @@ def register_for_program(program_id):
             
             <p>Please arrive on time. You will receive a reminder before the session starts.</p>
             """
-            send_notification_email(participant.email, participant.name, subject, message)
+            try:
+                email_outbox.enqueue(**notification_outbox_entry(
+                    'session_confirmation', participant, subject, message,
+                    f"session_confirmation:{registration.id}"))
+            except Exception as email_error:
+                db.session.rollback()
+                print(f"Error queueing session confirmation email: {email_error}")
         
         return jsonify({
             'message': 'Successfully registered for program',
@@ -2463,6 +2830,7 @@ def register_for_program(program_id):
 # ============================================================================
 
 @app.route('/api/notifications', methods=['GET'])
+@response_cache.cached('notifications')
 def get_notifications():
     """Get all notifications with optional filtering"""
     try:
@@ -2518,6 +2886,7 @@ def create_notification():
         
         db.session.add(notification)
         db.session.commit()
+        response_cache.invalidate('notifications')
         
         # If scheduled for immediate sending
         if scheduled_time <= datetime.utcnow():
@@ -2565,52 +2934,32 @@ def send_notification_now(notification_id):
                 SessionRegistration.attendance_status == 'registered'
             ).all()
         
-        # Send notifications
-        email_sent = 0
-        push_sent = 0
-        email_failed = 0
-        push_failed = 0
+        # Build per-recipient email and push deliveries
+        notification_emails = []
+        push_deliveries = []
         
         for participant in participants:
-            # Send email notification
+            # Queue email notification
             if notification.send_email and participant.email_notifications:
-                try:
-                    send_notification_email(participant.email, participant.name, notification.title, notification.message)
-                    email_sent += 1
-                except:
-                    email_failed += 1
+                notification_emails.append(notification_outbox_entry(
+                    'notification', participant, notification.title, notification.message,
+                    f"notification:{notification.id}:{participant.id}"))
             
-            # Send push notification
+            # Queue push notification
             if notification.send_push and participant.push_notifications and participant.push_subscription:
-                try:
-                    send_push_notification(participant.push_subscription, notification.title, notification.message)
-                    push_sent += 1
-                except:
-                    push_failed += 1
+                push_deliveries.append(push_delivery(participant, notification.title, notification.message))
         
-        # Update notification status
+        # Update notification status; delivery_stats is filled in as the fan-out completes
         notification.status = 'sent'
         notification.sent_at = datetime.utcnow()
-        notification.delivery_stats = json.dumps({
-            'email_sent': email_sent,
-            'email_failed': email_failed,
-            'push_sent': push_sent,
-            'push_failed': push_failed,
-            'total_recipients': len(participants)
-        })
-        
-        db.session.commit()
+        statistics = start_notification_fanout(notification, notification_emails, push_deliveries, len(participants))
+        response_cache.invalidate('notifications')
         
         return jsonify({
-            'message': 'Notification sent successfully',
-            'statistics': {
-                'email_sent': email_sent,
-                'email_failed': email_failed,
-                'push_sent': push_sent,
-                'push_failed': push_failed,
-                'total_recipients': len(participants)
-            }
-        })
+            'message': 'Notification delivery started',
+            'notification_id': notification.id,
+            'statistics': statistics
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -2660,8 +3009,9 @@ def download_certificate(participant_email):
             return jsonify({'error': 'Certificate not available. Conference attendance required.'}), 403
         
         # Generate certificate PDF
-        pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-        if not pdf_path:
+        pdf_bytes = generate_certificate_pdf(participant.name, participant.certificate_type,
+                                             participant.certificate_number, participant.id)
+        if not pdf_bytes:
             return jsonify({'error': 'Failed to generate certificate'}), 500
         
         # Log the download
@@ -2678,19 +3028,7 @@ def download_certificate(participant_email):
         # Return PDF file
         filename = f"MDCAN_BDM_2025_{'Service' if participant.certificate_type == 'service' else 'Certificate'}_{participant.name.replace(' ', '_')}.pdf"
         
-        def remove_file(response):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
-            return response
-        
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
+        return pdf_response(pdf_bytes, filename, as_attachment=True)
         
     except Exception as e:
         return jsonify({'error': f'Certificate download failed: {str(e)}'}), 500
@@ -2705,26 +3043,13 @@ def preview_certificate(participant_email):
             return jsonify({'error': 'Participant not found'}), 404
         
         # Generate certificate PDF
-        pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-        if not pdf_path:
+        pdf_bytes = generate_certificate_pdf(participant.name, participant.certificate_type,
+                                             participant.certificate_number, participant.id)
+        if not pdf_bytes:
             return jsonify({'error': 'Failed to generate certificate preview'}), 500
         
-        def remove_file(response):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
-            return response
-        
         # Return PDF for inline viewing
-        response = send_file(
-            pdf_path,
-            as_attachment=False,
-            mimetype='application/pdf'
-        )
-        response.call_on_close(lambda: remove_file(response))
-        
-        return response
+        return pdf_response(pdf_bytes)
         
     except Exception as e:
         return jsonify({'error': f'Certificate preview failed: {str(e)}'}), 500
@@ -2886,40 +3211,14 @@ def submit_session_feedback(registration_id):
 # ============================================================================
 
 @app.route('/api/reports/conference-summary', methods=['GET'])
+@response_cache.cached('stats', ttl=STATS_CACHE_TTL_SECONDS)
 def get_conference_summary():
     """Get comprehensive conference statistics and summary"""
     try:
-        # Participant statistics
-        total_participants = Participant.query.count()
-        by_type = db.session.query(
-            Participant.registration_type,
-            db.func.count(Participant.id)
-        ).group_by(Participant.registration_type).all()
-        
-        by_status = db.session.query(
-            Participant.registration_status,
-            db.func.count(Participant.id)
-        ).group_by(Participant.registration_status).all()
-        
-        # Program statistics
-        total_programs = ConferenceProgram.query.count()
-        program_types = db.session.query(
-            ConferenceProgram.program_type,
-            db.func.count(ConferenceProgram.id)
-        ).group_by(ConferenceProgram.program_type).all()
-        
-        # Session registration statistics
-        total_registrations = SessionRegistration.query.count()
-        attendance_stats = db.session.query(
-            SessionRegistration.attendance_status,
-            db.func.count(SessionRegistration.id)
-        ).group_by(SessionRegistration.attendance_status).all()
-        
-        # Certificate statistics
-        certificate_stats = db.session.query(
-            Participant.certificate_status,
-            db.func.count(Participant.id)
-        ).group_by(Participant.certificate_status).all()
+        counts = dashboard_counters.read()
+        participants = counts['participants']
+        programs = counts['programs']
+        sessions = counts['session_registrations']
         
         # Top-rated sessions
         top_sessions = db.session.query(
@@ -2934,20 +3233,20 @@ def get_conference_summary():
         
         summary = {
             'participants': {
-                'total': total_participants,
-                'by_type': dict(by_type),
-                'by_status': dict(by_status)
+                'total': participants['total'],
+                'by_type': participants['by_registration_type'],
+                'by_status': participants['by_registration_status']
             },
             'programs': {
-                'total': total_programs,
-                'by_type': dict(program_types)
+                'total': programs['total'],
+                'by_type': programs['by_type']
             },
             'sessions': {
-                'total_registrations': total_registrations,
-                'attendance': dict(attendance_stats)
+                'total_registrations': sessions['total'],
+                'attendance': sessions['by_attendance']
             },
             'certificates': {
-                'by_status': dict(certificate_stats)
+                'by_status': participants['by_certificate_status']
             },
             'feedback': {
                 'top_rated_sessions': [
@@ -2966,6 +3265,35 @@ def get_conference_summary():
         return jsonify({'error': f'Failed to generate conference summary: {str(e)}'}), 500
 
 
+def participant_export_query():
+    """Export rows with registered and attended session counts from one aggregate join"""
+    sessions = sa.select(
+        SessionRegistration.participant_id,
+        db.func.count(SessionRegistration.id).label('registered'),
+        db.func.sum(sa.case((SessionRegistration.attendance_status == 'attended', 1), else_=0)).label('attended')
+    ).group_by(SessionRegistration.participant_id).subquery()
+
+    def yes_no(column):
+        return sa.case((column == sa.true(), 'Yes'), else_='No')
+
+    return sa.select(
+        Participant.name.label('Name'),
+        Participant.email.label('Email'),
+        Participant.phone_number.label('Phone'),
+        Participant.organization.label('Organization'),
+        Participant.position.label('Position'),
+        Participant.registration_type.label('Registration Type'),
+        Participant.registration_status.label('Registration Status'),
+        Participant.certificate_type.label('Certificate Type'),
+        Participant.certificate_status.label('Certificate Status'),
+        Participant.created_at.label('Registration Date'),
+        db.func.coalesce(sessions.c.registered, 0).label('Total Sessions Registered'),
+        db.func.coalesce(sessions.c.attended, 0).label('Total Sessions Attended'),
+        yes_no(Participant.event_attendance).label('Event Attendance'),
+        yes_no(Participant.email_notifications).label('Email Notifications')
+    ).outerjoin(sessions, sessions.c.participant_id == Participant.id).order_by(Participant.id)
+
+
 @app.route('/api/reports/export/<format>', methods=['GET'])
 def export_report(format):
     """Export participant and session data in various formats"""
@@ -2973,71 +3301,26 @@ def export_report(format):
         if format not in ['csv', 'excel']:
             return jsonify({'error': 'Supported formats: csv, excel'}), 400
         
-        # Get participants with session data
-        participants = Participant.query.all()
-        
-        # Prepare data for export
-        export_data = []
-        for participant in participants:
-            # Get session statistics
-            sessions = SessionRegistration.query.filter_by(participant_id=participant.id).all()
-            attended_sessions = [s for s in sessions if s.attendance_status == 'attended']
-            
-            row = {
-                'Name': participant.name,
-                'Email': participant.email,
-                'Phone': participant.phone_number,
-                'Organization': participant.organization,
-                'Position': participant.position,
-                'Registration Type': participant.registration_type,
-                'Registration Status': participant.registration_status,
-                'Certificate Type': participant.certificate_type,
-                'Certificate Status': participant.certificate_status,
-                'Registration Date': participant.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'Total Sessions Registered': len(sessions),
-                'Total Sessions Attended': len(attended_sessions),
-                'Event Attendance': 'Yes' if participant.event_attendance else 'No',
-                'Email Notifications': 'Yes' if participant.email_notifications else 'No'
-            }
-            export_data.append(row)
-        
-        # Create DataFrame
-        df = pd.DataFrame(export_data)
-        
-        # Generate file
+        # One round-trip: participants joined to their per-participant session counts
+        statement = participant_export_query()
+        header = statement_header(statement)
+        rows = stream_rows(db.engine, statement)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         if format == 'csv':
-            filename = f'mdcan_bdm_2025_participants_{timestamp}.csv'
-            filepath = os.path.join(tempfile.gettempdir(), filename)
-            df.to_csv(filepath, index=False)
-            
-            return send_file(
-                filepath,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='text/csv'
-            )
+            # Streamed from a server-side cursor as the rows are fetched
+            return csv_response(f'mdcan_bdm_2025_participants_{timestamp}.csv', header, rows)
             
         elif format == 'excel':
-            filename = f'mdcan_bdm_2025_participants_{timestamp}.xlsx'
-            filepath = os.path.join(tempfile.gettempdir(), filename)
-            
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Participants', index=False)
-                
-                # Add program summary sheet
-                programs = ConferenceProgram.query.all()
-                program_data = [p.to_dict() for p in programs]
-                program_df = pd.DataFrame(program_data)
-                program_df.to_excel(writer, sheet_name='Programs', index=False)
+            # Add program summary sheet
+            programs = ConferenceProgram.query.options(db.selectinload(ConferenceProgram.sessions)).all()
+            program_data = [p.to_dict() for p in programs]
+            program_header = list(program_data[0].keys()) if program_data else []
             
-            return send_file(
-                filepath,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            return xlsx_response(f'mdcan_bdm_2025_participants_{timestamp}.xlsx', [
+                ('Participants', header, rows),
+                ('Programs', program_header, ([row[name] for name in program_header] for row in program_data))
+            ])
             
     except Exception as e:
         return jsonify({'error': f'Export failed: {str(e)}'}), 500
@@ -3131,62 +3414,20 @@ def get_file_details(file_path):
 
 def send_certificate_to_checked_in_participants():
     """Automatically send certificates to participants who checked in"""
-    try:
-        # Get unique participants who checked in at least once
-        checked_in_participants = db.session.query(Participant).join(
-            CheckIn, Participant.id == CheckIn.participant_id
-        ).filter(
-            Participant.certificate_status == 'pending'
-        ).distinct().all()
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for participant in checked_in_participants:
-            try:
-                # Generate certificate PDF
-                pdf_path = generate_certificate_pdf(participant.name, participant.certificate_type)
-                
-                if pdf_path and send_email_with_certificate(participant.name, participant.email, pdf_path, participant.certificate_type):
-                    participant.certificate_status = 'sent'
-                    sent_count += 1
-                    
-                    # Log the successful certificate sending
-                    log_entry = CertificateLog(
-                        participant_id=participant.id,
-                        action='sent',
-                        status='success',
-                        email_subject=f"Your {participant.certificate_type.title()} Certificate - MDCAN BDM 2025",
-                        timestamp=datetime.utcnow()
-                    )
-                    db.session.add(log_entry)
-                else:
-                    participant.certificate_status = 'failed'
-                    failed_count += 1
-            except Exception as e:
-                print(f"Error sending certificate to {participant.name}: {e}")
-                participant.certificate_status = 'failed'
-                failed_count += 1
-                
-                # Log the failed certificate sending
-                log_entry = CertificateLog(
-                    participant_id=participant.id,
-                    action='sent',
-                    status='failed',
-                    error_message=str(e),
-                    timestamp=datetime.utcnow()
-                )
-                db.session.add(log_entry)
-        
-        db.session.commit()
-        return sent_count, failed_count
-    except Exception as e:
-        print(f"Error in bulk certificate sending: {e}")
-        db.session.rollback()
-        return 0, 0
+    # Also runs from the scheduler thread, which has no app context of its own
+    with app.app_context():
+        try:
+            # Claims participants who checked in at least once, skipping any
+            # a concurrent run or an active certificate job already holds
+            return certificate_dispatch.dispatch('checked_in')
+        except Exception as e:
+            print(f"Error in bulk certificate sending: {e}")
+            db.session.rollback()
+            return None
 
 
 @app.route('/api/materials', methods=['GET'])
+@response_cache.cached('materials')
 def get_materials():
     """Get all conference materials with optional filtering by type"""
     try:
@@ -3248,6 +3489,7 @@ def upload_material():
         
         db.session.add(material)
         db.session.commit()
+        response_cache.invalidate('materials')
         
         return jsonify({
             'message': f'{material_type.title()} uploaded successfully',
@@ -3272,6 +3514,7 @@ def delete_material(material_id):
         # Delete database record
         db.session.delete(material)
         db.session.commit()
+        response_cache.invalidate('materials')
         
         return jsonify({'message': f'{material.material_type.title()} deleted successfully'})
     except Exception as e:
@@ -3307,6 +3550,7 @@ def download_material(material_id):
 
 
 @app.route('/api/announcements', methods=['GET'])
+@response_cache.cached('announcements')
 def get_announcements():
     """Get all announcements"""
     try:
@@ -3353,6 +3597,7 @@ def create_announcement():
         
         db.session.add(announcement)
         db.session.commit()
+        response_cache.invalidate('announcements')
         
         # Send notifications if requested
         if announcement.notify_participants and announcement.is_published:
@@ -3375,13 +3620,9 @@ def create_announcement():
                 )
                 db.session.add(notification)
                 
-                # Send emails to participants
-                for participant in participants:
-                    send_notification_email(
-                        participant.email, 
-                        participant.name, 
-                        f"MDCAN BDM 2025 Announcement: {announcement.title}", 
-                        f"""
+                # Queue emails to participants
+                announcement_subject = f"MDCAN BDM 2025 Announcement: {announcement.title}"
+                announcement_message = f"""
                         <div class="highlight">
                             <strong>Important Announcement</strong>
                         </div>
@@ -3394,12 +3635,17 @@ def create_announcement():
                         
                         <p>{f'An attachment is available in the conference portal.' if announcement.attachment_path else ''}</p>
                         """
-                    )
+                announcement_emails = [
+                    notification_outbox_entry('announcement', participant, announcement_subject, announcement_message,
+                                              f"announcement:{announcement.id}:{participant.id}")
+                    for participant in participants
+                ]
                 
                 announcement.notification_sent = True
-                db.session.commit()
+                start_notification_fanout(notification, announcement_emails, [], len(participants))
             except Exception as e:
-                print(f"Error sending announcement notifications: {e}")
+                db.session.rollback()
+                print(f"Error queueing announcement notifications: {e}")
         
         return jsonify({
             'message': 'Announcement created successfully',
@@ -3492,14 +3738,7 @@ def check_in_participant():
         
         # If last day of conference and automatic certificate sending is enabled
         if check_in_day == 6:
-            # Schedule certificate sending at the end of the day
-            # This will run in the background
-            scheduler.add_job(
-                func=send_certificate_to_checked_in_participants,
-                trigger="date",
-                run_date=datetime.utcnow() + timedelta(hours=3),
-                id=f'send_certificates_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}'
-            )
+            schedule_final_day_certificates()
         
         return jsonify({
             'message': f'Participant checked in successfully for day {check_in_day}',
@@ -3511,28 +3750,128 @@ def check_in_participant():
         return jsonify({'error': f'Failed to check in participant: {str(e)}'}), 500
 
 
+def schedule_final_day_certificates():
+    """Schedule certificate sending at the end of the last conference day"""
+    # Joins the pending run if one is already scheduled
+    return certificate_dispatch.request(send_certificate_to_checked_in_participants)
+
+
+@app.route('/api/check-in/batch', methods=['POST'])
+def batch_check_in():
+    """Check in a list of desk scans at once, e.g. the queue of an offline tablet"""
+    try:
+        data = request.json or {}
+        results, summary, new_days = check_in_batch.process(
+            data.get('scans'), defaults=data, ip_address=request.remote_addr)
+        db.session.commit()
+        
+        if 6 in new_days:
+            schedule_final_day_certificates()
+        
+        return jsonify({
+            'message': f"Checked in {summary['checked_in']} of {len(results)} scans",
+            'results': results,
+            'summary': summary
+        }), 200
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error processing batch check-in: {e}")
+        return jsonify({'error': f'Failed to process batch check-in: {str(e)}'}), 500
+
+
+@app.route('/api/check-in/scan', methods=['POST'])
+def scan_check_in():
+    """Check in a participant from the signed token in their QR code"""
+    if not check_in_tokens.enabled:
+        return jsonify({'error': 'QR check-in is not configured on this server'}), 503
+    try:
+        data = request.json or {}
+        if not data.get('token') or not data.get('check_in_day'):
+            return jsonify({'error': 'Token and check-in day are required'}), 400
+        
+        check_in_day = int(data.get('check_in_day'))
+        if check_in_day < 1 or check_in_day > 6:
+            return jsonify({'error': 'Invalid conference day. Must be between 1 and 6'}), 400
+        
+        # Verified in memory: no participant lookup before the insert
+        participant_id, certificate_number = check_in_tokens.verify(data['token'])
+        status, check_in = check_in_batch.record(
+            participant_id, certificate_number, check_in_day,
+            ip_address=request.remote_addr,
+            materials_received=data.get('materials_received', False),
+            verified_by=data.get('verified_by', 'admin'),
+            verification_method='qr',
+            notes=data.get('notes', '')
+        )
+        db.session.commit()
+        
+        if status == 'not_found':
+            # Deleted or renumbered since the code was issued
+            return jsonify({'error': 'Participant not found'}), 404
+        
+        if status == 'checked_in' and check_in_day == 6:
+            schedule_final_day_certificates()
+        
+        return jsonify({
+            'status': status,
+            'participant_id': participant_id,
+            'certificate_number': certificate_number,
+            'check_in_day': check_in_day,
+            'check_in': check_in
+        }), 201 if status == 'checked_in' else 200
+    except InvalidToken as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'check_in_day must be a number'}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error processing check-in scan: {e}")
+        return jsonify({'error': f'Failed to check in participant: {str(e)}'}), 500
+
+
+@app.route('/api/check-in/qr/<token>', methods=['GET'])
+def get_check_in_qr(token):
+    """QR code image of a participant's check-in token"""
+    if not check_in_tokens.enabled:
+        return jsonify({'error': 'QR check-in is not configured on this server'}), 503
+    try:
+        check_in_tokens.verify(token)
+    except InvalidToken as e:
+        return jsonify({'error': str(e)}), 404
+    image = check_in_tokens.qr_png(token)
+    if image is None:
+        return jsonify({'error': 'QR code images are not available on this server'}), 501
+    response = send_file(io.BytesIO(image), mimetype='image/png')
+    # A token's image never changes
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    return response
+
+
 @app.route('/api/check-in/report', methods=['GET'])
+@response_cache.cached('stats', ttl=STATS_CACHE_TTL_SECONDS)
 def get_check_in_report():
     """Get check-in report with statistics"""
     try:
+        counts = dashboard_counters.read()
+        check_ins = counts['check_ins']
+        
         # Get statistics for each day
         stats = []
         for day in range(1, 7):
             day_stats = {
                 'day': day,
                 'date': (datetime(2025, 9, day)).strftime('%Y-%m-%d'),
-                'total_checked_in': CheckIn.query.filter_by(check_in_day=day).count(),
-                'materials_received': CheckIn.query.filter_by(check_in_day=day, materials_received=True).count()
+                'total_checked_in': check_ins['by_day'].get(str(day), 0),
+                'materials_received': check_ins['materials_received'].get(str(day), 0)
             }
             stats.append(day_stats)
             
-        # Get unique participants who checked in at least once
-        unique_participants = db.session.query(Participant).join(
-            CheckIn, Participant.id == CheckIn.participant_id
-        ).distinct().count()
-        
-        # Get participants who never checked in
-        total_participants = Participant.query.count()
+        # Participants who checked in at least once, and those who never did
+        unique_participants = counts['participants']['checked_in']
+        total_participants = counts['participants']['total']
         never_checked_in = total_participants - unique_participants
         
         return jsonify({
@@ -3588,19 +3927,9 @@ def search_participants_for_check_in():
         if not query or len(query) < 3:
             return jsonify({'error': 'Search query must be at least 3 characters'}), 400
             
-        # Search for matching participants
-        participants = Participant.query.filter(
-            (Participant.name.ilike(f'%{query}%')) | 
-            (Participant.email.ilike(f'%{query}%')) | 
-            (Participant.certificate_number.ilike(f'%{query}%'))
-        ).limit(10).all()
-        
+        # Indexed prefix, substring and fuzzy matches, with their check-in days
         results = []
-        for participant in participants:
-            # Get check-in info for this participant
-            check_ins = CheckIn.query.filter_by(participant_id=participant.id).all()
-            checked_in_days = [c.check_in_day for c in check_ins]
-            
+        for participant, checked_in_days in participant_search.search(query, limit=10):
             results.append({
                 'participant': participant.to_dict(),
                 'checked_in_days': checked_in_days,
@@ -3618,27 +3947,65 @@ def search_participants_for_check_in():
 def trigger_certificates_for_checked_in():
     """Manually trigger sending certificates to all checked-in participants"""
     try:
-        sent_count, failed_count = send_certificate_to_checked_in_participants()
+        job = send_certificate_to_checked_in_participants()
+        if job is None:
+            return jsonify({
+                'message': 'No checked-in participants with pending certificates',
+                'sent_count': 0,
+                'failed_count': 0
+            })
         
-        return jsonify({
-            'message': f'Certificate sending triggered for checked-in participants. Sent: {sent_count}, Failed: {failed_count}',
-            'sent_count': sent_count,
-            'failed_count': failed_count
-        })
+        return certificate_job_response(job)
     except Exception as e:
         print(f"Error triggering certificate sending: {e}")
         return jsonify({'error': f'Failed to trigger certificate sending: {str(e)}'}), 500
 
 
+def reconcile_dashboard_counters():
+    """Recount the dashboard counters from the source tables"""
+    try:
+        with app.app_context():
+            dashboard_counters.reconcile()
+    except Exception as e:
+        print(f"Error reconciling dashboard counters: {e}")
+
+
+def sync_program_reminders():
+    """Plan the reminder jobs of programs saved before the scheduler started"""
+    try:
+        # The 15-minute polling job of earlier releases may still be stored
+        try:
+            scheduler.remove_job('program_reminders')
+        except JobLookupError:
+            pass
+        with app.app_context():
+            program_reminders.sync()
+    except Exception as e:
+        print(f"Error planning program reminders: {e}")
+
+
 def init_scheduler():
     """Initialize background scheduler for automatic notifications"""
     try:
-        # Schedule reminder checks every 15 minutes
+        # Program reminders are planned per program when programs are saved;
+        # re-plan them all once when the scheduler starts
         scheduler.add_job(
-            func=send_program_reminder,
+            func=sync_program_reminders,
+            trigger="date",
+            id='sync_program_reminders',
+            replace_existing=True,
+            # Due at import but only stored once a worker serves a request;
+            # however late that is, the sync must still run
+            misfire_grace_time=None
+        )
+        
+        # Recount the dashboard counters to correct any drift
+        scheduler.add_job(
+            func=reconcile_dashboard_counters,
             trigger="interval",
-            minutes=15,
-            id='program_reminders'
+            seconds=COUNTER_RECONCILE_SECONDS,
+            id='reconcile_dashboard_counters',
+            replace_existing=True
         )
         
         print("✅ Scheduler initialized successfully")
@@ -3646,7 +4013,8 @@ def init_scheduler():
         print(f"❌ Failed to initialize scheduler: {e}")
 
 
-# Start scheduler when app starts
+# Register the recurring jobs; they reach the shared job store when the
+# scheduler starts
 init_scheduler()
 
 # Test endpoint to generate a certificate for testing
@@ -3660,27 +4028,12 @@ def generate_test_certificate(cert_type):
     test_name = "Test Participant" if cert_type == 'participation' else "Test Volunteer"
     
     # Generate the certificate
-    pdf_path = generate_certificate_pdf(test_name, cert_type)
-    if not pdf_path:
+    pdf_bytes = generate_certificate_pdf(test_name, cert_type)
+    if not pdf_bytes:
         return jsonify({'error': 'Failed to generate test certificate'}), 500
     
     # Return PDF for inline viewing
-    response = send_file(
-        pdf_path,
-        as_attachment=False,
-        mimetype='application/pdf'
-    )
-    
-    # Add callback to remove the file after sending
-    @after_this_request
-    def cleanup(response):
-        try:
-            os.unlink(pdf_path)
-        except:
-            pass
-        return response
-    
-    return response
+    return pdf_response(pdf_bytes)
 
 # HTML fallback for certificate preview when PDF generation fails
 @app.route('/api/generate-test-certificate-html/<cert_type>', methods=['GET'])
@@ -3693,69 +4046,18 @@ def generate_test_certificate_html(cert_type):
     test_name = "Test Participant" if cert_type == 'participation' else "Test Volunteer"
     
     try:
-        # Get base directory and potential signature file locations
-        base_dir = os.getcwd()
-        
-        possible_directories = [
-            os.path.join(base_dir, 'frontend', 'public'),
-            os.path.join(base_dir, 'public'),
-            os.path.join(base_dir, 'backend', 'static'),
-            os.path.join(base_dir)
-        ]
-        
-        # Search for signature files in potential directories
-        president_signature = None
-        chairman_signature = None
-        mdcan_logo = None
-        coalcity_logo = None
-        
-        for directory in possible_directories:
-            # Check for president signature
-            president_path = os.path.join(directory, 'president-signature.png')
-            if president_signature is None and os.path.exists(president_path):
-                president_signature = '/serve_asset/president-signature.png'
-            
-            # Check for chairman signature
-            chairman_path = os.path.join(directory, 'chairman-signature.png')
-            if chairman_signature is None and os.path.exists(chairman_path):
-                chairman_signature = '/serve_asset/chairman-signature.png'
-            
-            # Check for MDCAN logo
-            mdcan_path = os.path.join(directory, 'mdcan-logo.png')
-            if mdcan_logo is None and os.path.exists(mdcan_path):
-                mdcan_logo = '/serve_asset/mdcan-logo.png'
-            
-            # Check for Coal City logo
-            coalcity_path = os.path.join(directory, 'coalcity-logo.png')
-            if coalcity_logo is None and os.path.exists(coalcity_path):
-                coalcity_logo = '/serve_asset/coalcity-logo.png'
-            
-            # If all found, exit loop
-            if president_signature and chairman_signature and mdcan_logo and coalcity_logo:
-                break
-        
-        # Log signature paths for debugging
-        print(f"MDCAN logo path: {mdcan_logo}")
-        print(f"Coal City logo path: {coalcity_logo}")
-        print(f"President signature path: {president_signature}")
-        print(f"Chairman signature path: {chairman_signature}")
-        
-        # Determine certificate title and content
-        if cert_type == 'service':
-            certificate_title = 'ACKNOWLEDGEMENT OF SERVICE'
-            content_template = Template(SERVICE_CONTENT)
-        else:
-            certificate_title = 'CERTIFICATE OF PARTICIPATION'
-            content_template = Template(PARTICIPATION_CONTENT)
-        
-        # Generate content
-        certificate_content = content_template.render(participant_name=test_name)
-        
-        # Create HTML from template
-        template = Template(CERTIFICATE_HTML)
-        html_content = template.render(
-            certificate_title=certificate_title,
-            certificate_content=certificate_content,
+        # Served through /serve_asset when the registry found the file
+        def asset_url(name):
+            asset = certificate_assets.get(name)
+            return f'/serve_asset/{os.path.basename(asset.path)}' if asset else None
+        
+        president_signature = asset_url('president_signature')
+        chairman_signature = asset_url('chairman_signature')
+        mdcan_logo = asset_url('mdcan_logo')
+        coalcity_logo = asset_url('coalcity_logo')
+        
+        # Create HTML from the precompiled certificate template
+        html_content = certificate_templates.get(cert_type).render(
             participant_name=test_name,
             president_signature=president_signature,
             chairman_signature=chairman_signature,
@@ -3843,6 +4145,33 @@ def generate_test_certificate_html(cert_type):
     except Exception as e:
         print(f"Error generating HTML certificate: {e}")
         return jsonify({'error': f'Failed to generate HTML certificate: {str(e)}'}), 500
+
+@app.route('/api/certificates/templates', methods=['GET'])
+def get_certificate_templates():
+    """List compiled certificate templates and their versions"""
+    return jsonify(certificate_templates.versions())
+
+@app.route('/api/certificates/templates/reload', methods=['POST'])
+def reload_certificate_templates():
+    """Hot-reload certificate templates after CERTIFICATE_TEMPLATE_DIR was edited"""
+    data = request.get_json(silent=True) or {}
+    try:
+        # Sources are only re-read from CERTIFICATE_TEMPLATE_DIR
+        changes = certificate_templates.reload(cert_type=data.get('certificate_type'))
+    except TemplateNotFound as e:
+        return jsonify({'error': f'Unknown certificate type: {e}'}), 404
+    except Exception as e:
+        print(f"Error reloading certificate templates: {e}")
+        return jsonify({'error': f'Failed to reload certificate templates: {str(e)}'}), 400
+    
+    return jsonify({
+        'message': 'Certificate templates reloaded',
+        'templates': {
+            cert_type: {'previous_version': old, 'version': new, 'changed': old != new}
+            for cert_type, (old, new) in changes.items()
+        }
+    })
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
@@ -0,0 +1,384 @@
+"""
+Set-based bulk import of participant rows.
+
+Uploads used to check every row for an existing email with its own query and
+insert (or flush) rows one at a time, so a 20k-row delegate list took tens of
+thousands of round-trips.  ``BulkImporter`` takes rows that were already
+normalised and validated by the caller, resolves duplicates for each unique
+column with batched ``IN (...)`` lookups plus an in-memory check within the
+upload, and inserts the rest in chunks with a single executemany per chunk.
+
+Re-uploads of a master list can run in upsert mode instead: rows are matched
+on their normalised email, diffed against the stored columns, and new or
+changed rows are written with one ``INSERT ... ON CONFLICT DO UPDATE`` per
+chunk (executemany INSERT plus UPDATE by id where the database or table
+cannot do that); unchanged rows cost nothing but the lookup.
+
+Progress is reported as a stream of events (one per rejected row, then a
+summary) so endpoints can return the full per-row error report as it is
+produced, either collected into JSON or streamed as NDJSON.
+
+Large spreadsheets are imported chunk by chunk with ``run_chunks`` and
+``read_spreadsheet_chunks`` (openpyxl read-only mode for .xlsx, pandas
+``chunksize`` for CSV): each chunk is validated, deduplicated and inserted as
+it is read, and only the unique keys seen so far are kept between chunks, so
+memory stays flat however large the upload is.
+
+With ``counters`` the dashboard counters are adjusted from the rows each chunk
+wrote (their stored values are fetched with the upsert lookup) instead of
+being flagged for a full recount.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT executemany / commit
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+# Values per IN (...) duplicate lookup, below every driver's parameter limit
+IMPORT_LOOKUP_BATCH = int(os.environ.get('IMPORT_LOOKUP_BATCH', 5000))
+# Spreadsheet rows read, validated and inserted at a time when streaming
+IMPORT_READ_CHUNK_ROWS = int(os.environ.get('IMPORT_READ_CHUNK_ROWS', 5000))
+# Row errors kept in a collected (non-streamed) import report
+IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('IMPORT_MAX_REPORTED_ERRORS', 1000))
+
+
+def _db_error(error):
+    """Short message for a failed insert, without the echoed SQL"""
+    return str(getattr(error, 'orig', None) or error).strip().splitlines()[0]
+
+
+def normalize_key(value):
+    """Form in which emails (and other case-insensitive keys) are matched"""
+    return str(value).strip().lower() if value else value
+
+
+def _same(old, new):
+    """Column comparison treating empty strings and NULL alike"""
+    return (None if old == '' else old) == (None if new == '' else new)
+
+
+class BulkImporter:
+    """Deduplicate and insert (or upsert) normalised rows into one model's table.
+
+    In ``'insert'`` mode rows whose unique keys already exist are rejected.
+    In ``'upsert'`` mode rows are matched on the first unique key; matching
+    rows have the ``update_columns`` they provide updated when they differ,
+    and are otherwise counted as unchanged.
+    """
+
+    def __init__(self, db, model, unique_keys=('email',), chunk_size=IMPORT_CHUNK_SIZE,
+                 lookup_batch=IMPORT_LOOKUP_BATCH, serialize=None, mode='insert',
+                 update_columns=(), casefold_keys=('email',), counters=None):
+        if mode not in ('insert', 'upsert'):
+            raise ValueError(f'Unknown import mode: {mode}')
+        self.db = db
+        self.model = model
+        self.table = model.__table__
+        self.unique_keys = tuple(unique_keys)
+        self.chunk_size = max(1, chunk_size)
+        self.lookup_batch = max(1, lookup_batch)
+        # With ``serialize`` inserted rows are returned and kept as
+        # ``serialize(instance)``, taken before the commit expires them
+        self.serialize = serialize
+        self.mode = mode
+        self.update_columns = tuple(update_columns)
+        self.casefold_keys = set(casefold_keys)
+        self.counters = counters
+        self._options = counters.applied_options if counters is not None else {}
+        self.inserted = []
+        self.counts = {'received': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0, 'failed': 0}
+
+    def _key(self, key, value):
+        return normalize_key(value) if key in self.casefold_keys else value
+
+    def _lookup(self, key, values, columns):
+        """Rows whose ``key`` (case-folded if configured) is in ``values``"""
+        column = self.table.c[key]
+        match = sa.func.lower(column) if key in self.casefold_keys else column
+        values = list(values)
+        for start in range(0, len(values), self.lookup_batch):
+            batch = values[start:start + self.lookup_batch]
+            yield from self.db.session.execute(sa.select(*columns).where(match.in_(batch))).mappings()
+
+    def existing_values(self, key, values):
+        """Values of ``key`` already present in the table (case-folded if configured)"""
+        return {self._key(key, row[key]) for row in self._lookup(key, values, [self.table.c[key]])}
+
+    def existing_rows(self, key, values):
+        """Current ``update_columns`` (and counted columns) of the rows matching ``values``, by matched key"""
+        columns = {'id', key, *self.update_columns}
+        if self.counters is not None:
+            columns |= self.counters.columns(self.table.name)
+        rows = self._lookup(key, values, [self.table.c[name] for name in columns])
+        return {self._key(key, row[key]): row for row in rows}
+
+    def run(self, rows, rejected=()):
+        """Import ``(row_number, values)`` pairs; yields error events, then a summary.
+
+        ``rejected`` are ``(row_number, error)`` pairs the caller's validation
+        already failed; they are reported first.
+        """
+        return self.run_chunks([(rows, rejected)], progress=False)
+
+    def run_chunks(self, chunks, progress=True):
+        """Import ``(rows, rejected)`` chunks as they are produced.
+
+        Yields the error events of each chunk followed, with ``progress``, by a
+        ``{'progress': ...}`` event, and finally the summary.
+        """
+        started = time.monotonic()
+        seen = {key: set() for key in self.unique_keys}
+        for rows, rejected in chunks:
+            yield from self._import_chunk(list(rows), list(rejected), seen)
+            if progress:
+                yield {'progress': {**self.counts, 'elapsed_seconds': round(time.monotonic() - started, 3)}}
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Bulk {self.mode} into {self.table.name}: {self.counts['added']} added, "
+                    f"{self.counts['updated']} updated, {self.counts['failed']} failed in {elapsed:.2f}s")
+        yield {'summary': {**self.counts, 'duration_seconds': round(elapsed, 3)}}
+
+    def _import_chunk(self, rows, rejected, seen):
+        self.counts['received'] += len(rows) + len(rejected)
+
+        for row, error in rejected:
+            self.counts['failed'] += 1
+            yield {'row': row, 'error': error}
+
+        # Only the match key is checked when upserting; other unique columns
+        # are left to the database and reported per row if they conflict
+        keys = self.unique_keys[:1] if self.mode == 'upsert' else self.unique_keys
+        for key in keys:
+            label = key.replace('_', ' ').capitalize()
+            candidates = {self._key(key, values[key]) for _, values in rows if values.get(key)}
+            existing = self.existing_values(key, candidates) if self.mode == 'insert' else set()
+            kept = []
+            for row, values in rows:
+                value = self._key(key, values.get(key))
+                if value and value in existing:
+                    error = f'{label} already exists'
+                elif value and value in seen[key]:
+                    error = f'Duplicate {key.replace("_", " ")} in upload'
+                else:
+                    if value:
+                        seen[key].add(value)
+                    kept.append((row, values))
+                    continue
+                self.counts['duplicates'] += 1
+                self.counts['failed'] += 1
+                yield {'row': row, 'error': error}
+            rows = kept
+
+        if self.mode == 'upsert':
+            rows = self._diff(rows)
+
+        for start in range(0, len(rows), self.chunk_size):
+            yield from self._write_chunk(rows[start:start + self.chunk_size])
+
+    def _diff(self, rows):
+        """Pair rows with the stored row they update; drop unchanged ones"""
+        key = self.unique_keys[0]
+        current = self.existing_rows(key, {self._key(key, values[key]) for _, values in rows if values.get(key)})
+        changes = []
+        for row, values in rows:
+            match = current.get(self._key(key, values.get(key)))
+            if match is None:
+                changes.append((row, values, None))
+            elif any(not _same(match[column], values[column]) for column in self.update_columns if column in values):
+                # Keep the stored spelling of the key so the conflict target matches
+                changes.append((row, {**values, key: match[key]}, match))
+            else:
+                self.counts['unchanged'] += 1
+        return changes
+
+    def _write_chunk(self, chunk):
+        mark = len(self.inserted)
+        try:
+            self._write(chunk)
+            self.db.session.commit()
+            self._count_written(chunk)
+            return
+        except sa.exc.SQLAlchemyError as e:
+            self.db.session.rollback()
+            del self.inserted[mark:]
+            logger.warning(f"Bulk {self.mode} chunk of {len(chunk)} rows failed, retrying row by row: {_db_error(e)}")
+
+        # Only reached when the chunk hit a constraint: find the offending rows
+        for item in chunk:
+            mark = len(self.inserted)
+            try:
+                self._write([item])
+                self.db.session.commit()
+                self._count_written([item])
+            except sa.exc.SQLAlchemyError as e:
+                self.db.session.rollback()
+                del self.inserted[mark:]
+                self.counts['failed'] += 1
+                yield {'row': item[0], 'error': _db_error(e)}
+
+    def _count_written(self, chunk):
+        if self.mode == 'insert':
+            self.counts['added'] += len(chunk)
+            return
+        updated = sum(1 for _, _, match in chunk if match is not None)
+        self.counts['updated'] += updated
+        self.counts['added'] += len(chunk) - updated
+
+    def _write(self, chunk):
+        if self.mode == 'insert':
+            self._insert([values for _, values in chunk])
+            self._count([(None, values) for _, values in chunk])
+            return
+        statement = self._on_conflict_statement()
+        if statement is not None:
+            # One INSERT ... ON CONFLICT DO UPDATE for new and changed rows alike
+            self.db.session.execute(statement, [values for _, values, _ in chunk], execution_options=self._options)
+        else:
+            inserts = [values for _, values, match in chunk if match is None]
+            updates = [{**{column: values[column] for column in self.update_columns if column in values},
+                        '_id': match['id']}
+                       for _, values, match in chunk if match is not None]
+            for _, group in self._group_by_columns(inserts):
+                self.db.session.execute(sa.insert(self.table), group, execution_options=self._options)
+            for columns, group in self._group_by_columns(updates):
+                self.db.session.execute(
+                    sa.update(self.table)
+                    .where(self.table.c.id == sa.bindparam('_id'))
+                    .values({column: sa.bindparam(column) for column in columns}),
+                    group,
+                    execution_options=self._options
+                )
+        self._count([
+            (None, values) if match is None else
+            (dict(match), {column: values[column] for column in self.update_columns if column in values})
+            for _, values, match in chunk
+        ])
+
+    def _count(self, changes):
+        if self.counters is not None:
+            self.counters.apply(self.db.session, self.table.name, changes)
+
+    @staticmethod
+    def _group_by_columns(records):
+        # executemany needs the same parameters in every record of a batch
+        groups = {}
+        for params in records:
+            groups.setdefault(tuple(sorted(params)), []).append(params)
+        return [(tuple(column for column in columns if column != '_id'), group) for columns, group in groups.items()]
+
+    def _on_conflict_statement(self):
+        """``INSERT ... ON CONFLICT (key) DO UPDATE`` where the database supports it"""
+        key = self.unique_keys[0]
+        if not self.table.c[key].unique:
+            return None
+        dialect = self.db.session.get_bind().dialect
+        if dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= (3, 24):
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+        statement = insert(self.table)
+        excluded = statement.excluded
+        updates = {column: excluded[column] for column in self.update_columns}
+        if 'updated_at' in self.table.c and 'updated_at' not in updates:
+            updates['updated_at'] = datetime.utcnow()
+        return statement.on_conflict_do_update(
+            index_elements=[key],
+            set_=updates,
+            where=sa.or_(*[self.table.c[column].is_distinct_from(excluded[column])
+                           for column in self.update_columns])
+        )
+
+    def _insert(self, records):
+        statement = sa.insert(self.model)
+        if self.serialize is not None:
+            instances = self.db.session.scalars(statement.returning(self.model), records,
+                                                execution_options=self._options).all()
+            self.inserted.extend(self.serialize(instance) for instance in instances)
+        else:
+            self.db.session.execute(statement, records, execution_options=self._options)
+
+
+def collect_import(events, max_errors=IMPORT_MAX_REPORTED_ERRORS):
+    """Drain an import event stream into ``(errors, summary)``, keeping the first ``max_errors`` errors"""
+    errors = []
+    summary = {}
+    for event in events:
+        if 'summary' in event:
+            summary = event['summary']
+        elif 'row' in event and len(errors) < max_errors:
+            errors.append(event)
+    return errors, summary
+
+
+def stream_import(events, transform=None):
+    """NDJSON response emitting each import event as it is produced"""
+    def generate():
+        for event in events:
+            if transform is not None:
+                event = transform(event)
+            yield json.dumps(event, default=str) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def wants_stream(request):
+    """Whether the client asked for the streamed NDJSON import report"""
+    return (request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+
+def read_spreadsheet_chunks(fileobj, filename, chunk_size=IMPORT_READ_CHUNK_ROWS):
+    """Yield an uploaded sheet as DataFrames of at most ``chunk_size`` rows.
+
+    The index of every chunk is the row's position in the sheet (0 for the
+    first row after the header), so row numbers stay correct across chunks.
+    """
+    import pandas as pd
+
+    name = filename.lower()
+    if name.endswith('.csv'):
+        yield from pd.read_csv(fileobj, dtype=str, chunksize=chunk_size)
+    elif name.endswith('.xlsx'):
+        yield from _read_xlsx_chunks(fileobj, chunk_size)
+    else:
+        # Legacy .xls workbooks cannot be read incrementally
+        yield pd.read_excel(fileobj)
+
+
+def _read_xlsx_chunks(fileobj, chunk_size):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value) if value is not None else f'unnamed: {i}' for i, value in enumerate(header)]
+        width = len(columns)
+        batch = []
+        index = []
+        for position, values in enumerate(rows):
+            if all(value is None for value in values):
+                continue
+            batch.append((tuple(values) + (None,) * width)[:width])
+            index.append(position)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=columns, index=index)
+                batch = []
+                index = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=index)
+    finally:
+        workbook.close()
@@ -0,0 +1,420 @@
+"""
+Background job engine for bulk certificate runs.
+
+Bulk sends used to render and email every participant inside one HTTP
+request, which exceeds gunicorn's worker timeout and blocks a sync worker for
+the whole run.  Jobs created here return immediately; a runner thread feeds
+participants to a bounded thread pool and checkpoints every participant's
+outcome, so progress can be polled, a job can be cancelled and resumed, and a
+job whose process died is picked up again from the first unfinished
+participant.
+
+Job ownership is claimed with a single conditional UPDATE, so only one
+process runs a job at a time even with several gunicorn workers.
+``submit_unclaimed`` leaves out participants that an active job of the same
+type still has pending, so overlapping bulk sends never queue the same
+certificate twice.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Engine configuration (overridable per deployment)
+BULK_JOB_CONCURRENCY = int(os.environ.get('BULK_JOB_CONCURRENCY', 2))
+BULK_JOB_MAX_CONCURRENCY = int(os.environ.get('BULK_JOB_MAX_CONCURRENCY', 8))
+BULK_JOB_STALE_SECONDS = int(os.environ.get('BULK_JOB_STALE_SECONDS', 300))
+BULK_JOB_RECOVERY_INTERVAL = int(os.environ.get('BULK_JOB_RECOVERY_INTERVAL', 60))
+
+JOB_STATUSES = ['queued', 'running', 'cancelled', 'completed', 'failed']
+ITEM_STATUSES = ['pending', 'succeeded', 'failed', 'skipped']
+
+
+class JobStateError(Exception):
+    """Raised when a job cannot move to the requested state"""
+
+
+def create_bulk_job_models(db):
+    """Define the job and per-participant checkpoint tables on ``db``"""
+
+    class BulkJob(db.Model):
+        __tablename__ = 'bulk_jobs'
+
+        id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+        job_type = db.Column(db.String(50), nullable=False, index=True)
+        status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+        params = db.Column(db.Text)  # JSON options passed to the item handler
+        concurrency = db.Column(db.Integer, nullable=False, default=BULK_JOB_CONCURRENCY)
+
+        # Progress counters, updated with every checkpoint
+        total = db.Column(db.Integer, nullable=False, default=0)
+        processed = db.Column(db.Integer, nullable=False, default=0)
+        succeeded = db.Column(db.Integer, nullable=False, default=0)
+        failed = db.Column(db.Integer, nullable=False, default=0)
+        skipped = db.Column(db.Integer, nullable=False, default=0)
+        processed_at_start = db.Column(db.Integer, nullable=False, default=0)
+
+        # Ownership and liveness
+        owner = db.Column(db.String(100))
+        heartbeat_at = db.Column(db.DateTime)
+        last_error = db.Column(db.Text)
+
+        created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+        created_by = db.Column(db.String(100), default='admin')
+        started_at = db.Column(db.DateTime)
+        finished_at = db.Column(db.DateTime)
+
+        __table_args__ = (
+            db.CheckConstraint(status.in_(JOB_STATUSES), name='valid_bulk_job_status'),
+        )
+
+        def to_dict(self):
+            now = datetime.utcnow()
+            run_end = self.finished_at or now
+            elapsed = (run_end - self.started_at).total_seconds() if self.started_at else 0
+            run_processed = self.processed - (self.processed_at_start or 0)
+            throughput = run_processed / elapsed if elapsed > 0 else 0
+            remaining = max(self.total - self.processed, 0)
+            return {
+                'id': self.id,
+                'job_type': self.job_type,
+                'status': self.status,
+                'params': json.loads(self.params) if self.params else {},
+                'concurrency': self.concurrency,
+                'total': self.total,
+                'processed': self.processed,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'skipped': self.skipped,
+                'remaining': remaining,
+                'progress_percent': round(100.0 * self.processed / self.total, 1) if self.total else 100.0,
+                'throughput_per_minute': round(throughput * 60, 2),
+                'eta_seconds': round(remaining / throughput) if throughput and self.status == 'running' else None,
+                'owner': self.owner,
+                'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+                'last_error': self.last_error,
+                'created_at': self.created_at.isoformat() if self.created_at else None,
+                'created_by': self.created_by,
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+    class BulkJobItem(db.Model):
+        __tablename__ = 'bulk_job_items'
+
+        id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+        job_id = db.Column(db.Integer, db.ForeignKey('bulk_jobs.id'), nullable=False, index=True)
+        participant_id = db.Column(db.Integer, nullable=False, index=True)
+        status = db.Column(db.String(20), nullable=False, default='pending')
+        attempts = db.Column(db.Integer, nullable=False, default=0)
+        error = db.Column(db.Text)
+        updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+        __table_args__ = (
+            db.UniqueConstraint('job_id', 'participant_id', name='unique_job_participant'),
+            db.CheckConstraint(status.in_(ITEM_STATUSES), name='valid_bulk_job_item_status'),
+            db.Index('idx_bulk_job_items_job_status', 'job_id', 'status'),
+        )
+
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'job_id': self.job_id,
+                'participant_id': self.participant_id,
+                'status': self.status,
+                'attempts': self.attempts,
+                'error': self.error,
+                'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            }
+
+    return BulkJob, BulkJobItem
+
+
+class BulkJobEngine:
+    """Runs bulk jobs in background threads with per-participant checkpoints"""
+
+    def __init__(self, app, db, job_model, item_model, concurrency=BULK_JOB_CONCURRENCY,
+                 stale_seconds=BULK_JOB_STALE_SECONDS):
+        self.app = app
+        self.db = db
+        self.Job = job_model
+        self.Item = item_model
+        self.default_concurrency = concurrency
+        self.stale_seconds = stale_seconds
+        self.handlers = {}
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._running = {}
+        self._pid = None
+        self._last_recovery = 0
+
+        # Recovery has to happen in the serving process, not a preload master
+        app.before_request(self._maybe_recover)
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def register(self, job_type, handler):
+        """Register ``handler(participant_id, params)`` for a job type.
+
+        The handler runs inside an app context and returns ``'succeeded'`` or
+        ``'skipped'`` (``None`` means succeeded); raising marks the item failed.
+        """
+        self.handlers[job_type] = handler
+
+    def submit(self, job_type, participant_ids, params=None, concurrency=None, created_by='admin'):
+        """Create a job for the given participants and start it in the background"""
+        if job_type not in self.handlers:
+            raise JobStateError(f'Unknown job type: {job_type}')
+        concurrency = max(1, min(int(concurrency or self.default_concurrency), BULK_JOB_MAX_CONCURRENCY))
+        participant_ids = list(dict.fromkeys(participant_ids))
+
+        job = self.Job(
+            job_type=job_type,
+            status='queued',
+            params=json.dumps(params or {}),
+            concurrency=concurrency,
+            total=len(participant_ids),
+            created_by=created_by
+        )
+        self.db.session.add(job)
+        self.db.session.flush()
+        if participant_ids:
+            now = datetime.utcnow()
+            self.db.session.execute(
+                self.Item.__table__.insert(),
+                [{'job_id': job.id, 'participant_id': pid, 'status': 'pending', 'attempts': 0, 'updated_at': now}
+                 for pid in participant_ids]
+            )
+        self.db.session.commit()
+
+        self._start(job.id)
+        return job
+
+    def active_participants(self, job_type):
+        """Select of the participants pending in a queued or running job of ``job_type``"""
+        Job, Item = self.Job, self.Item
+        return sa.select(Item.participant_id).join(Job, Job.id == Item.job_id).where(
+            Job.job_type == job_type,
+            Job.status.in_(['queued', 'running']),
+            Item.status == 'pending'
+        )
+
+    def submit_unclaimed(self, job_type, statement, params=None, concurrency=None, created_by='admin'):
+        """Submit the participants selected by ``statement`` that no active job of the type holds.
+
+        ``statement`` selects participant ids only.  The rows are claimed with
+        ``FOR UPDATE SKIP LOCKED`` and the job's items are written in the same
+        transaction, so concurrent submits in other processes skip them;
+        submits within this process (and on SQLite, which ignores row locks)
+        are serialized.  Returns the job, or None when nobody is left.
+        """
+        participant_id = statement.selected_columns[0]
+        statement = statement.where(participant_id.not_in(self.active_participants(job_type))).with_for_update(
+            of=participant_id.table, skip_locked=True)
+        with self._submit_lock:
+            participant_ids = self.db.session.execute(statement).scalars().all()
+            if not participant_ids:
+                self.db.session.commit()
+                return None
+            return self.submit(job_type, participant_ids, params=params, concurrency=concurrency,
+                               created_by=created_by)
+
+    def cancel(self, job_id):
+        """Stop a job after its in-flight participants finish"""
+        updated = self.Job.query.filter(
+            self.Job.id == job_id,
+            self.Job.status.in_(['queued', 'running'])
+        ).update({'status': 'cancelled', 'finished_at': datetime.utcnow()}, synchronize_session=False)
+        self.db.session.commit()
+        if not updated:
+            raise JobStateError('Only queued or running jobs can be cancelled')
+        return self.db.session.get(self.Job, job_id)
+
+    def resume(self, job_id, retry_failed=False):
+        """Continue a cancelled, failed or abandoned job from its checkpoint"""
+        job = self.db.session.get(self.Job, job_id)
+        if job is None:
+            raise JobStateError('Job not found')
+        if job.status == 'running' and not self._is_stale(job):
+            raise JobStateError('Job is already running')
+        if job.status == 'completed' and not (retry_failed and job.failed):
+            raise JobStateError('Job has already completed')
+
+        if retry_failed and job.failed:
+            retried = self.Item.query.filter_by(job_id=job_id, status='failed').update(
+                {'status': 'pending', 'error': None}, synchronize_session=False)
+            job.failed -= retried
+            job.processed -= retried
+        job.status = 'queued'
+        job.finished_at = None
+        job.last_error = None
+        self.db.session.commit()
+
+        self._start(job_id)
+        return job
+
+    def get(self, job_id):
+        return self.db.session.get(self.Job, job_id)
+
+    def failures(self, job_id, limit=50):
+        """Return the most recent failed items of a job"""
+        items = self.Item.query.filter_by(job_id=job_id, status='failed').order_by(
+            self.Item.updated_at.desc()).limit(limit).all()
+        return [item.to_dict() for item in items]
+
+    def recent(self, limit=20):
+        return self.Job.query.order_by(self.Job.created_at.desc()).limit(limit).all()
+
+    def _is_stale(self, job):
+        return not job.heartbeat_at or job.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+
+    def _claim(self, job_id):
+        """Atomically take ownership of a queued or abandoned job"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.stale_seconds)
+        claimed = self.Job.query.filter(
+            self.Job.id == job_id,
+            sa.or_(
+                self.Job.status == 'queued',
+                sa.and_(self.Job.status == 'running',
+                             sa.or_(self.Job.heartbeat_at.is_(None), self.Job.heartbeat_at < stale_before))
+            )
+        ).update({
+            'status': 'running',
+            'owner': self.owner,
+            'heartbeat_at': now,
+            'started_at': now,
+            'processed_at_start': self.Job.processed
+        }, synchronize_session=False)
+        self.db.session.commit()
+        return claimed == 1
+
+    def _start(self, job_id):
+        if not self._claim(job_id):
+            return False
+        thread = threading.Thread(target=self._run, args=(job_id,), name=f'bulk-job-{job_id}', daemon=True)
+        with self._lock:
+            self._running[job_id] = thread
+        thread.start()
+        logger.info(f"Bulk job {job_id} started by {self.owner}")
+        return True
+
+    def _maybe_recover(self):
+        if self._pid == os.getpid() and time.monotonic() - self._last_recovery < BULK_JOB_RECOVERY_INTERVAL:
+            return
+        self._pid = os.getpid()
+        self._last_recovery = time.monotonic()
+        try:
+            self.recover()
+        except Exception as e:
+            self.db.session.rollback()
+            logger.warning(f"Bulk job recovery skipped: {e}")
+
+    def recover(self):
+        """Restart queued jobs and jobs whose owning process stopped heartbeating"""
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        candidates = self.Job.query.filter(
+            sa.or_(
+                self.Job.status == 'queued',
+                sa.and_(self.Job.status == 'running',
+                             sa.or_(self.Job.heartbeat_at.is_(None), self.Job.heartbeat_at < stale_before))
+            )
+        ).with_entities(self.Job.id).all()
+        resumed = [job_id for (job_id,) in candidates if job_id not in self._running and self._start(job_id)]
+        if resumed:
+            logger.info(f"Recovered bulk jobs: {resumed}")
+        return resumed
+
+    def _run_item(self, job_type, participant_id, params):
+        with self.app.app_context():
+            try:
+                outcome = self.handlers[job_type](participant_id, params) or 'succeeded'
+                return outcome, None
+            except Exception as e:
+                self.db.session.rollback()
+                return 'failed', str(e)
+
+    def _checkpoint(self, job_id, item_id, outcome, error):
+        now = datetime.utcnow()
+        Job = self.Job
+        self.Item.query.filter_by(id=item_id).update({
+            'status': outcome,
+            'error': error,
+            'attempts': self.Item.attempts + 1,
+            'updated_at': now
+        }, synchronize_session=False)
+        counter = getattr(Job, outcome)
+        Job.query.filter_by(id=job_id).update({
+            'processed': Job.processed + 1,
+            outcome: counter + 1,
+            'heartbeat_at': now
+        }, synchronize_session=False)
+        self.db.session.commit()
+
+    def _still_owned(self, job_id):
+        row = self.Job.query.filter_by(id=job_id).with_entities(self.Job.status, self.Job.owner).first()
+        return row is not None and row.status == 'running' and row.owner == self.owner
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                job = self.db.session.get(self.Job, job_id)
+                job_type = job.job_type
+                concurrency = job.concurrency or self.default_concurrency
+                params = json.loads(job.params) if job.params else {}
+                self.db.session.commit()
+
+                with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f'bulk-job-{job_id}') as pool:
+                    while self._still_owned(job_id):
+                        batch = self.Item.query.filter_by(job_id=job_id, status='pending').order_by(
+                            self.Item.id).limit(concurrency * 2).with_entities(
+                            self.Item.id, self.Item.participant_id).all()
+                        self.db.session.commit()
+                        if not batch:
+                            self.Job.query.filter_by(id=job_id, status='running').update(
+                                {'status': 'completed', 'finished_at': datetime.utcnow()},
+                                synchronize_session=False)
+                            self.db.session.commit()
+                            logger.info(f"Bulk job {job_id} completed")
+                            break
+
+                        futures = {
+                            pool.submit(self._run_item, job_type, participant_id, params): item_id
+                            for item_id, participant_id in batch
+                        }
+                        for future in as_completed(futures):
+                            outcome, error = future.result()
+                            if outcome not in ('succeeded', 'failed', 'skipped'):
+                                outcome = 'succeeded'
+                            self._checkpoint(job_id, futures[future], outcome, error)
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Bulk job {job_id} failed: {e}", exc_info=True)
+                try:
+                    self.Job.query.filter_by(id=job_id, status='running').update(
+                        {'status': 'failed', 'last_error': str(e)[:2000], 'finished_at': datetime.utcnow()},
+                        synchronize_session=False)
+                    self.db.session.commit()
+                except Exception:
+                    self.db.session.rollback()
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+
+    def stats(self):
+        return {
+            'running_here': sorted(self._running),
+            'default_concurrency': self.default_concurrency,
+            'stale_seconds': self.stale_seconds
+        }
@@ -0,0 +1,211 @@
+"""
+Certificate asset registry.
+
+Signatures and logos used to be located on every render by probing a list of
+candidate directories with ``os.path.exists``, and minimal_app base64-encoded
+them separately in every worker.  ``CertificateAssetRegistry`` resolves each
+asset once at startup, validates that it is a non-empty image, hashes it and
+keeps its base64 and data-URI encodings.  Renders then only read an immutable
+in-memory snapshot.
+
+Loaded at import time, the snapshot is inherited by gunicorn workers forked
+from a ``preload_app`` master instead of being rebuilt per worker.
+``reload()`` swaps in a fresh snapshot and touches a marker file; other
+workers notice the marker at most every ``ASSET_RELOAD_CHECK_SECONDS`` and
+reload too.
+"""
+
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# Reload coordination between worker processes (overridable per deployment)
+ASSET_RELOAD_MARKER = os.environ.get(
+    'CERTIFICATE_ASSET_RELOAD_MARKER', os.path.join(tempfile.gettempdir(), 'mdcan-certificate-assets.reload'))
+ASSET_RELOAD_CHECK_SECONDS = int(os.environ.get('CERTIFICATE_ASSET_RELOAD_CHECK_SECONDS', 30))
+
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def sniff_image_type(data, path):
+    """MIME type of image bytes, or None when they are not a usable image.
+
+    PNG, JPEG and GIF files must carry their magic number whatever the file is
+    called; other image types (SVG, WebP, ...) are accepted by file name.
+    """
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    guessed, _ = mimetypes.guess_type(path)
+    if not guessed or not guessed.startswith('image/'):
+        return None
+    if guessed in {mime_type for _, mime_type in _IMAGE_SIGNATURES}:
+        return None
+    return guessed
+
+
+class CertificateAsset:
+    """One resolved, validated and pre-encoded image"""
+
+    __slots__ = ('name', 'path', 'size', 'sha1', 'mime_type', 'base64', 'data_uri')
+
+    def __init__(self, name, path, data, mime_type):
+        self.name = name
+        self.path = path
+        self.size = len(data)
+        self.sha1 = hashlib.sha1(data).hexdigest()
+        self.mime_type = mime_type
+        self.base64 = base64.b64encode(data).decode('ascii')
+        self.data_uri = f'data:{mime_type};base64,{self.base64}'
+
+    def to_dict(self):
+        return {'path': self.path, 'size': self.size, 'sha1': self.sha1, 'mime_type': self.mime_type}
+
+
+class CertificateAssetRegistry:
+    """Immutable snapshot of certificate images, resolved once and reloadable"""
+
+    def __init__(self, reload_marker=ASSET_RELOAD_MARKER, check_interval=ASSET_RELOAD_CHECK_SECONDS):
+        self.reload_marker = reload_marker
+        self.check_interval = check_interval
+        self.version = None
+        self.loaded_at = None
+        self._specs = {}
+        self._assets = MappingProxyType({})
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._marker_mtime = self._read_marker_mtime()
+        self._next_check = 0
+
+    def define(self, name, candidates, fallback=None, required=False):
+        """Declare an asset by its candidate paths, in order of preference.
+
+        ``fallback`` is the path reported when no candidate is usable.
+        """
+        self._specs[name] = (tuple(candidates), fallback, required)
+
+    def on_reload(self, callback):
+        """Call ``callback(registry)`` whenever a load changes any asset"""
+        self._listeners.append(callback)
+
+    def _resolve(self, name, candidates, required):
+        for path in candidates:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            mime_type = sniff_image_type(data, path)
+            if not data or mime_type is None:
+                logger.warning(f"Skipping certificate asset {name} at {path}: not a readable image")
+                continue
+            return CertificateAsset(name, path, data, mime_type)
+        log = logger.error if required else logger.warning
+        log(f"Certificate asset {name} not found in {len(candidates)} candidate paths")
+        return None
+
+    def load(self):
+        """Resolve every defined asset and swap in the new snapshot.
+
+        Returns ``{name: (old_sha1, new_sha1)}`` for assets that changed.
+        """
+        with self._lock:
+            assets = {}
+            for name, (candidates, fallback, required) in self._specs.items():
+                asset = self._resolve(name, candidates, required)
+                if asset is not None:
+                    assets[name] = asset
+
+            changes = {}
+            for name in self._specs:
+                old = self._assets.get(name)
+                new = assets.get(name)
+                old_sha1 = old.sha1 if old else None
+                new_sha1 = new.sha1 if new else None
+                if old_sha1 != new_sha1:
+                    changes[name] = (old_sha1, new_sha1)
+
+            digest = hashlib.sha1()
+            for name in sorted(assets):
+                digest.update(f'{name}:{assets[name].sha1};'.encode('utf-8'))
+            self._assets = MappingProxyType(assets)
+            self.version = digest.hexdigest()[:12]
+            self.loaded_at = time.time()
+
+        found = ', '.join(f"{name} {'✓' if name in assets else '✗'}" for name in self._specs)
+        logger.info(f"Certificate assets v{self.version} loaded: {found}")
+        if changes:
+            for callback in self._listeners:
+                callback(self)
+        return changes
+
+    def reload(self):
+        """Reload assets here and signal the other worker processes to follow"""
+        changes = self.load()
+        try:
+            with open(self.reload_marker, 'w') as f:
+                f.write(f'{self.version} {time.time()}')
+            self._marker_mtime = self._read_marker_mtime()
+        except OSError as e:
+            logger.warning(f"Could not write asset reload marker {self.reload_marker}: {e}")
+        return changes
+
+    def _read_marker_mtime(self):
+        try:
+            return os.stat(self.reload_marker).st_mtime
+        except OSError:
+            return None
+
+    def refresh_if_stale(self):
+        """Reload when another process has reloaded; checks at most once per interval"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        mtime = self._read_marker_mtime()
+        if mtime is not None and mtime != self._marker_mtime:
+            self._marker_mtime = mtime
+            self.load()
+
+    def get(self, name):
+        return self._assets.get(name)
+
+    def path(self, name):
+        """Resolved path of an asset, or its declared fallback"""
+        asset = self._assets.get(name)
+        return asset.path if asset else self._specs[name][1]
+
+    def base64(self, name):
+        asset = self._assets.get(name)
+        return asset.base64 if asset else ''
+
+    def data_uri(self, name):
+        asset = self._assets.get(name)
+        return asset.data_uri if asset else ''
+
+    def paths(self):
+        return {name: self.path(name) for name in self._specs}
+
+    def fingerprints(self):
+        """Content hashes of all assets, for certificate cache keys"""
+        return {name: (self._assets[name].sha1 if name in self._assets else '') for name in self._specs}
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'assets': {name: asset.to_dict() for name, asset in self._assets.items()},
+            'missing': sorted(set(self._specs) - set(self._assets)),
+        }
@@ -0,0 +1,238 @@
+"""
+Content-addressed on-disk cache for rendered certificate PDFs.
+
+A certificate PDF only depends on the participant's name, certificate type and
+number, the template version, the signature/logo assets and the wkhtmltopdf
+options, so the cache key is a hash over exactly those inputs.  Previews,
+downloads and emails of the same certificate then share a single render.
+
+Entries are stored as ``p<participant_id>-<key>.pdf`` so all PDFs belonging to
+a participant can be dropped when their record changes.  The cache is bounded
+by total size and entry age; the oldest entries are evicted first.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (overridable per deployment)
+CERTIFICATE_CACHE_DIR = os.environ.get(
+    'CERTIFICATE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mdcan-certificate-cache'))
+CERTIFICATE_CACHE_MAX_MB = int(os.environ.get('CERTIFICATE_CACHE_MAX_MB', 256))
+CERTIFICATE_CACHE_MAX_AGE_HOURS = int(os.environ.get('CERTIFICATE_CACHE_MAX_AGE_HOURS', 24 * 7))
+CERTIFICATE_CACHE_ENABLED = os.environ.get('CERTIFICATE_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Seconds between full sweeps for expired entries
+SWEEP_INTERVAL = 600
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+
+def fingerprint(value):
+    """Hash an asset given as a file path, bytes or an inline (base64) string"""
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return hashlib.sha1(value).hexdigest()
+    if isinstance(value, str) and os.path.isfile(value):
+        try:
+            stat = os.stat(value)
+        except OSError:
+            return hashlib.sha1(value.encode('utf-8')).hexdigest()
+        marker = (value, stat.st_mtime, stat.st_size)
+        with _fingerprint_lock:
+            cached = _fingerprints.get(value)
+            if cached and cached[0] == marker:
+                return cached[1]
+        digest = hashlib.sha1()
+        with open(value, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        with _fingerprint_lock:
+            _fingerprints[value] = (marker, digest.hexdigest())
+        return digest.hexdigest()
+    return hashlib.sha1(str(value).encode('utf-8')).hexdigest()
+
+
+def certificate_key(name, cert_type, certificate_number, template_version, assets=None, options=None,
+                    asset_fingerprints=None):
+    """Build the content address of a certificate PDF.
+
+    ``asset_fingerprints`` are content hashes already known to the caller
+    (from the asset registry) and are used as-is instead of hashing ``assets``.
+    """
+    if asset_fingerprints is None:
+        asset_fingerprints = {k: fingerprint(v) for k, v in (assets or {}).items()}
+    payload = {
+        'name': name,
+        'type': cert_type,
+        'number': certificate_number,
+        'template': template_version,
+        'assets': dict(sorted(asset_fingerprints.items())),
+        'options': options or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CertificateCache:
+    """Size- and age-bounded directory of rendered certificate PDFs"""
+
+    def __init__(self, directory=CERTIFICATE_CACHE_DIR, max_bytes=CERTIFICATE_CACHE_MAX_MB * 1024 * 1024,
+                 max_age=CERTIFICATE_CACHE_MAX_AGE_HOURS * 3600, enabled=CERTIFICATE_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+        # Running size estimate so a full directory sweep is only needed
+        # when the budget may be exceeded or the last sweep is stale
+        self._approx_bytes = None
+        self._last_sweep = 0
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Certificate cache disabled, cannot create {self.directory}: {e}")
+                self.enabled = False
+
+    def _path(self, key, participant_id=None):
+        owner = participant_id if participant_id is not None else 'x'
+        return os.path.join(self.directory, f'p{owner}-{key}.pdf')
+
+    def get(self, key, participant_id=None):
+        """Return cached PDF bytes, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        path = self._path(key, participant_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits'] += 1
+        return data
+
+    def put(self, key, pdf_bytes, participant_id=None):
+        """Store PDF bytes atomically and evict old entries if over budget"""
+        if not self.enabled or not pdf_bytes:
+            return
+        path = self._path(key, participant_id)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+            self._stats['stores'] += 1
+        except OSError as e:
+            logger.warning(f"Could not cache certificate {key}: {e}")
+            return
+        if self._approx_bytes is not None:
+            self._approx_bytes += len(pdf_bytes)
+        if (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                or time.time() - self._last_sweep > SWEEP_INTERVAL):
+            self.evict()
+
+    def get_or_render(self, key, render, participant_id=None):
+        """Return cached PDF bytes, rendering and storing them on a miss"""
+        pdf_bytes = self.get(key, participant_id)
+        if pdf_bytes is None:
+            pdf_bytes = render()
+            self.put(key, pdf_bytes, participant_id)
+        return pdf_bytes
+
+    def invalidate(self, participant_id):
+        """Drop every cached PDF belonging to a participant"""
+        if not self.enabled:
+            return 0
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, f'p{participant_id}-*.pdf')):
+            if self._remove(path):
+                removed += 1
+        self._stats['invalidations'] += removed
+        return removed
+
+    def clear(self):
+        """Remove every cached PDF"""
+        if not self.enabled:
+            return 0
+        return sum(1 for path in glob.glob(os.path.join(self.directory, '*.pdf')) if self._remove(path))
+
+    def evict(self):
+        """Remove expired entries, then the oldest ones until under the size limit"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            removed = 0
+            total = 0
+            kept = []
+            for mtime, size, path in entries:
+                if now - mtime > self.max_age:
+                    removed += self._remove(path)
+                else:
+                    kept.append((mtime, size, path))
+                    total += size
+
+            kept.sort()
+            while kept and total > self.max_bytes:
+                mtime, size, path = kept.pop(0)
+                if self._remove(path):
+                    removed += 1
+                    total -= size
+
+            self._stats['evictions'] += removed
+            self._approx_bytes = total
+            self._last_sweep = now
+            return removed
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self):
+        """Return cache counters for health endpoints"""
+        entries = 0
+        size = 0
+        if self.enabled:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pdf'):
+                    entries += 1
+                    try:
+                        size += entry.stat().st_size
+                    except OSError:
+                        pass
+        return {
+            'enabled': self.enabled,
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'max_age_seconds': self.max_age,
+            **self._stats,
+        }
@@ -0,0 +1,352 @@
+"""
+Persistent wkhtmltopdf renderer pool for certificate PDFs.
+
+Every certificate used to start its own wkhtmltopdf process and pay the full
+Qt/WebKit start-up cost.  The pool below keeps a bounded number of long-lived
+wkhtmltopdf processes running in ``--read-args-from-stdin`` mode and feeds them
+from a job queue.  Each job carries its own timeout, and workers are recycled
+after a fixed number of jobs so WebKit memory growth stays bounded.
+
+If a wkhtmltopdf build cannot run in persistent mode the pool falls back to
+one process per job, so callers never have to care which mode is active.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Pool configuration (overridable per deployment)
+RENDERER_WORKERS = int(os.environ.get('RENDERER_WORKERS', 2))
+RENDERER_MAX_JOBS_PER_WORKER = int(os.environ.get('RENDERER_MAX_JOBS_PER_WORKER', 200))
+RENDERER_JOB_TIMEOUT = int(os.environ.get('RENDERER_JOB_TIMEOUT', 30))
+RENDERER_QUEUE_TIMEOUT = int(os.environ.get('RENDERER_QUEUE_TIMEOUT', 120))
+RENDERER_PERSISTENT = os.environ.get('RENDERER_PERSISTENT', 'true').lower() == 'true'
+
+# Consecutive start-up failures before persistent mode is abandoned
+MAX_PERSISTENT_FAILURES = 3
+
+
+class RenderError(Exception):
+    """Raised when wkhtmltopdf fails to produce a PDF"""
+
+
+class RenderTimeout(RenderError, TimeoutError):
+    """Raised when a render job exceeds its timeout"""
+
+
+def options_to_args(options):
+    """Convert a pdfkit-style options dict into wkhtmltopdf arguments"""
+    args = []
+    for key, value in (options or {}).items():
+        flag = key if key.startswith('-') else f'--{key}'
+        if flag in ('--quiet', '-q'):
+            # Progress output is how persistent workers detect job completion
+            continue
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                args.append(flag)
+                args.extend(str(v) for v in (item if isinstance(item, (list, tuple)) else [item]))
+        else:
+            args.append(flag)
+            if value is not None and value != '':
+                args.append(str(value))
+    return args
+
+
+def _quote_arg(arg):
+    """Quote an argument for wkhtmltopdf's stdin argument parser"""
+    if arg and not any(c in arg for c in ' \t"\'\\'):
+        return arg
+    return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _is_complete_pdf(path):
+    """Check that a PDF file exists and has been fully written"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < 16:
+                return False
+            f.seek(max(0, size - 1024))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+class _RenderJob:
+    def __init__(self, html, options, timeout):
+        self.html = html
+        self.options = options
+        self.timeout = timeout
+        self.done = threading.Event()
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+
+
+class _PersistentProcess:
+    """One long-lived wkhtmltopdf process reading job arguments from stdin"""
+
+    def __init__(self, binary, scratch_dir):
+        self.binary = binary
+        self.scratch_dir = scratch_dir
+        self.lines = queue.Queue()
+        self.process = subprocess.Popen(
+            [binary, '--log-level', 'info', '--read-args-from-stdin'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+        reader = threading.Thread(target=self._read_stderr, daemon=True)
+        reader.start()
+
+    def _read_stderr(self):
+        for raw in iter(self.process.stderr.readline, b''):
+            self.lines.put(raw.decode('utf-8', errors='replace'))
+        self.lines.put(None)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def render(self, html, options, timeout):
+        job_id = uuid.uuid4().hex
+        html_path = os.path.join(self.scratch_dir, f'{job_id}.html')
+        pdf_path = os.path.join(self.scratch_dir, f'{job_id}.pdf')
+        try:
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+
+            # Drop progress output left over from the previous job
+            while not self.lines.empty():
+                self.lines.get_nowait()
+
+            line = ' '.join(_quote_arg(a) for a in options_to_args(options) + [html_path, pdf_path])
+            try:
+                self.process.stdin.write((line + '\n').encode('utf-8'))
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                raise RenderError(f'wkhtmltopdf worker is not accepting jobs: {e}')
+
+            deadline = time.monotonic() + timeout
+            stderr_tail = []
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RenderTimeout(f'PDF generation timed out after {timeout} seconds')
+                try:
+                    text = self.lines.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if text is None:
+                    break  # process exited
+                stderr_tail = (stderr_tail + [text.strip()])[-5:]
+                if text.rstrip().endswith('Done'):
+                    break
+
+            # The output file can trail the progress line by a moment
+            settle_deadline = min(deadline, time.monotonic() + 1)
+            while not _is_complete_pdf(pdf_path) and time.monotonic() < settle_deadline:
+                time.sleep(0.02)
+            if not _is_complete_pdf(pdf_path):
+                raise RenderError('wkhtmltopdf did not produce a PDF: ' + ' | '.join(t for t in stderr_tail if t))
+            with open(pdf_path, 'rb') as f:
+                return f.read()
+        finally:
+            for path in (html_path, pdf_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def close(self, kill=False):
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+class _OneShotProcess:
+    """Fallback renderer that starts wkhtmltopdf once per job"""
+
+    def __init__(self, binary):
+        self.binary = binary
+
+    def alive(self):
+        return True
+
+    def render(self, html, options, timeout):
+        args = [self.binary, '--quiet'] + options_to_args(options) + ['-', '-']
+        try:
+            result = subprocess.run(args, input=html.encode('utf-8'), capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise RenderTimeout(f'PDF generation timed out after {timeout} seconds')
+        if not result.stdout.startswith(b'%PDF'):
+            stderr = result.stderr.decode('utf-8', errors='replace').strip()
+            raise RenderError(f'wkhtmltopdf exited with code {result.returncode}: {stderr[-500:]}')
+        return result.stdout
+
+    def close(self, kill=False):
+        pass
+
+
+class RendererPool:
+    """Bounded pool of long-lived wkhtmltopdf workers fed from a job queue"""
+
+    def __init__(self, wkhtmltopdf_path=None, workers=RENDERER_WORKERS,
+                 max_jobs_per_worker=RENDERER_MAX_JOBS_PER_WORKER,
+                 job_timeout=RENDERER_JOB_TIMEOUT, queue_timeout=RENDERER_QUEUE_TIMEOUT,
+                 persistent=RENDERER_PERSISTENT):
+        if isinstance(wkhtmltopdf_path, bytes):
+            wkhtmltopdf_path = wkhtmltopdf_path.decode('utf-8')
+        self.binary = wkhtmltopdf_path or shutil.which('wkhtmltopdf') or 'wkhtmltopdf'
+        self.workers = max(1, workers)
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self.job_timeout = job_timeout
+        self.queue_timeout = queue_timeout
+        self.persistent = persistent
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._threads = []
+        self._processes = {}
+        self._scratch_dir = None
+        self._persistent_failures = 0
+        self._stats = {}
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        # Worker threads do not survive a fork, so gunicorn's preload_app
+        # master must not own them; every process starts its own pool lazily.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._processes = {}
+            self._scratch_dir = tempfile.mkdtemp(prefix='mdcan-renderer-')
+            self._stats = {'jobs_completed': 0, 'jobs_failed': 0, 'jobs_timed_out': 0,
+                           'workers_started': 0, 'workers_recycled': 0}
+            self._threads = []
+            for slot in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, args=(slot,),
+                                          name=f'certificate-renderer-{slot}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Certificate renderer pool started: {self.workers} workers, "
+                        f"{'persistent' if self.persistent else 'one-shot'} mode, binary {self.binary}")
+
+    def _spawn(self):
+        if self.persistent:
+            try:
+                process = _PersistentProcess(self.binary, self._scratch_dir)
+                self._stats['workers_started'] += 1
+                return process
+            except OSError as e:
+                self._record_persistent_failure(e)
+        return _OneShotProcess(self.binary)
+
+    def _record_persistent_failure(self, error):
+        with self._lock:
+            self._persistent_failures += 1
+            if self.persistent and self._persistent_failures >= MAX_PERSISTENT_FAILURES:
+                self.persistent = False
+                logger.warning(f"wkhtmltopdf persistent mode unavailable ({error}); "
+                               f"falling back to one process per certificate")
+
+    def _worker_loop(self, slot):
+        process = None
+        jobs_on_process = 0
+        work_queue = self._queue
+        while True:
+            job = work_queue.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            if process is None or not process.alive():
+                process = self._spawn()
+                self._processes[slot] = process
+                jobs_on_process = 0
+            try:
+                job.result = process.render(job.html, job.options, job.timeout)
+                self._stats['jobs_completed'] += 1
+                if isinstance(process, _PersistentProcess):
+                    self._persistent_failures = 0
+            except RenderTimeout as e:
+                job.error = e
+                self._stats['jobs_timed_out'] += 1
+                process.close(kill=True)
+                process = None
+            except Exception as e:
+                job.error = e if isinstance(e, RenderError) else RenderError(str(e))
+                self._stats['jobs_failed'] += 1
+                if isinstance(process, _PersistentProcess) and not process.alive():
+                    if jobs_on_process == 0:
+                        self._record_persistent_failure(e)
+                    process = None
+            finally:
+                job.done.set()
+
+            jobs_on_process += 1
+            if process is not None and jobs_on_process >= self.max_jobs_per_worker:
+                process.close()
+                process = None
+                self._stats['workers_recycled'] += 1
+
+        if process is not None:
+            process.close()
+
+    def render(self, html, options=None, timeout=None):
+        """Render HTML to PDF bytes using a pooled worker"""
+        self._ensure_started()
+        job = _RenderJob(html, options, timeout or self.job_timeout)
+        self._queue.put(job)
+        if not job.done.wait(job.timeout + self.queue_timeout):
+            job.cancelled = True
+            raise RenderTimeout(f'PDF generation queue wait exceeded {self.queue_timeout} seconds')
+        if job.error:
+            raise job.error
+        return job.result
+
+    def stats(self):
+        """Return pool counters for health endpoints"""
+        return {
+            'workers': self.workers,
+            'mode': 'persistent' if self.persistent else 'one-shot',
+            'max_jobs_per_worker': self.max_jobs_per_worker,
+            'job_timeout': self.job_timeout,
+            'queue_depth': self._queue.qsize() if self._queue and self._pid == os.getpid() else 0,
+            **self._stats,
+        }
+
+    def shutdown(self):
+        """Stop all workers and their wkhtmltopdf processes"""
+        if self._pid != os.getpid() or self._queue is None:
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for process in list(self._processes.values()):
+            if process is not None:
+                process.close(kill=True)
+        if self._scratch_dir:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+        self._pid = None
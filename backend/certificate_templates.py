@@ -0,0 +1,198 @@
+"""
+Compiled certificate template registry.
+
+Certificate HTML used to be parsed and compiled by Jinja on every request
+(``Template(...)`` / ``render_template_string``).  The registry below compiles
+each certificate type once, keys the compiled template by type and version
+(a hash of its source), and renders participants through a single
+``render(participant)`` call.
+
+Template edits are picked up through ``reload()``: sources are re-read from
+``CERTIFICATE_TEMPLATE_DIR`` (``<type>.html`` and ``<type>.<partial>.html``)
+when present, and only types whose source actually changed are recompiled.
+Sources only ever come from that directory, never from a request.  A reload
+touches ``CERTIFICATE_TEMPLATE_RELOAD_MARKER`` so the other workers re-read
+the directory on their next render.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from jinja2 import Environment
+
+logger = logging.getLogger(__name__)
+
+# Optional directory holding edited templates that override the built-in ones
+CERTIFICATE_TEMPLATE_DIR = os.environ.get('CERTIFICATE_TEMPLATE_DIR')
+# Touched on reload so every worker picks up the edited templates
+CERTIFICATE_TEMPLATE_RELOAD_MARKER = os.environ.get(
+    'CERTIFICATE_TEMPLATE_RELOAD_MARKER', os.path.join(tempfile.gettempdir(), 'mdcan-certificate-templates.reload'))
+
+
+class TemplateNotFound(KeyError):
+    """Raised when no template is registered for a certificate type"""
+
+
+def _source_version(source, partials):
+    digest = hashlib.sha1(source.encode('utf-8'))
+    for name in sorted(partials):
+        digest.update(b'\0' + name.encode('utf-8') + b'\0' + partials[name].encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class CompiledCertificate:
+    """A certificate type compiled once, with its partials and static context"""
+
+    def __init__(self, environment, cert_type, source, partials, context, version):
+        self.cert_type = cert_type
+        self.version = version
+        self.source = source
+        self.partial_sources = dict(partials)
+        self.context = dict(context)
+        self.template = environment.from_string(source)
+        self.partials = {name: environment.from_string(text) for name, text in partials.items()}
+
+    def render(self, **context):
+        """Render the certificate HTML from an explicit context"""
+        values = dict(self.context)
+        values.update(context)
+        # Partials (e.g. the certificate body) are rendered first and injected
+        # into the page layout under their own name.
+        for name, partial in self.partials.items():
+            if name not in context:
+                values[name] = partial.render(**values)
+        return self.template.render(**values)
+
+
+class CertificateTemplateRegistry:
+    """Certificate templates compiled at startup and keyed by type and version"""
+
+    def __init__(self, context_builder=None, type_getter=None, autoescape=False,
+                 template_dir=CERTIFICATE_TEMPLATE_DIR, default_type='participation',
+                 reload_marker=CERTIFICATE_TEMPLATE_RELOAD_MARKER):
+        self.environment = Environment(autoescape=autoescape)
+        self.context_builder = context_builder or (lambda participant: {})
+        self.type_getter = type_getter or (lambda participant: None)
+        self.template_dir = template_dir
+        self.default_type = default_type
+        self.reload_marker = reload_marker
+        self._marker_mtime = self._read_marker_mtime()
+        self._lock = threading.Lock()
+        self._definitions = {}
+        self._current = {}
+        self._compiled = {}
+
+    def register(self, cert_type, source, partials=None, context=None):
+        """Register and compile the built-in template for a certificate type"""
+        with self._lock:
+            self._definitions[cert_type] = {
+                'source': source,
+                'partials': dict(partials or {}),
+                'context': dict(context or {}),
+            }
+            return self._compile(cert_type)
+
+    def _read_override(self, filename):
+        if not self.template_dir:
+            return None
+        path = os.path.join(self.template_dir, filename)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _compile(self, cert_type):
+        definition = self._definitions[cert_type]
+        source = self._read_override(f'{cert_type}.html') or definition['source']
+        partials = {
+            name: self._read_override(f'{cert_type}.{name}.html') or text
+            for name, text in definition['partials'].items()
+        }
+        version = _source_version(source, partials)
+        key = (cert_type, version)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledCertificate(self.environment, cert_type, source, partials,
+                                           definition['context'], version)
+            self._compiled[key] = compiled
+            logger.info(f"Compiled certificate template {cert_type} v{version}")
+        self._current[cert_type] = version
+        return compiled
+
+    def _read_marker_mtime(self):
+        try:
+            return os.stat(self.reload_marker).st_mtime_ns
+        except OSError:
+            return None
+
+    def _touch_marker(self):
+        try:
+            with open(self.reload_marker, 'w') as f:
+                f.write('certificate templates changed')
+            self._marker_mtime = self._read_marker_mtime()
+        except OSError as e:
+            logger.warning(f"Could not write certificate template marker {self.reload_marker}: {e}")
+
+    def _reload_if_marked(self):
+        """Re-read the template directory when another process reloaded it"""
+        mtime = self._read_marker_mtime()
+        if mtime == self._marker_mtime:
+            return
+        with self._lock:
+            if mtime == self._marker_mtime:
+                return
+            self._marker_mtime = mtime
+            for name in list(self._definitions):
+                self._compile(name)
+
+    def get(self, cert_type=None, version=None):
+        """Return the compiled template for a type (current version by default)"""
+        if version is None:
+            self._reload_if_marked()
+        if cert_type not in self._current:
+            # Unknown types fall back to the default, as the routes always did
+            if self.default_type not in self._current:
+                raise TemplateNotFound(cert_type)
+            cert_type = self.default_type
+        key = (cert_type, version or self._current[cert_type])
+        if key not in self._compiled:
+            raise TemplateNotFound(f'{cert_type} v{version}')
+        return self._compiled[key]
+
+    def render(self, participant, cert_type=None, version=None, **extra):
+        """Render the certificate HTML for a participant"""
+        compiled = self.get(cert_type or self.type_getter(participant), version)
+        context = self.context_builder(participant)
+        context.update(extra)
+        return compiled.render(**context)
+
+    def reload(self, cert_type=None):
+        """Hot-reload templates after the override directory was edited.
+
+        Returns a mapping of certificate type to ``(old_version, new_version)``;
+        the other workers follow through the reload marker.
+        """
+        with self._lock:
+            if cert_type is not None and cert_type not in self._definitions:
+                raise TemplateNotFound(cert_type)
+            changes = {}
+            for name in ([cert_type] if cert_type else list(self._definitions)):
+                old_version = self._current.get(name)
+                new_version = self._compile(name).version
+                changes[name] = (old_version, new_version)
+            if any(old != new for old, new in changes.values()):
+                self._touch_marker()
+            return changes
+
+    def versions(self):
+        """Describe the registered templates for admin endpoints"""
+        return {
+            cert_type: {
+                'current': version,
+                'compiled_versions': sorted(v for (t, v) in self._compiled if t == cert_type),
+            }
+            for cert_type, version in self._current.items()
+        }
@@ -0,0 +1,357 @@
+"""
+Batched check-in of queued desk scans.
+
+``POST /api/check-in`` handles one delegate per request with three queries
+(participant, existing check-in, insert and update), which is what the desks
+hit hundreds of times a minute during morning registration and what offline
+tablets replay one by one when they reconnect.  ``BatchCheckIn`` takes a list
+of scans -- each a ``participant_id`` or ``certificate_number`` and a
+``check_in_day`` -- and processes them together:
+
+- one query resolves every scanned participant with their existing check-ins,
+- new check-ins are written with one ``INSERT ... ON CONFLICT DO NOTHING``,
+  so a scan another desk recorded first is reported instead of failing the
+  batch,
+- one executemany ``UPDATE`` sets the participants' attendance dates,
+
+and every scan gets its own outcome in the response.  With ``counters`` the
+dashboard counters are adjusted from the rows written rather than recounted.
+"""
+
+import logging
+import os
+from datetime import datetime
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Largest number of scans accepted in one request
+CHECK_IN_BATCH_MAX_SCANS = int(os.environ.get('CHECK_IN_BATCH_MAX_SCANS', 500))
+
+CONFERENCE_DAYS = range(1, 7)
+
+OUTCOMES = ('checked_in', 'already_checked_in', 'duplicate', 'not_found', 'invalid')
+
+
+class BatchError(ValueError):
+    """Malformed batch request, reported to the client as a 400"""
+
+
+def _parse_time(raw, now):
+    """Scan time sent by an offline tablet, or ``now``; never in the future"""
+    if not raw:
+        return now
+    try:
+        scanned_at = datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Invalid scanned_at: {raw}')
+    if scanned_at.tzinfo is not None:
+        # Stored times are naive UTC
+        scanned_at = (scanned_at - scanned_at.utcoffset()).replace(tzinfo=None)
+    return min(scanned_at, now)
+
+
+class BatchCheckIn:
+    """Check in a batch of scans with a fixed number of queries"""
+
+    def __init__(self, db, participant_model, check_in_model, max_scans=CHECK_IN_BATCH_MAX_SCANS, counters=None):
+        self.db = db
+        self.counters = counters
+        self._options = counters.applied_options if counters is not None else {}
+        self.participants = participant_model.__table__
+        self.check_ins = check_in_model.__table__
+        self.max_scans = max_scans
+        self._stats = {'batches': 0, 'scans': 0, **{outcome: 0 for outcome in OUTCOMES}}
+
+    def _validate(self, index, scan, defaults, now):
+        """Normalized scan, or the error message explaining why it was rejected"""
+        if not isinstance(scan, dict):
+            return None, 'Scan must be an object'
+        participant_id = scan.get('participant_id')
+        certificate_number = scan.get('certificate_number')
+        if participant_id in (None, '') and not certificate_number:
+            return None, 'participant_id or certificate_number is required'
+        try:
+            participant_id = int(participant_id) if participant_id not in (None, '') else None
+            check_in_day = int(scan.get('check_in_day', defaults.get('check_in_day')))
+        except (TypeError, ValueError):
+            return None, 'participant_id and check_in_day must be numbers'
+        try:
+            check_in_time = _parse_time(scan.get('scanned_at'), now)
+        except ValueError as e:
+            return None, str(e)
+        if check_in_day not in CONFERENCE_DAYS:
+            return None, 'Invalid conference day. Must be between 1 and 6'
+        return {
+            'index': index,
+            'participant_id': participant_id,
+            'certificate_number': str(certificate_number).strip() if certificate_number else None,
+            'check_in_day': check_in_day,
+            'check_in_time': check_in_time,
+            'materials_received': bool(scan.get('materials_received', defaults.get('materials_received', False))),
+            'verified_by': scan.get('verified_by', defaults.get('verified_by', 'admin')),
+            'verification_method': scan.get('verification_method', defaults.get('verification_method', 'manual')),
+            'notes': scan.get('notes', defaults.get('notes', ''))
+        }, None
+
+    def _resolve(self, scans):
+        """``{participant_id: (name, {day: (check_in_id, check_in_time)}, first_attendance_date)}``
+        and certificate number lookup"""
+        participants, check_ins = self.participants, self.check_ins
+        ids = {scan['participant_id'] for scan in scans if scan['participant_id'] is not None}
+        numbers = {scan['certificate_number'] for scan in scans if scan['participant_id'] is None}
+        conditions = []
+        if ids:
+            conditions.append(participants.c.id.in_(ids))
+        if numbers:
+            conditions.append(participants.c.certificate_number.in_(numbers))
+        found, by_number = {}, {}
+        if not conditions:
+            return found, by_number
+        rows = self.db.session.execute(
+            sa.select(participants.c.id, participants.c.name, participants.c.certificate_number,
+                      participants.c.first_attendance_date, check_ins.c.id.label('check_in_id'), check_ins.c.check_in_day, check_ins.c.check_in_time)
+            .select_from(participants.outerjoin(check_ins, check_ins.c.participant_id == participants.c.id))
+            .where(sa.or_(*conditions))
+        )
+        for row in rows:
+            name, days, _ = found.setdefault(row.id, (row.name, {}, row.first_attendance_date))
+            if row.certificate_number:
+                by_number[row.certificate_number] = row.id
+            if row.check_in_day is not None:
+                days[row.check_in_day] = (row.check_in_id, row.check_in_time)
+        return found, by_number
+
+    def _conflict_insert(self):
+        """The dialect's ``insert`` supporting ``ON CONFLICT``, or None"""
+        dialect = self.db.session.get_bind().dialect
+        if dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert
+        if dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= (3, 24):
+            from sqlalchemy.dialects.sqlite import insert
+            return insert
+        return None
+
+    def _returning(self, statement):
+        columns = self.check_ins.c
+        return statement.returning(columns.id, columns.participant_id, columns.check_in_day, columns.check_in_time)
+
+    def _insert_statement(self):
+        """``INSERT ... ON CONFLICT DO NOTHING`` where the database supports it"""
+        insert = self._conflict_insert()
+        if insert is None:
+            return self._returning(sa.insert(self.check_ins))
+        return self._returning(insert(self.check_ins).on_conflict_do_nothing(
+            index_elements=['participant_id', 'check_in_day']))
+
+    def _token_insert_statement(self, participant_id, certificate_number, values):
+        """``INSERT ... SELECT`` that only adds a row while the token's participant still exists"""
+        participants = self.participants
+        columns = ['participant_id', 'check_in_day', 'check_in_time', 'materials_received', 'verified_by',
+                   'verification_method', 'notes', 'ip_address']
+        source = sa.select(
+            participants.c.id,
+            *(sa.literal(values[name], type_=self.check_ins.c[name].type) for name in columns[1:])
+        ).where(
+            participants.c.id == participant_id,
+            # A renumbered participant's old codes stop scanning
+            participants.c.certificate_number.is_not_distinct_from(certificate_number)
+        )
+        insert = self._conflict_insert()
+        if insert is None:
+            return self._returning(sa.insert(self.check_ins).from_select(columns, source))
+        return self._returning(insert(self.check_ins).from_select(columns, source).on_conflict_do_nothing(
+            index_elements=['participant_id', 'check_in_day']))
+
+    def _count(self, table, changes):
+        if self.counters is not None and changes:
+            self.counters.apply(self.db.session, table.name, changes)
+
+    def _attendance_statement(self):
+        participants = self.participants
+        first, last = sa.bindparam('first_seen', type_=sa.DateTime), sa.bindparam('last_seen', type_=sa.DateTime)
+        return (
+            sa.update(participants)
+            .where(participants.c.id == sa.bindparam('participant'))
+            .values(
+                event_attendance=True,
+                first_attendance_date=sa.case(
+                    (sa.or_(participants.c.first_attendance_date.is_(None),
+                            participants.c.first_attendance_date > first), first),
+                    else_=participants.c.first_attendance_date),
+                last_attendance_date=sa.case(
+                    (sa.or_(participants.c.last_attendance_date.is_(None),
+                            participants.c.last_attendance_date < last), last),
+                    else_=participants.c.last_attendance_date)
+            )
+        )
+
+    def _mark_attendance(self, times, first_attendance):
+        """Set each participant's first and last attendance in one executemany UPDATE.
+
+        ``first_attendance`` holds the participants' first attendance dates
+        before the update, from which the checked-in counter is adjusted.
+        """
+        self.db.session.execute(
+            self._attendance_statement(),
+            [{'participant': participant_id, 'first_seen': min(seen), 'last_seen': max(seen)}
+             for participant_id, seen in times.items()],
+            execution_options=self._options
+        )
+        changes = []
+        for participant_id, seen in times.items():
+            old = first_attendance.get(participant_id)
+            changes.append(({'first_attendance_date': old},
+                            {'first_attendance_date': min(seen) if old is None else min(old, min(seen))}))
+        self._count(self.participants, changes)
+
+    def record(self, participant_id, certificate_number, check_in_day, ip_address=None, materials_received=False,
+               verified_by='admin', verification_method='qr', notes=''):
+        """Check in the participant named by a signed token.
+
+        Returns ``(status, check_in)``.  The insert only matches while a
+        participant with that id and certificate number exists, so a new
+        check-in takes that one statement plus the attendance update; only a
+        scan that inserts nothing looks up whether it was a repeat or an
+        unknown participant.  The caller commits.
+        """
+        statement = self._token_insert_statement(participant_id, certificate_number, {
+            'check_in_day': check_in_day, 'check_in_time': datetime.utcnow(),
+            'materials_received': bool(materials_received), 'verified_by': verified_by,
+            'verification_method': verification_method, 'notes': notes, 'ip_address': ip_address
+        })
+        self._stats['scans'] += 1
+        if self._conflict_insert() is not None:
+            row = self.db.session.execute(statement, execution_options=self._options).first()
+        else:
+            try:
+                with self.db.session.begin_nested():
+                    row = self.db.session.execute(statement, execution_options=self._options).first()
+            except sa.exc.IntegrityError:
+                # No ON CONFLICT here: another desk recorded it first
+                row = None
+        if row is None:
+            participants, check_ins = self.participants, self.check_ins
+            existing = self.db.session.execute(
+                sa.select(check_ins.c.id, check_ins.c.check_in_time)
+                .select_from(check_ins.join(participants, participants.c.id == check_ins.c.participant_id))
+                .where(check_ins.c.participant_id == participant_id, check_ins.c.check_in_day == check_in_day,
+                       participants.c.certificate_number.is_not_distinct_from(certificate_number))
+            ).first()
+            if existing is None:
+                self._stats['not_found'] += 1
+                return 'not_found', None
+            self._stats['already_checked_in'] += 1
+            return 'already_checked_in', {'id': existing.id, 'check_in_time': existing.check_in_time.isoformat()}
+        self._count(self.check_ins, [(None, {'check_in_day': check_in_day,
+                                             'materials_received': bool(materials_received)})])
+        self._record_attendance(participant_id, row.check_in_time)
+        self._stats['checked_in'] += 1
+        return 'checked_in', {'id': row.id, 'check_in_time': row.check_in_time.isoformat()}
+
+    def _record_attendance(self, participant_id, check_in_time):
+        """Attendance update of a single new check-in, adjusting the checked-in counter"""
+        params = {'participant': participant_id, 'first_seen': check_in_time, 'last_seen': check_in_time}
+        if self.counters is None or not self.db.session.get_bind().dialect.update_returning:
+            self.db.session.execute(self._attendance_statement(), params)
+            return
+        first = self.db.session.execute(
+            self._attendance_statement().returning(self.participants.c.first_attendance_date), params,
+            execution_options=self._options
+        ).scalar()
+        if first == check_in_time:
+            # The newest check-in only becomes the first attendance of a participant who had none
+            self._count(self.participants, [({'first_attendance_date': None},
+                                             {'first_attendance_date': check_in_time})])
+
+    def process(self, scans, defaults=None, ip_address=None):
+        """Check in ``scans`` and return ``(results, summary, new_days)``.
+
+        ``results`` holds one outcome per scan in request order, ``new_days``
+        the conference days that received new check-ins.  The caller commits.
+        """
+        if not isinstance(scans, list) or not scans:
+            raise BatchError('scans must be a non-empty list')
+        if len(scans) > self.max_scans:
+            raise BatchError(f'At most {self.max_scans} scans per request')
+        defaults = defaults or {}
+        now = datetime.utcnow()
+
+        results = [None] * len(scans)
+        valid = []
+        for index, raw in enumerate(scans):
+            scan, error = self._validate(index, raw, defaults, now)
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                valid.append(scan)
+
+        found, by_number = self._resolve(valid)
+        pending = {}
+        for scan in valid:
+            participant_id = scan['participant_id']
+            if participant_id is None:
+                participant_id = by_number.get(scan['certificate_number'])
+            result = {'index': scan['index'], 'participant_id': participant_id,
+                      'check_in_day': scan['check_in_day']}
+            if scan['certificate_number']:
+                result['certificate_number'] = scan['certificate_number']
+            results[scan['index']] = result
+            if participant_id not in found:
+                result.update(status='not_found', error='Participant not found')
+                continue
+            name, days, _ = found[participant_id]
+            result['participant_name'] = name
+            key = (participant_id, scan['check_in_day'])
+            if scan['check_in_day'] in days:
+                check_in_id, check_in_time = days[scan['check_in_day']]
+                result.update(status='already_checked_in',
+                              check_in={'id': check_in_id, 'check_in_time': check_in_time.isoformat()})
+            elif key in pending:
+                # The same delegate scanned twice in this batch
+                result.update(status='duplicate', duplicate_of=pending[key]['index'])
+            else:
+                pending[key] = scan
+
+        inserted = {}
+        if pending:
+            rows = self.db.session.execute(self._insert_statement(), [
+                {'participant_id': participant_id, 'check_in_day': day, 'check_in_time': scan['check_in_time'],
+                 'materials_received': scan['materials_received'], 'verified_by': scan['verified_by'],
+                 'verification_method': scan['verification_method'], 'notes': scan['notes'],
+                 'ip_address': ip_address}
+                for (participant_id, day), scan in pending.items()
+            ], execution_options=self._options).all()
+            inserted = {(row.participant_id, row.check_in_day): row for row in rows}
+
+        times = {}
+        for key, scan in pending.items():
+            result = results[scan['index']]
+            row = inserted.get(key)
+            if row is None:
+                # Recorded by another desk between the lookup and the insert
+                result.update(status='already_checked_in')
+                continue
+            result.update(status='checked_in', check_in={'id': row.id, 'check_in_time': row.check_in_time.isoformat()})
+            times.setdefault(key[0], []).append(row.check_in_time)
+        self._count(self.check_ins, [
+            (None, {'check_in_day': day, 'materials_received': pending[(participant_id, day)]['materials_received']})
+            for participant_id, day in inserted
+        ])
+        if times:
+            self._mark_attendance(times, {participant_id: found[participant_id][2] for participant_id in times})
+
+        summary = {outcome: 0 for outcome in OUTCOMES}
+        for result in results:
+            summary[result['status']] += 1
+        self._stats['batches'] += 1
+        self._stats['scans'] += len(scans)
+        for outcome, count in summary.items():
+            self._stats[outcome] += count
+        new_days = sorted({day for participant_id, day in inserted})
+        return results, summary, new_days
+
+    def stats(self):
+        return {'max_scans': self.max_scans, **self._stats}
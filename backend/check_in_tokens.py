@@ -0,0 +1,130 @@
+"""
+Signed QR check-in tokens.
+
+Checking a delegate in at the door meant typing part of a name into the
+search box, waiting for the fuzzy search and picking the right row.  Every
+participant now gets a stateless check-in token -- their id and registration
+(certificate) number, signed with HMAC-SHA256 -- shown as a QR code in the
+welcome email and on their dashboard.  ``/api/check-in/scan`` verifies the
+signature in memory, with no database lookup, and records the check-in with
+one insert keyed on the id carried by the token.
+
+The signing key is ``CHECK_IN_TOKEN_SECRET``; it must be the same in every
+worker and kept across deployments, or the codes already sent stop scanning.
+Without it no tokens are issued or accepted: the scan endpoints answer 503
+and the codes are left out of the welcome email and dashboard.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import io
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+CHECK_IN_TOKEN_SECRET = os.environ.get('CHECK_IN_TOKEN_SECRET', '')
+
+TOKEN_VERSION = 'c1'
+SIGNATURE_BYTES = 16
+
+try:
+    import qrcode
+except ImportError:  # QR images are optional; the token itself is all a scanner needs
+    qrcode = None
+
+
+class InvalidToken(ValueError):
+    """A check-in token that is malformed or whose signature does not match"""
+
+
+class TokensDisabled(RuntimeError):
+    """Check-in tokens were used while no ``CHECK_IN_TOKEN_SECRET`` is configured"""
+
+
+def _encode(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class CheckInTokens:
+    """Issue and verify HMAC-signed participant check-in tokens"""
+
+    def __init__(self, secret=CHECK_IN_TOKEN_SECRET):
+        if not secret:
+            # Fail closed: a key derived from anything guessable would let
+            # anyone forge check-ins
+            logger.warning("CHECK_IN_TOKEN_SECRET is not set; QR check-in tokens are disabled")
+        self._key = (secret.encode('utf-8') if isinstance(secret, str) else secret) or None
+        self._stats = {'issued': 0, 'verified': 0, 'rejected': 0, 'verify_seconds': 0.0}
+
+    @property
+    def enabled(self):
+        return self._key is not None
+
+    def _signature(self, payload):
+        digest = hmac.new(self._key, f'{TOKEN_VERSION}.{payload}'.encode('ascii'), hashlib.sha256).digest()
+        return _encode(digest[:SIGNATURE_BYTES])
+
+    def issue(self, participant_id, certificate_number):
+        """Token for a participant, as encoded in their QR code"""
+        if not self.enabled:
+            raise TokensDisabled('CHECK_IN_TOKEN_SECRET is not configured')
+        payload = _encode(f'{int(participant_id)}:{certificate_number or ""}'.encode('utf-8'))
+        self._stats['issued'] += 1
+        return f'{TOKEN_VERSION}.{payload}.{self._signature(payload)}'
+
+    def verify(self, token):
+        """``(participant_id, certificate_number)`` of a valid token; raises ``InvalidToken``"""
+        if not self.enabled:
+            raise TokensDisabled('CHECK_IN_TOKEN_SECRET is not configured')
+        started = time.perf_counter()
+        try:
+            version, payload, signature = str(token).strip().split('.')
+            if version != TOKEN_VERSION:
+                raise InvalidToken('Unsupported check-in code')
+            if not hmac.compare_digest(signature, self._signature(payload)):
+                raise InvalidToken('Check-in code signature does not match')
+            participant_id, certificate_number = _decode(payload).decode('utf-8').split(':', 1)
+            result = int(participant_id), certificate_number or None
+        except InvalidToken:
+            self._stats['rejected'] += 1
+            raise
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            self._stats['rejected'] += 1
+            raise InvalidToken('Malformed check-in code')
+        finally:
+            self._stats['verify_seconds'] += time.perf_counter() - started
+        self._stats['verified'] += 1
+        return result
+
+    @staticmethod
+    def qr_available():
+        return qrcode is not None
+
+    @staticmethod
+    def qr_png(token):
+        """PNG image of the token's QR code, or None when ``qrcode`` is not installed"""
+        if qrcode is None:
+            return None
+        image = qrcode.make(token, box_size=8, border=2)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def stats(self):
+        checked = self._stats['verified'] + self._stats['rejected']
+        return {
+            'enabled': self.enabled,
+            'issued': self._stats['issued'],
+            'verified': self._stats['verified'],
+            'rejected': self._stats['rejected'],
+            'avg_verify_us': round(self._stats['verify_seconds'] / checked * 1e6, 1) if checked else 0.0,
+            'qr_images': self.qr_available()
+        }
@@ -0,0 +1,442 @@
+"""
+Materialized dashboard counters.
+
+Even a single aggregate query scans the whole ``participants`` table on every
+dashboard poll.  ``DashboardCounters`` keeps the dashboard figures as rows of
+the ``dashboard_counters`` table, so the statistics endpoints read a few dozen
+small rows whatever the size of the event.
+
+Counters are maintained incrementally in the writing transaction: an
+``after_flush`` hook compares the old and new values of every tracked row the
+ORM inserts, updates or deletes (registration, check-in, certificate and
+status changes) and applies the differences with one ``value = value + n``
+upsert.  Bulk writers that know what they wrote (spreadsheet imports, batch
+and QR check-ins) run their statements with ``applied_options`` and report
+the old and new values of the rows to ``apply``, which does the same.
+Writes nobody can follow -- other bulk INSERT/UPDATE statements, or updates
+of attributes whose old value was never loaded -- flag the counters stale
+instead, and the next read recounts them.
+A periodic reconciliation recounts everything from the source tables anyway,
+correcting drift from raw SQL or races between processes.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+
+import sqlalchemy as sa
+
+from aggregate_stats import AggregateQuery
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full recounts of the counters from the source tables
+COUNTER_RECONCILE_SECONDS = int(os.environ.get('COUNTER_RECONCILE_SECONDS', 600))
+
+# Bookkeeping rows: writes awaiting a recount, and time of the last recount
+STALE_KEY = '_stale'
+RECONCILED_KEY = '_reconciled_at'
+
+# Condition value matching any non-null column value
+NOT_NULL = object()
+
+_UNKNOWN = object()
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """No-op ``set`` listener, registered for its ``active_history``"""
+
+
+def create_counter_model(db):
+    """Define the ``dashboard_counters`` table on ``db``"""
+
+    class DashboardCounter(db.Model):
+        __tablename__ = 'dashboard_counters'
+
+        name = db.Column(db.String(200), primary_key=True)  # "<table>.<counter>[:<group>]"
+        value = db.Column(db.BigInteger, nullable=False, default=0)
+        updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    return DashboardCounter
+
+
+def _day(value):
+    """ISO date of a datetime, date, or date string returned by SQL ``date()``"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat() if isinstance(value, date) else str(value)[:10]
+
+
+class Count:
+    """Rows matching the given column values, optionally counted per group.
+
+    Each keyword names a column and the value, or tuple of values, it must
+    hold (``NOT_NULL`` matches any non-null value).  ``group_by`` splits the
+    count per value of a column, ``by_day`` per calendar day of a datetime
+    column.
+    """
+
+    def __init__(self, group_by=None, by_day=None, **where):
+        self.group_by = group_by
+        self.by_day = by_day
+        self.where = {column: value if isinstance(value, tuple) else (value,) for column, value in where.items()}
+        self.columns = set(self.where) | {column for column in (group_by, by_day) if column}
+
+    @property
+    def grouped(self):
+        return bool(self.group_by or self.by_day)
+
+    def clause(self, model):
+        """SQL condition, or None to count every row"""
+        conditions = []
+        for column, values in self.where.items():
+            attribute = getattr(model, column)
+            if NOT_NULL in values:
+                conditions.append(attribute.isnot(None))
+                continue
+            options = [attribute.in_([value for value in values if value is not None])]
+            if None in values:
+                options.append(attribute.is_(None))
+            conditions.append(sa.or_(*options) if len(options) > 1 else options[0])
+        return sa.and_(*conditions) if conditions else None
+
+    def group_column(self, model):
+        if self.by_day:
+            return sa.func.date(getattr(model, self.by_day))
+        return getattr(model, self.group_by)
+
+    def group_key(self, value):
+        if self.by_day:
+            return _day(value) if value is not None else 'null'
+        return 'null' if value is None else str(value)
+
+    def suffixes(self, values):
+        """Counter key suffixes a row with these column values counts under"""
+        for column, allowed in self.where.items():
+            value = values[column]
+            if not (value is not None if NOT_NULL in allowed else value in allowed):
+                return ()
+        if not self.grouped:
+            return ('',)
+        return (':' + self.group_key(values[self.group_by or self.by_day]),)
+
+
+class DashboardCounters:
+    """Named row counts over several tables, kept in the counters table"""
+
+    # Execution options of bulk statements whose changes are reported to ``apply``
+    applied_options = {'dashboard_counters_applied': True}
+
+    def __init__(self, db, model, app=None, reconcile_seconds=COUNTER_RECONCILE_SECONDS):
+        self.db = db
+        self.model = model
+        self.table = model.__table__
+        # With ``app`` a reconciliation thread runs in each serving process;
+        # otherwise the caller schedules ``reconcile`` itself
+        self.app = app
+        self.reconcile_seconds = reconcile_seconds
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {'reads': 0, 'adjustments': 0, 'stale_writes': 0, 'reconciliations': 0,
+                       'drifted_counters': 0, 'fallbacks': 0}
+
+    def register(self, name, model, counts):
+        """Declare the named ``Count``s kept for ``model``'s table"""
+        counts = dict(counts)
+        self._tracked[model.__table__.name] = (name, model, counts)
+        # Setting an unloaded attribute then loads its old value, so the
+        # flush hook can move the row between counters instead of going stale
+        for column in set().union(*(count.columns for count in counts.values())):
+            sa.event.listen(getattr(model, column), 'set', _keep_old_value, active_history=True)
+
+    def attach(self):
+        """Follow the session's writes to the registered tables"""
+        sa.event.listen(self.db.session, 'after_flush', self._after_flush)
+        sa.event.listen(self.db.session, 'do_orm_execute', self._after_bulk_statement)
+
+    # Incremental maintenance
+
+    def _row_values(self, obj, columns, old):
+        """Old or new values of ``columns`` of a flushed object (``_UNKNOWN`` when not loaded)"""
+        state = sa.inspect(obj)
+        table = state.mapper.local_table
+        values = {}
+        for column in columns:
+            history = state.attrs[column].history
+            if not old:
+                # A column an INSERT left out is NULL unless the database fills it in
+                missing = None if state.pending and table.c[column].server_default is None else _UNKNOWN
+                values[column] = state.dict.get(column, missing)
+            elif history.deleted:
+                values[column] = history.deleted[0]
+            elif history.unchanged:
+                values[column] = history.unchanged[0]
+            else:
+                values[column] = _UNKNOWN
+        return values
+
+    def _keys(self, name, counts, values):
+        if any(value is _UNKNOWN for value in values.values()):
+            return None
+        return [f'{name}.{counter}{suffix}' for counter, count in counts.items()
+                for suffix in count.suffixes(values)]
+
+    def _after_flush(self, session, flush_context):
+        deltas = Counter()
+        stale = 0
+        changes = [(obj, None, 1) for obj in session.new] + [(obj, 1, None) for obj in session.deleted]
+        changes += [(obj, 1, 1) for obj in session.dirty]
+        for obj, before, after in changes:
+            tracked = self._tracked.get(getattr(obj, '__tablename__', None))
+            if tracked is None:
+                continue
+            name, model, counts = tracked
+            columns = set().union(*(count.columns for count in counts.values()))
+            state = sa.inspect(obj)
+            if before and after and not any(state.attrs[column].history.has_changes() for column in columns):
+                continue
+            old_keys = self._keys(name, counts, self._row_values(obj, columns, old=True)) if before else []
+            new_keys = self._keys(name, counts, self._row_values(obj, columns, old=False)) if after else []
+            if old_keys is None or new_keys is None:
+                stale += 1
+                continue
+            deltas.subtract(old_keys)
+            deltas.update(new_keys)
+
+        if stale:
+            deltas[STALE_KEY] += stale
+            self._stats['stale_writes'] += stale
+        rows = [{'name': key, 'value': delta} for key, delta in deltas.items() if delta]
+        if rows:
+            self._upsert(session.connection(), rows, increment=True)
+            self._stats['adjustments'] += 1
+
+    def columns(self, table_name):
+        """Columns the counters of a table depend on (empty when untracked)"""
+        tracked = self._tracked.get(table_name)
+        if tracked is None:
+            return set()
+        return set().union(*(count.columns for count in tracked[2].values()))
+
+    def _insert_default(self, column):
+        """Value a bulk INSERT stores in a column it leaves out"""
+        if column.server_default is not None:
+            return _UNKNOWN
+        default = column.default
+        if default is None:
+            return None
+        if default.is_callable:
+            return default.arg(None)
+        return default.arg if default.is_scalar else _UNKNOWN
+
+    def apply(self, session, table_name, changes):
+        """Apply the counter deltas of rows a bulk statement wrote.
+
+        ``changes`` are ``(old, new)`` pairs of column-value dicts: ``old`` is
+        None for an inserted row (left-out columns take their defaults),
+        ``new`` None for a deleted one; an update's ``new`` may hold only the
+        columns it set.  Counters a change cannot be resolved for go stale.
+        """
+        tracked = self._tracked.get(table_name)
+        if tracked is None:
+            return
+        name, model, counts = tracked
+        table = model.__table__
+        deltas = Counter()
+        stale = 0
+        for old, new in changes:
+            if old is None:
+                new = {column: new[column] if column in new else self._insert_default(table.c[column])
+                       for column in self.columns(table_name)}
+            elif new is not None:
+                new = {**old, **new}
+                changed = {column for column in new if old.get(column, _UNKNOWN) != new[column]}
+            for counter, count in counts.items():
+                if old is not None and new is not None and not count.columns & changed:
+                    continue
+                keys = []
+                for values, sign in ((old, -1), (new, 1)):
+                    if values is None:
+                        continue
+                    values = {column: values.get(column, _UNKNOWN) for column in count.columns}
+                    if any(value is _UNKNOWN for value in values.values()):
+                        keys = None
+                        break
+                    keys += [(f'{name}.{counter}{suffix}', sign) for suffix in count.suffixes(values)]
+                if keys is None:
+                    stale += 1
+                    continue
+                for key, sign in keys:
+                    deltas[key] += sign
+
+        if stale:
+            deltas[STALE_KEY] += stale
+            self._stats['stale_writes'] += stale
+        rows = [{'name': key, 'value': delta} for key, delta in deltas.items() if delta]
+        if rows:
+            self._upsert(session.connection(), rows, increment=True)
+            self._stats['adjustments'] += 1
+
+    def _after_bulk_statement(self, orm_execute_state):
+        """Flag the counters stale when a bulk statement writes a tracked table"""
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        if orm_execute_state.execution_options.get('dashboard_counters_applied'):
+            # The writer reports its changes to ``apply``
+            return
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name in self._tracked:
+            self._stats['stale_writes'] += 1
+            self._upsert(orm_execute_state.session.connection(), [{'name': STALE_KEY, 'value': 1}], increment=True)
+
+    def _upsert(self, connection, rows, increment):
+        """Add to (or with ``increment=False`` set) the named counters, creating missing rows"""
+        table = self.table
+        now = datetime.utcnow()
+        rows = [{**row, 'updated_at': now} for row in rows]
+        dialect = connection.dialect
+        insert = None
+        if dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= (3, 24):
+            from sqlalchemy.dialects.sqlite import insert
+        if insert is not None:
+            statement = insert(table)
+            value = table.c.value + statement.excluded.value if increment else statement.excluded.value
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['name'], set_={'value': value, 'updated_at': statement.excluded.updated_at}), rows)
+            return
+        update = sa.update(table).where(table.c.name == sa.bindparam('_name')).values(
+            value=(table.c.value + sa.bindparam('value')) if increment else sa.bindparam('value'),
+            updated_at=sa.bindparam('updated_at'))
+        for row in rows:
+            if not connection.execute(update, {**row, '_name': row['name']}).rowcount:
+                connection.execute(sa.insert(table), row)
+
+    # Reading and reconciliation
+
+    def recount(self):
+        """Every counter computed from the source tables, ``{key: value}``"""
+        session = self.db.session
+        dialect = session.get_bind().dialect
+        values = {}
+        for name, model, counts in self._tracked.values():
+            plain = {counter: count.clause(model) for counter, count in counts.items() if not count.grouped}
+            if plain:
+                row = session.execute(AggregateQuery(model, plain).statement(dialect)).mappings().one()
+                values.update({f'{name}.{counter}': int(value or 0) for counter, value in row.items()})
+            for counter, count in counts.items():
+                if not count.grouped:
+                    continue
+                group = count.group_column(model)
+                statement = sa.select(group, sa.func.count()).select_from(model.__table__).group_by(group)
+                clause = count.clause(model)
+                if clause is not None:
+                    statement = statement.where(clause)
+                for group_value, value in session.execute(statement):
+                    key = f'{name}.{counter}:{count.group_key(group_value)}'
+                    values[key] = values.get(key, 0) + int(value)
+        return values
+
+    def reconcile(self):
+        """Recount every counter and correct the stored values; returns the number that drifted"""
+        with self._reconcile_lock:
+            session = self.db.session
+            table = self.table
+            try:
+                stale = session.execute(
+                    sa.select(table.c.value).where(table.c.name == STALE_KEY)).scalar() or 0
+                target = self.recount()
+                current = dict(session.execute(
+                    sa.select(table.c.name, table.c.value).where(table.c.name.notin_([STALE_KEY, RECONCILED_KEY]))
+                ).all())
+                initial = not current
+                drift = {key: value for key, value in target.items() if current.get(key) != value}
+                removed = [key for key in current if key not in target]
+
+                connection = session.connection()
+                if drift:
+                    self._upsert(connection, [{'name': key, 'value': value} for key, value in drift.items()],
+                                 increment=False)
+                if removed:
+                    connection.execute(sa.delete(table).where(table.c.name.in_(removed)))
+                # Writes flagged since the recount started stay stale
+                self._upsert(connection, [{'name': STALE_KEY, 'value': -stale}], increment=True)
+                self._upsert(connection, [{'name': RECONCILED_KEY, 'value': int(time.time())}], increment=False)
+                session.commit()
+            except sa.exc.SQLAlchemyError:
+                session.rollback()
+                raise
+
+        drifted = len([key for key, value in drift.items() if current.get(key, 0) != value])
+        drifted += len([key for key in removed if current[key]])
+        self._stats['reconciliations'] += 1
+        self._stats['drifted_counters'] += 0 if initial or stale else drifted
+        if drifted and not initial and not stale:
+            logger.warning(f"Dashboard counters drifted: corrected {drifted} of {len(target)}")
+        else:
+            logger.info(f"Dashboard counters reconciled: {len(target)} counters, {drifted} updated")
+        return drifted
+
+    def read(self):
+        """Current counters as ``{name: {counter: value}}``; grouped counters map group to value.
+
+        Recounts first when stale or never reconciled, and falls back to a
+        live recount if the counters table cannot be read.
+        """
+        self._ensure_reconciler()
+        self._stats['reads'] += 1
+        table = self.table
+        try:
+            rows = dict(self.db.session.execute(sa.select(table.c.name, table.c.value)).all())
+            if rows.get(STALE_KEY, 0) > 0 or RECONCILED_KEY not in rows:
+                self.reconcile()
+                rows = dict(self.db.session.execute(sa.select(table.c.name, table.c.value)).all())
+        except sa.exc.SQLAlchemyError as e:
+            self.db.session.rollback()
+            self._stats['fallbacks'] += 1
+            logger.error(f"Dashboard counters unavailable, counting live: {e}")
+            rows = self.recount()
+        return self._shape(rows)
+
+    def _shape(self, rows):
+        result = {}
+        for name, _, counts in self._tracked.values():
+            section = result[name] = {}
+            for counter, count in counts.items():
+                key = f'{name}.{counter}'
+                if not count.grouped:
+                    section[counter] = int(rows.get(key, 0))
+                    continue
+                prefix = key + ':'
+                section[counter] = {row_key[len(prefix):]: int(value) for row_key, value in rows.items()
+                                    if row_key.startswith(prefix) and value}
+        return result
+
+    def _ensure_reconciler(self):
+        if self.app is None or (self._pid == os.getpid() and self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='dashboard-counters', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_seconds)
+            try:
+                with self.app.app_context():
+                    self.reconcile()
+            except Exception as e:
+                logger.error(f"Dashboard counter reconciliation failed: {e}")
+
+    def stats(self):
+        return {'tables': sorted(name for name, _, _ in self._tracked.values()), **self._stats}
@@ -0,0 +1,382 @@
+"""
+Database-backed outbound email queue.
+
+Request handlers no longer talk to SMTP.  They insert a row into the
+``email_outbox`` table (``enqueue``) and return; a dispatcher thread in each
+serving process drains due rows through per-kind sender functions.  Failed
+sends are retried with exponential backoff and jitter, and a message that
+keeps failing is parked in the ``dead`` state for inspection and manual retry
+instead of being silently lost.
+
+Every message carries an idempotency key, so double submissions, retried bulk
+jobs or two processes racing on the same event never send a message twice.
+Rows are claimed with a conditional UPDATE, so several gunicorn workers can
+run dispatchers against the same table.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Outbox configuration (overridable per deployment)
+OUTBOX_DISPATCHER_ENABLED = os.environ.get('OUTBOX_DISPATCHER_ENABLED', 'true').lower() == 'true'
+OUTBOX_POLL_SECONDS = int(os.environ.get('OUTBOX_POLL_SECONDS', 5))
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_CONCURRENCY = int(os.environ.get('OUTBOX_CONCURRENCY', 3))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 6))
+OUTBOX_BACKOFF_BASE_SECONDS = int(os.environ.get('OUTBOX_BACKOFF_BASE_SECONDS', 30))
+OUTBOX_BACKOFF_MAX_SECONDS = int(os.environ.get('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 600))
+
+OUTBOX_STATUSES = ['pending', 'sending', 'sent', 'dead']
+
+
+def backoff_delay(attempts, base=OUTBOX_BACKOFF_BASE_SECONDS, cap=OUTBOX_BACKOFF_MAX_SECONDS):
+    """Exponential backoff with +/-20% jitter for the given failed attempt count"""
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def create_outbox_model(db):
+    """Define the ``email_outbox`` table on ``db``"""
+
+    class EmailOutbox(db.Model):
+        __tablename__ = 'email_outbox'
+
+        id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+        idempotency_key = db.Column(db.String(200), nullable=False, unique=True)
+        kind = db.Column(db.String(50), nullable=False, index=True)  # certificate, welcome, announcement, ...
+        recipient = db.Column(db.String(150), nullable=False)
+        subject = db.Column(db.String(300))
+        payload = db.Column(db.Text)  # JSON consumed by the kind's sender
+        participant_id = db.Column(db.Integer, index=True)
+
+        # Delivery state
+        status = db.Column(db.String(20), nullable=False, default='pending')
+        attempts = db.Column(db.Integer, nullable=False, default=0)
+        max_attempts = db.Column(db.Integer, nullable=False, default=OUTBOX_MAX_ATTEMPTS)
+        next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+        last_error = db.Column(db.Text)
+        locked_by = db.Column(db.String(100))
+        locked_at = db.Column(db.DateTime)
+
+        created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+        sent_at = db.Column(db.DateTime)
+
+        __table_args__ = (
+            db.CheckConstraint(status.in_(OUTBOX_STATUSES), name='valid_outbox_status'),
+            db.Index('idx_outbox_status_due', 'status', 'next_attempt_at'),
+        )
+
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'idempotency_key': self.idempotency_key,
+                'kind': self.kind,
+                'recipient': self.recipient,
+                'subject': self.subject,
+                'participant_id': self.participant_id,
+                'status': self.status,
+                'attempts': self.attempts,
+                'max_attempts': self.max_attempts,
+                'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+                'last_error': self.last_error,
+                'locked_by': self.locked_by,
+                'created_at': self.created_at.isoformat() if self.created_at else None,
+                'sent_at': self.sent_at.isoformat() if self.sent_at else None
+            }
+
+    return EmailOutbox
+
+
+class OutboxDispatcher:
+    """Enqueues outbound email and drains the outbox in a background thread"""
+
+    def __init__(self, app, db, model, enabled=OUTBOX_DISPATCHER_ENABLED, concurrency=OUTBOX_CONCURRENCY,
+                 batch_size=OUTBOX_BATCH_SIZE, poll_seconds=OUTBOX_POLL_SECONDS):
+        self.app = app
+        self.db = db
+        self.Outbox = model
+        self.enabled = enabled
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.senders = {}
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stats = {'sent': 0, 'retried': 0, 'dead': 0}
+
+        # Start the dispatcher in the serving process, not a preload master
+        app.before_request(self._ensure_started)
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def register(self, kind, sender, on_dead=None):
+        """Register ``sender(message, payload)`` for a kind of email.
+
+        The sender runs inside an app context and raises on failure.
+        ``on_dead(message, payload)`` runs once a message is dead-lettered.
+        """
+        self.senders[kind] = (sender, on_dead)
+
+    def enqueue(self, kind, recipient, subject=None, payload=None, idempotency_key=None,
+                participant_id=None, max_attempts=OUTBOX_MAX_ATTEMPTS, commit=True):
+        """Queue one email; returns the existing row if the key was already used"""
+        idempotency_key = idempotency_key or f'{kind}:{recipient}:{time.time_ns()}'
+        existing = self.Outbox.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            if existing.status == 'dead':
+                # Re-enqueueing a dead message revives it
+                existing.status = 'pending'
+                existing.attempts = 0
+                existing.next_attempt_at = datetime.utcnow()
+                if commit:
+                    self.db.session.commit()
+                self.wake()
+            return existing
+
+        message = self.Outbox(
+            idempotency_key=idempotency_key,
+            kind=kind,
+            recipient=recipient,
+            subject=subject,
+            payload=json.dumps(payload or {}),
+            participant_id=participant_id,
+            max_attempts=max_attempts,
+            next_attempt_at=datetime.utcnow()
+        )
+        try:
+            with self.db.session.begin_nested():
+                self.db.session.add(message)
+        except sa.exc.IntegrityError:
+            # Another request inserted the same key between our check and insert
+            return self.Outbox.query.filter_by(idempotency_key=idempotency_key).first()
+        if commit:
+            self.db.session.commit()
+            self.wake()
+        return message
+
+    def enqueue_many(self, messages, commit=True, defer_seconds=0):
+        """Queue many emails in one insert, skipping keys that already exist.
+
+        ``messages`` are dicts with ``kind``, ``recipient``, ``idempotency_key``
+        and optionally ``subject``, ``payload`` and ``participant_id``.
+        ``defer_seconds`` keeps the dispatcher away from the new rows for a
+        while, for callers that deliver them right away via ``deliver_now``.
+        Returns the idempotency keys of the newly queued messages.
+        """
+        messages = list({m['idempotency_key']: m for m in messages}.values())
+        if not messages:
+            return []
+        existing = set()
+        keys = [m['idempotency_key'] for m in messages]
+        for start in range(0, len(keys), 500):
+            existing.update(key for (key,) in self.db.session.query(self.Outbox.idempotency_key).filter(
+                self.Outbox.idempotency_key.in_(keys[start:start + 500])))
+
+        now = datetime.utcnow()
+        due = now + timedelta(seconds=defer_seconds)
+        rows = [{
+            'idempotency_key': m['idempotency_key'],
+            'kind': m['kind'],
+            'recipient': m['recipient'],
+            'subject': m.get('subject'),
+            'payload': json.dumps(m.get('payload') or {}),
+            'participant_id': m.get('participant_id'),
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': m.get('max_attempts', OUTBOX_MAX_ATTEMPTS),
+            'next_attempt_at': due,
+            'created_at': now
+        } for m in messages if m['idempotency_key'] not in existing]
+        if rows:
+            self.db.session.execute(self.Outbox.__table__.insert(), rows)
+        if commit:
+            self.db.session.commit()
+            self.wake()
+        return [row['idempotency_key'] for row in rows]
+
+    def deliver_now(self, idempotency_key):
+        """Claim and send one pending message immediately, ignoring its due time.
+
+        Returns ``'sent'``, ``'retrying'``, ``'dead'`` or ``'skipped'`` when
+        another process already claimed or delivered the message.  Failures
+        stay in the outbox and are retried by the dispatcher as usual.
+        """
+        with self.app.app_context():
+            claimed = self.Outbox.query.filter_by(idempotency_key=idempotency_key, status='pending').update(
+                {'status': 'sending', 'locked_by': self.owner, 'locked_at': datetime.utcnow()},
+                synchronize_session=False)
+            self.db.session.commit()
+            if not claimed:
+                return 'skipped'
+            message_id = self.db.session.query(self.Outbox.id).filter_by(idempotency_key=idempotency_key).scalar()
+        return self._deliver(message_id)
+
+    def wake(self):
+        """Ask this process's dispatcher to look for due messages now"""
+        self._ensure_started()
+        self._wakeup.set()
+
+    def retry(self, message_id):
+        """Move a dead or pending message to the front of the queue"""
+        updated = self.Outbox.query.filter(
+            self.Outbox.id == message_id,
+            self.Outbox.status.in_(['dead', 'pending'])
+        ).update({'status': 'pending', 'attempts': 0, 'next_attempt_at': datetime.utcnow(),
+                  'last_error': None}, synchronize_session=False)
+        self.db.session.commit()
+        if updated:
+            self.wake()
+        return bool(updated)
+
+    def _ensure_started(self):
+        if not self.enabled or (self._pid == os.getpid() and self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='email-outbox-dispatcher', daemon=True)
+            self._thread.start()
+            logger.info(f"Email outbox dispatcher started in {self.owner}")
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='email-outbox') as pool:
+            while True:
+                try:
+                    with self.app.app_context():
+                        claimed = self._claim_due()
+                    if claimed:
+                        list(pool.map(self._deliver, claimed))
+                        continue  # more may be due; drain before sleeping
+                except Exception as e:
+                    logger.error(f"Email outbox dispatcher error: {e}", exc_info=True)
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def _claim_due(self):
+        """Claim up to one batch of due messages for this process"""
+        now = datetime.utcnow()
+        Outbox = self.Outbox
+
+        # Messages left in 'sending' by a process that died go back to pending
+        Outbox.query.filter(
+            Outbox.status == 'sending',
+            Outbox.locked_at < now - timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        ).update({'status': 'pending', 'locked_by': None}, synchronize_session=False)
+        self.db.session.commit()
+
+        candidates = [row.id for row in self.db.session.query(Outbox.id).filter(
+            Outbox.status == 'pending',
+            Outbox.next_attempt_at <= now
+        ).order_by(Outbox.next_attempt_at, Outbox.id).limit(self.batch_size)]
+
+        claimed = []
+        for message_id in candidates:
+            taken = Outbox.query.filter_by(id=message_id, status='pending').update(
+                {'status': 'sending', 'locked_by': self.owner, 'locked_at': now},
+                synchronize_session=False)
+            if taken:
+                claimed.append(message_id)
+        self.db.session.commit()
+        return claimed
+
+    def _deliver(self, message_id):
+        with self.app.app_context():
+            message = self.db.session.get(self.Outbox, message_id)
+            if message is None:
+                return 'skipped'
+            payload = json.loads(message.payload) if message.payload else {}
+            sender, on_dead = self.senders.get(message.kind, (None, None))
+            try:
+                if sender is None:
+                    raise LookupError(f'No sender registered for {message.kind} emails')
+                sender(message, payload)
+            except Exception as e:
+                self.db.session.rollback()
+                return self._record_failure(message_id, e, on_dead, payload)
+
+            self.Outbox.query.filter_by(id=message_id).update({
+                'status': 'sent',
+                'attempts': self.Outbox.attempts + 1,
+                'sent_at': datetime.utcnow(),
+                'last_error': None,
+                'locked_by': None
+            }, synchronize_session=False)
+            self.db.session.commit()
+            self._stats['sent'] += 1
+            return 'sent'
+
+    def _record_failure(self, message_id, error, on_dead, payload):
+        message = self.db.session.get(self.Outbox, message_id)
+        attempts = message.attempts + 1
+        message.attempts = attempts
+        message.last_error = str(error)[:2000]
+        message.locked_by = None
+        if attempts >= message.max_attempts:
+            message.status = 'dead'
+            self._stats['dead'] += 1
+            logger.warning(f"Email {message.idempotency_key} dead-lettered after {attempts} attempts: {error}")
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(attempts))
+            self._stats['retried'] += 1
+        self.db.session.commit()
+
+        if message.status == 'dead' and on_dead is not None:
+            try:
+                on_dead(message, payload)
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                logger.error(f"Dead-letter hook failed for {message.idempotency_key}: {e}")
+        return 'dead' if message.status == 'dead' else 'retrying'
+
+    def summary(self):
+        """Counts by status and kind, plus the oldest pending message age"""
+        counts = {}
+        for kind, status, count in self.db.session.query(
+                self.Outbox.kind, self.Outbox.status, sa.func.count(self.Outbox.id)
+        ).group_by(self.Outbox.kind, self.Outbox.status):
+            counts.setdefault(kind, {})[status] = count
+        totals = {status: sum(kinds.get(status, 0) for kinds in counts.values()) for status in OUTBOX_STATUSES}
+        oldest = self.db.session.query(sa.func.min(self.Outbox.created_at)).filter(
+            self.Outbox.status == 'pending').scalar()
+        return {
+            'totals': totals,
+            'by_kind': counts,
+            'oldest_pending_seconds': round((datetime.utcnow() - oldest).total_seconds()) if oldest else 0,
+            'dispatcher': self.stats()
+        }
+
+    def stats(self):
+        """This process's dispatcher counters; no database access, so safe for health checks"""
+        return {
+            'enabled': self.enabled,
+            'running_here': bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+            **self._stats
+        }
+
+    def messages(self, status=None, kind=None, limit=50):
+        query = self.Outbox.query
+        if status:
+            query = query.filter_by(status=status)
+        if kind:
+            query = query.filter_by(kind=kind)
+        return query.order_by(self.Outbox.created_at.desc()).limit(limit).all()
@@ -0,0 +1,133 @@
+"""
+Pre-compiled email bodies.
+
+Outbound emails used to rebuild their full HTML and text bodies with a large
+f-string for every recipient, although the styles, header and footer never
+change.  ``EmailTemplateRegistry`` compiles each kind of email once: the
+``str.format``-style source is parsed into literal chunks, fields that are the
+same for every recipient of that kind (certificate wording, for example) are
+folded into the literals at registration time, and only the per-recipient
+fields are joined in when a message is built.
+
+Every registered kind greets the recipient by name, so the rendered bodies
+(and attachments such as certificate PDFs) are still MIME-encoded per
+message; only the quoted-printable UTF-8 charset is shared.
+"""
+
+import logging
+import string
+from email import charset as email_charset
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+logger = logging.getLogger(__name__)
+
+# Quoted-printable keeps mostly-ASCII HTML compact and readable on the wire
+UTF8_QP = email_charset.Charset('utf-8')
+UTF8_QP.body_encoding = email_charset.QP
+
+
+class CompiledText:
+    """A ``str.format`` source parsed once into literals and field names"""
+
+    def __init__(self, source, static=None):
+        static = static or {}
+        self.source = source
+        self.chunks = []
+        self.fields = set()
+        literal = []
+        for text, field, spec, conversion in string.Formatter().parse(source):
+            literal.append(text)
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f'Format specs are not supported in email templates: {{{field}}}')
+            if field in static:
+                # Same value for every recipient: fold it into the literal
+                literal.append(str(static[field]))
+                continue
+            self.chunks.append((''.join(literal), field))
+            self.fields.add(field)
+            literal = []
+        self.tail = ''.join(literal)
+
+    def render(self, fields):
+        parts = []
+        for text, field in self.chunks:
+            parts.append(text)
+            parts.append(str(fields[field]))
+        parts.append(self.tail)
+        return ''.join(parts)
+
+
+class EmailTemplate:
+    """Subject, HTML and plain-text bodies of one kind of email"""
+
+    def __init__(self, kind, subject, html, text=None, static=None):
+        self.kind = kind
+        self.subject = CompiledText(subject, static)
+        self.html = CompiledText(html, static)
+        self.text = CompiledText(text, static) if text is not None else None
+        self.fields = self.subject.fields | self.html.fields | (self.text.fields if self.text else set())
+
+    def render(self, **fields):
+        """Return ``(subject, html, text)`` for one recipient"""
+        missing = self.fields - fields.keys()
+        if missing:
+            raise KeyError(f"Missing fields for {self.kind} email: {', '.join(sorted(missing))}")
+        return (
+            self.subject.render(fields),
+            self.html.render(fields),
+            self.text.render(fields) if self.text else None,
+        )
+
+
+class EmailTemplateRegistry:
+    """Email kinds compiled at startup and turned into MIME messages per recipient"""
+
+    def __init__(self, from_addr):
+        self.from_addr = from_addr
+        self._templates = {}
+        self._stats = {'messages_built': 0}
+
+    def register(self, kind, subject, html, text=None, **static):
+        """Compile an email kind; ``static`` fields are resolved once, here"""
+        template = EmailTemplate(kind, subject, html, text, static)
+        self._templates[kind] = template
+        logger.info(f"Compiled email template {kind} ({len(template.fields)} per-recipient fields)")
+        return template
+
+    def get(self, kind):
+        return self._templates[kind]
+
+    @staticmethod
+    def _attachment_part(filename, content):
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(content)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename= "{filename}"')
+        return part
+
+    def build(self, kind, to_addr, attachments=(), **fields):
+        """Build the MIME message of ``kind`` for one recipient.
+
+        ``attachments`` are ``(filename, bytes)`` pairs.
+        """
+        template = self._templates[kind]
+        subject, html, text = template.render(**fields)
+        msg = MIMEMultipart()
+        msg['From'] = self.from_addr
+        msg['To'] = to_addr
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html', UTF8_QP))
+        if text is not None:
+            msg.attach(MIMEText(text, 'plain', UTF8_QP))
+        for filename, content in attachments:
+            msg.attach(self._attachment_part(filename, content))
+        self._stats['messages_built'] += 1
+        return msg
+
+    def stats(self):
+        return {'kinds': sorted(self._templates), **self._stats}
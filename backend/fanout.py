@@ -0,0 +1,126 @@
+"""
+Concurrent fan-out of per-recipient deliveries across notification channels.
+
+Announcements, notifications and program reminders used to walk their
+recipient list one participant at a time inside the request.  ``FanOutExecutor``
+runs the deliveries on one bounded thread pool per channel (email, push), so
+each channel has its own concurrency cap, and aggregates the per-recipient
+outcomes into a report with counts, sample errors and deliveries per second.
+
+Pools are created per process and shared by every fan-out in that process,
+so the caps hold however many announcements are being delivered at once.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Per-channel concurrency caps (overridable per deployment)
+FANOUT_EMAIL_CONCURRENCY = int(os.environ.get('FANOUT_EMAIL_CONCURRENCY', 3))
+FANOUT_PUSH_CONCURRENCY = int(os.environ.get('FANOUT_PUSH_CONCURRENCY', 10))
+
+# Number of per-recipient errors kept in a report
+MAX_REPORTED_ERRORS = 20
+
+
+class FanOutExecutor:
+    """Bounded per-channel thread pools for delivering to many recipients"""
+
+    def __init__(self, channel_limits=None):
+        self.channel_limits = channel_limits or {
+            'email': FANOUT_EMAIL_CONCURRENCY,
+            'push': FANOUT_PUSH_CONCURRENCY,
+        }
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pools = {}
+        self._stats = {'fanouts': 0, 'deliveries': 0, 'failures': 0, 'active': 0}
+
+    def _pool(self, channel):
+        # Threads do not survive a fork, so each worker process gets its own pools
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pools = {}
+            if channel not in self._pools:
+                workers = max(1, self.channel_limits.get(channel, 1))
+                self._pools[channel] = ThreadPoolExecutor(max_workers=workers,
+                                                          thread_name_prefix=f'fanout-{channel}')
+            return self._pools[channel]
+
+    def run(self, deliveries):
+        """Deliver ``(channel, recipient, deliver)`` tuples and wait for all of them.
+
+        ``deliver()`` returns an outcome label (``'sent'``, ``'queued'``, ...),
+        ``True``/``None`` for sent or ``False`` for failed, or raises.
+        Returns the aggregated report.
+        """
+        started = time.monotonic()
+        self._stats['fanouts'] += 1
+        self._stats['active'] += 1
+        futures = {}
+        try:
+            for channel, recipient, deliver in deliveries:
+                futures[self._pool(channel).submit(deliver)] = (channel, recipient)
+            wait(futures)
+        finally:
+            self._stats['active'] -= 1
+
+        channels = {}
+        errors = []
+        for future, (channel, recipient) in futures.items():
+            counts = channels.setdefault(channel, {})
+            error = future.exception()
+            if error is not None:
+                outcome = 'failed'
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'channel': channel, 'recipient': recipient, 'error': str(error)})
+            else:
+                outcome = future.result()
+                if outcome is True or outcome is None:
+                    outcome = 'sent'
+                elif outcome is False:
+                    outcome = 'failed'
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+        elapsed = time.monotonic() - started
+        failed = sum(counts.get('failed', 0) for counts in channels.values())
+        self._stats['deliveries'] += len(futures)
+        self._stats['failures'] += failed
+        return {
+            'channels': channels,
+            'deliveries': len(futures),
+            'failed': failed,
+            'errors': errors,
+            'duration_seconds': round(elapsed, 3),
+            'deliveries_per_second': round(len(futures) / elapsed, 2) if elapsed > 0 else float(len(futures)),
+        }
+
+    def submit(self, deliveries, on_complete=None, name='fanout'):
+        """Run a fan-out in a background thread and pass its report to ``on_complete``"""
+        deliveries = list(deliveries)
+
+        def runner():
+            try:
+                report = self.run(deliveries)
+            except Exception as e:
+                logger.error(f"Fan-out {name} failed: {e}", exc_info=True)
+                return
+            logger.info(f"Fan-out {name}: {report['deliveries']} deliveries, "
+                        f"{report['failed']} failed, {report['deliveries_per_second']}/s")
+            if on_complete is not None:
+                try:
+                    on_complete(report)
+                except Exception as e:
+                    logger.error(f"Fan-out {name} completion hook failed: {e}", exc_info=True)
+
+        thread = threading.Thread(target=runner, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        return {'channel_limits': dict(self.channel_limits), **self._stats}
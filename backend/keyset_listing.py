@@ -0,0 +1,184 @@
+"""
+Keyset-paginated, field-selectable table listings.
+
+``GET /api/participants`` used to return every row with its full
+``to_dict()`` payload, so the response grew with every registration and the
+admin table downloaded all of it again on each refresh.  ``KeysetListing``
+serves one page at a time: rows are ordered by an indexed column with the id
+as tie-breaker, and the opaque ``cursor`` of the next page holds the last
+row's ``(sort value, id)``, so each page is an index range scan of ``limit``
+rows however deep it is (unlike ``OFFSET``, which reads and discards every
+earlier row).  ``fields=`` selects only the requested columns, and equality
+filters on indexed columns are applied in the query.
+"""
+
+import base64
+import binascii
+import json
+import os
+from datetime import date, datetime
+
+import sqlalchemy as sa
+
+# Page sizes (overridable per deployment)
+LISTING_DEFAULT_LIMIT = int(os.environ.get('LISTING_DEFAULT_LIMIT', 50))
+LISTING_MAX_LIMIT = int(os.environ.get('LISTING_MAX_LIMIT', 500))
+
+LISTING_PARAMETERS = ('limit', 'cursor', 'fields', 'sort')
+
+
+class ListingError(ValueError):
+    """Invalid listing parameters, reported to the client as a 400"""
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return str
+
+
+def _parse(column, raw):
+    """Convert a query-string or cursor value to the column's Python type"""
+    if raw is None or raw == 'null':
+        return None
+    kind = _python_type(column)
+    try:
+        if kind is bool:
+            if str(raw).lower() not in ('true', 'false', '1', '0'):
+                raise ValueError(raw)
+            return str(raw).lower() in ('true', '1')
+        if kind is datetime:
+            return datetime.fromisoformat(raw)
+        if kind is date:
+            return date.fromisoformat(raw)
+        return kind(raw)
+    except (TypeError, ValueError):
+        raise ListingError(f'Invalid value for {column.name}: {raw}')
+
+
+class KeysetListing:
+    """Pages of one table's rows, ordered by a sortable column and the id"""
+
+    def __init__(self, model, fields, filters=(), sorts=(), default_sort='-id', default_fields=None,
+                 default_limit=LISTING_DEFAULT_LIMIT, max_limit=LISTING_MAX_LIMIT):
+        self.table = model.__table__
+        self.fields = tuple(fields)
+        self.default_fields = tuple(default_fields or fields)
+        self.filters = tuple(filters)
+        self.sorts = set(sorts) | {'id'}
+        self.default_sort = default_sort
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.id_column = self.table.c.id
+
+    def requested(self, args):
+        """Whether the request asks for a page rather than the whole table"""
+        return any(name in args for name in LISTING_PARAMETERS + self.filters)
+
+    def _selected_fields(self, raw):
+        if not raw:
+            return self.default_fields
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ListingError(f'Unknown fields: {", ".join(unknown)}')
+        return tuple(dict.fromkeys(names))
+
+    def _sort(self, raw):
+        raw = raw or self.default_sort
+        name = raw.lstrip('-')
+        if name not in self.sorts:
+            raise ListingError(f'Cannot sort by {name}; sortable: {", ".join(sorted(self.sorts))}')
+        return name, raw.startswith('-')
+
+    def _limit(self, raw):
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ListingError('limit must be a number')
+        if limit < 1:
+            raise ListingError('limit must be at least 1')
+        return min(limit, self.max_limit)
+
+    @staticmethod
+    def encode_cursor(sort, value, row_id):
+        token = json.dumps({'s': sort, 'v': _json_value(value), 'id': row_id}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, raw, sort, column):
+        try:
+            token = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+            cursor_sort, value, row_id = token['s'], token['v'], int(token['id'])
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise ListingError('Invalid cursor')
+        if cursor_sort != sort:
+            raise ListingError('Cursor does not match the sort order')
+        return _parse(column, value), row_id
+
+    def _after(self, column, descending, value, row_id):
+        """Rows after the cursor row in ``(column, id)`` order, NULLs last"""
+        ident = self.id_column
+        past_id = ident < row_id if descending else ident > row_id
+        if value is None:
+            return sa.and_(column.is_(None), past_id)
+        literal = sa.bindparam(None, value, type_=column.type)
+        position = sa.tuple_(column, ident)
+        past = position < sa.tuple_(literal, row_id) if descending else position > sa.tuple_(literal, row_id)
+        if not column.nullable:
+            return past
+        return sa.or_(sa.and_(column.isnot(None), past), column.is_(None))
+
+    def statement(self, args):
+        """``(select, fields, sort, limit)`` for the page described by ``args``"""
+        fields = self._selected_fields(args.get('fields'))
+        sort_name, descending = self._sort(args.get('sort'))
+        sort = ('-' if descending else '') + sort_name
+        limit = self._limit(args.get('limit'))
+        column = self.table.c[sort_name]
+
+        # The sort column and id are always read, to build the next cursor
+        names = dict.fromkeys(fields + (sort_name, 'id'))
+        statement = sa.select(*[self.table.c[name] for name in names])
+        for name in self.filters:
+            raw = args.get(name)
+            if raw is None:
+                continue
+            values = [_parse(self.table.c[name], value) for value in raw.split(',')]
+            options = [self.table.c[name].in_([value for value in values if value is not None])]
+            if None in values:
+                options.append(self.table.c[name].is_(None))
+            statement = statement.where(sa.or_(*options))
+
+        if args.get('cursor'):
+            value, row_id = self._decode_cursor(args['cursor'], sort, column)
+            statement = statement.where(self._after(column, descending, value, row_id))
+
+        order = [column.desc(), self.id_column.desc()] if descending else [column.asc(), self.id_column.asc()]
+        if column.nullable:
+            order.insert(0, column.is_(None))
+        return statement.order_by(*order).limit(limit + 1), fields, sort, limit
+
+    def page(self, session, args):
+        """One page of rows as ``{'items', 'next_cursor', 'has_more', 'limit', 'sort'}``"""
+        statement, fields, sort, limit = self.statement(args)
+        rows = session.execute(statement).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = self.encode_cursor(sort, last[sort.lstrip('-')], last['id'])
+        return {
+            'items': [{name: _json_value(row[name]) for name in fields} for row in rows],
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'limit': limit,
+            'sort': sort
+        }
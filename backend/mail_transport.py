@@ -0,0 +1,279 @@
+"""
+Pooled SMTP transport shared by every outbound mail path.
+
+Opening a connection, running STARTTLS and authenticating for each message
+costs several round-trips more than the message itself.  ``MailTransport``
+keeps a small pool of authenticated sessions, reuses them across messages,
+reconnects transparently when a server drops an idle or long-lived session,
+and throttles sending to a per-server rate limit.  The limit is enforced in
+each process, so ``SMTP_RATE_LIMIT_PER_MINUTE`` is split evenly across the
+``SMTP_RATE_LIMIT_WORKERS`` processes sending mail (gunicorn's
+``WEB_CONCURRENCY`` by default).  ``send_many`` delivers a
+batch back-to-back over a single session.
+
+smtplib does not implement the PIPELINING extension, so commands within one
+message are still sent in lock-step; the saving comes from skipping the
+connect/TLS/AUTH handshake for every message after the first.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Transport configuration (overridable per deployment)
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 3))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_SESSION', 100))
+SMTP_IDLE_CHECK_SECONDS = int(os.environ.get('SMTP_IDLE_CHECK_SECONDS', 60))
+SMTP_TIMEOUT = int(os.environ.get('SMTP_TIMEOUT', 30))
+SMTP_RATE_LIMIT_PER_MINUTE = int(os.environ.get('SMTP_RATE_LIMIT_PER_MINUTE', 0))  # 0 = unlimited
+# Processes sharing the rate limit, each allowed an equal share of it
+SMTP_RATE_LIMIT_WORKERS = int(os.environ.get('SMTP_RATE_LIMIT_WORKERS', os.environ.get('WEB_CONCURRENCY', 1)))
+
+
+def _is_connection_error(error):
+    """True when a session is unusable and the message should be retried once"""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421  # service closing transmission channel
+    if isinstance(error, smtplib.SMTPException):
+        return False  # refused recipients, rejected data etc. are not transient
+    return isinstance(error, OSError)
+
+
+class RateLimiter:
+    """Token bucket limiting messages per minute for one SMTP server"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        # A share below one message a minute still needs room for one token
+        self.capacity = max(1.0, float(per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.per_minute <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * 60.0 / self.per_minute
+            time.sleep(wait)
+
+
+# Rate limits apply per server, however many transports point at it
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _rate_limiter_for(host, port, per_minute):
+    with _rate_limiters_lock:
+        key = (host, port)
+        if key not in _rate_limiters:
+            # This process's share of the server's limit
+            _rate_limiters[key] = RateLimiter(per_minute / max(1, SMTP_RATE_LIMIT_WORKERS))
+        return _rate_limiters[key]
+
+
+class _Session:
+    """One authenticated SMTP connection"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.server = None
+        self.connect()
+
+    def connect(self):
+        t = self.transport
+        if not t.host:
+            raise smtplib.SMTPException('EMAIL_HOST is not configured')
+        if t.use_ssl:
+            server = smtplib.SMTP_SSL(t.host, t.port, timeout=t.timeout)
+        else:
+            server = smtplib.SMTP(t.host, t.port, timeout=t.timeout)
+            if t.use_tls:
+                server.starttls()
+                server.ehlo()
+        if t.user and t.password:
+            server.login(t.user, t.password)
+        self.server = server
+        self.messages_sent = 0
+        t._stats['connections_opened'] += 1
+
+    def healthy(self):
+        if self.server is None:
+            return False
+        if self.messages_sent >= self.transport.max_messages_per_session:
+            return False
+        if time.monotonic() - self.last_used > self.transport.idle_check_seconds:
+            try:
+                return self.server.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def send(self, msg, from_addr, to_addrs):
+        self.transport.rate_limiter.acquire()
+        self.server.send_message(msg, from_addr=from_addr, to_addrs=to_addrs)
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+
+    def close(self):
+        server, self.server = self.server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+class MailTransport:
+    """Small pool of reusable, authenticated SMTP sessions"""
+
+    def __init__(self, host, port=587, user=None, password=None, use_tls=True, use_ssl=None,
+                 pool_size=SMTP_POOL_SIZE, max_messages_per_session=SMTP_MAX_MESSAGES_PER_SESSION,
+                 idle_check_seconds=SMTP_IDLE_CHECK_SECONDS, timeout=SMTP_TIMEOUT,
+                 rate_limit_per_minute=SMTP_RATE_LIMIT_PER_MINUTE):
+        self.host = host
+        self.port = int(port or 587)
+        self.user = user
+        self.password = password
+        self.use_ssl = (self.port == 465) if use_ssl is None else use_ssl
+        self.use_tls = use_tls and not self.use_ssl
+        self.pool_size = max(1, pool_size)
+        self.max_messages_per_session = max(1, max_messages_per_session)
+        self.idle_check_seconds = idle_check_seconds
+        self.timeout = timeout
+        self.rate_limiter = _rate_limiter_for(host, self.port, rate_limit_per_minute)
+        self._stats = {'messages_sent': 0, 'messages_failed': 0, 'connections_opened': 0, 'reconnects': 0}
+        self._pid = None
+        self._reset_pool()
+        atexit.register(self.close)
+
+    def _reset_pool(self):
+        # Sockets must not be shared with a forked child, so each process
+        # (e.g. every gunicorn worker) builds its own pool
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def _acquire(self):
+        if self._pid != os.getpid():
+            self._reset_pool()
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    return _Session(self)
+                if session.healthy():
+                    return session
+                session.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, session, broken=False):
+        if broken or session.server is None:
+            session.close()
+        else:
+            self._idle.put(session)
+        self._slots.release()
+
+    def _send_on(self, session, msg, from_addr, to_addrs):
+        try:
+            session.send(msg, from_addr, to_addrs)
+        except Exception as e:
+            if not _is_connection_error(e):
+                raise
+            # The server dropped the session (idle timeout, message cap, 421);
+            # reconnect once and retry the same message
+            logger.info(f"SMTP session lost ({e}); reconnecting")
+            session.close()
+            self._stats['reconnects'] += 1
+            session.connect()
+            session.send(msg, from_addr, to_addrs)
+
+    def send(self, msg, from_addr=None, to_addrs=None):
+        """Send one email.message.Message over a pooled session"""
+        session = self._acquire()
+        broken = False
+        try:
+            self._send_on(session, msg, from_addr, to_addrs)
+            self._stats['messages_sent'] += 1
+        except Exception as e:
+            # Refused recipients or rejected data leave the session usable
+            broken = _is_connection_error(e)
+            self._stats['messages_failed'] += 1
+            raise
+        finally:
+            self._release(session, broken)
+
+    def send_many(self, messages):
+        """Send ``(msg, from_addr, to_addrs)`` tuples back-to-back over one session.
+
+        Returns a list of ``(ok, error)`` pairs in input order.
+        """
+        results = []
+        session = None
+        try:
+            for msg, from_addr, to_addrs in messages:
+                try:
+                    if session is None:
+                        session = self._acquire()
+                    elif session.messages_sent >= self.max_messages_per_session:
+                        session.close()
+                        session.connect()
+                    self._send_on(session, msg, from_addr, to_addrs)
+                    self._stats['messages_sent'] += 1
+                    results.append((True, None))
+                except Exception as e:
+                    self._stats['messages_failed'] += 1
+                    results.append((False, str(e)))
+                    # A bad address or rejected message does not affect the session
+                    if session is not None and _is_connection_error(e):
+                        self._release(session, broken=True)
+                        session = None
+        finally:
+            if session is not None:
+                self._release(session)
+        return results
+
+    def close(self):
+        """Close all idle sessions held by this process"""
+        if self._pid != os.getpid():
+            return
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {
+            'host': self.host,
+            'pool_size': self.pool_size,
+            'idle_sessions': self._idle.qsize() if self._pid == os.getpid() else 0,
+            'rate_limit_per_minute': round(self.rate_limiter.per_minute, 2),
+            'rate_limit_workers': SMTP_RATE_LIMIT_WORKERS,
+            **self._stats,
+        }
@@ -3,7 +3,7 @@ Enhanced minimal version of the backend app that provides core functionality
 without pandas/numpy dependencies for stable deployment.
 Version: 2.1.1 - Updated signature paths to prioritize build directory (August 18, 2025)
 """
-from flask import Flask, request, jsonify, send_file, render_template_string, send_from_directory, after_this_request
+from flask import Flask, request, jsonify, send_file, render_template_string, send_from_directory
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 import sqlalchemy as sa
@@ -12,10 +12,8 @@ import os
 import sys
 import json
 import uuid
-import tempfile
 import base64
 import mimetypes
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
@@ -25,6 +23,18 @@ from jinja2 import Template
 from threading import Thread
 import signal
 import threading
+from certificate_renderer import RendererPool
+from certificate_templates import CertificateTemplateRegistry, TemplateNotFound
+from certificate_cache import CertificateCache, certificate_key
+from certificate_assets import CertificateAssetRegistry
+from bulk_jobs import create_bulk_job_models, BulkJobEngine, JobStateError
+from mail_transport import MailTransport
+from email_outbox import create_outbox_model, OutboxDispatcher
+from pdf_delivery import pdf_response
+from dashboard_counters import create_counter_model, DashboardCounters, Count
+from response_cache import ResponseCache
+from keyset_listing import KeysetListing, ListingError
+from bulk_import import BulkImporter, collect_import, stream_import, wants_stream
 
 # Load environment variables - prioritize container environment over .env files
 try:
@@ -68,33 +78,9 @@ except Exception as e:
 # Optional dependencies with graceful fallback
 def generate_pdf_with_timeout(html, config, options, timeout=30):
     """Generate PDF with timeout to prevent hanging"""
-    result = {"pdf": None, "error": None}
-    
-    def pdf_worker():
-        try:
-            result["pdf"] = pdfkit.from_string(html, False, configuration=config, options=options)
-        except Exception as e:
-            result["error"] = str(e)
-    
-    # Start PDF generation in a separate thread
-    thread = threading.Thread(target=pdf_worker)
-    thread.daemon = True
-    thread.start()
-    
-    # Wait for completion or timeout
-    thread.join(timeout)
-    
-    if thread.is_alive():
-        # Thread is still running - timeout occurred
-        raise TimeoutError(f"PDF generation timed out after {timeout} seconds")
-    
-    if result["error"]:
-        raise Exception(result["error"])
-    
-    if result["pdf"] is None:
-        raise Exception("PDF generation failed without error message")
-    
-    return result["pdf"]
+    # Jobs run on the shared renderer pool; a timed-out job has its
+    # wkhtmltopdf process killed and the worker replaced
+    return certificate_renderer.render(html, options=options, timeout=timeout)
 
 try:
     import pdfkit
@@ -145,6 +131,10 @@ except ImportError as e:
     PDF_CONFIG = None
     PDF_GENERATION_AVAILABLE = False
 
+# Pool of long-lived wkhtmltopdf workers shared by all certificate routes
+_pdf_config = globals().get('PDF_CONFIG')
+certificate_renderer = RendererPool(wkhtmltopdf_path=_pdf_config.wkhtmltopdf if _pdf_config else None)
+
 # Initialize Flask app
 app = Flask(__name__, 
             static_folder='../frontend/build/static',
@@ -278,6 +268,13 @@ class Participant(db.Model):
     registration_status = db.Column(db.String(20), default='Pending')
     registration_fee_paid = db.Column(db.Boolean, default=False)
     
+    __table_args__ = (
+        db.Index('ix_participant_date_registered_id', 'date_registered', 'id'),
+        db.Index('ix_participant_email', 'email'),
+        db.Index('ix_participant_registration_status', 'registration_status'),
+        db.Index('ix_participant_cert_type', 'cert_type'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -298,6 +295,39 @@ class Participant(db.Model):
             'registration_status': self.registration_status,
             'registration_fee_paid': self.registration_fee_paid
         }
+
+# Bulk certificate jobs and their per-participant checkpoints
+BulkJob, BulkJobItem = create_bulk_job_models(db)
+
+# Durable queue of outbound email drained by a background dispatcher
+EmailOutbox = create_outbox_model(db)
+
+# Participant counts for both statistics endpoints, kept up to date by every
+# write and recounted periodically by a background thread
+DashboardCounter = create_counter_model(db)
+dashboard_counters = DashboardCounters(db, DashboardCounter, app=app)
+dashboard_counters.register('participants', Participant, {
+    'total': Count(),
+    'by_cert_type': Count(group_by='cert_type'),
+    'sent': Count(cert_sent=True),
+    'pending': Count(cert_sent=(False, None)),
+    'by_registration_status': Count(group_by='registration_status'),
+    'fees_paid': Count(registration_fee_paid=True)
+})
+dashboard_counters.attach()
+
+# Paged participant listing with column selection and indexed filters
+participant_listing = KeysetListing(
+    Participant,
+    fields=[column.name for column in Participant.__table__.columns],
+    filters=['email', 'cert_type', 'registration_status'],
+    sorts=['date_registered', 'name', 'email'],
+    default_sort='-date_registered'
+)
+
+# Both statistics endpoints are polled by every open tab; serve them from a
+# short-lived cache with ETags
+response_cache = ResponseCache(ttl=int(os.environ.get('STATS_CACHE_TTL_SECONDS', 5)))
         
 # Ensure the database is created (useful for SQLite)
 with app.app_context():
@@ -311,6 +341,9 @@ with app.app_context():
         # Create tables if connection is successful
         print("📋 Creating database tables...")
         db.create_all()
+        # create_all skips tables that already exist; add any missing indexes
+        for index in Participant.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
         print("✅ Database tables created successfully")
         
         # Test a simple query to ensure everything works
@@ -332,97 +365,36 @@ EMAIL_USER = os.environ.get('EMAIL_USER')
 EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')
 EMAIL_FROM = os.environ.get('EMAIL_FROM', 'MDCAN BDM 2025 <noreply@mdcan.org>')
 
+# Pooled SMTP sessions shared by all outbound mail
+mail_transport = MailTransport(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD)
+
 # Certificate template configuration
 CERT_EVENT_TEXT = "MEDICAL AND DENTAL CONSULTANTS' ASSOCIATION OF NIGERIA 14th Biennial Delegates' Meeting and SCIENTIFIC Conference on 1st–6th September, 2025"
 CERT_SERVICE_TEXT = "the successful hosting of the MEDICAL AND DENTAL CONSULTANTS' ASSOCIATION OF NIGERIA 14th Biennial Delegates' Meeting and SCIENTIFIC Conference on 1st–6th September, 2025"
 
-# Helper function to load and encode signature files
-def load_signature_file(filename):
-    """Load signature file and return base64 encoded string with proper MIME type"""
-    try:
-        # Try multiple possible paths for the signature files - prioritize build directory for transparent versions
-        static_dir = os.path.join(os.path.dirname(__file__), 'static')
-        possible_paths = [
-            os.path.join(static_dir, filename),  # Absolute path to backend/static
-            filename
-        ]
-        for path in possible_paths:
-            if os.path.exists(path):
-                try:
-                    with open(path, 'rb') as f:
-                        image_data = f.read()
-                        # Determine MIME type
-                        if filename.lower().endswith('.png'):
-                            mime_type = 'image/png'
-                        elif filename.lower().endswith(('.jpg', '.jpeg')):
-                            mime_type = 'image/jpeg'
-                        else:
-                            mime_type = 'image/png'  # Default
-                        encoded = base64.b64encode(image_data).decode('utf-8')
-                        print(f"Loaded signature file: {path} ({len(image_data)} bytes, {mime_type})")
-                        return f"data:{mime_type};base64,{encoded}"
-                except Exception as e:
-                    print(f"Error reading signature file {path}: {e}")
-        print(f"Signature file {filename} not found or unreadable in backend/static. Returning empty string.")
-        # Optionally, return a placeholder transparent PNG if file is missing
-        return ""
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    image_data = f.read()
-                    # Determine MIME type
-                    if filename.lower().endswith('.png'):
-                        mime_type = 'image/png'
-                    elif filename.lower().endswith(('.jpg', '.jpeg')):
-                        mime_type = 'image/jpeg'
-                    else:
-                        mime_type = 'image/png'  # Default
-                    
-                    encoded = base64.b64encode(image_data).decode('utf-8')
-                    print(f"Loaded signature file: {path} ({len(image_data)} bytes, {mime_type})")
-                    return f"data:{mime_type};base64,{encoded}"
-        
-        print(f"Warning: Signature file {filename} not found in any of the expected paths")
-        return ""
-    except Exception as e:
-        print(f"Error loading signature file {filename}: {e}")
-        return ""
-
-# Load signature files at startup - using specific paths for better versions
-def load_signature_from_path(file_path):
-    """Load signature file from specific path"""
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
-                if file_path.lower().endswith('.png'):
-                    mime_type = 'image/png'
-                elif file_path.lower().endswith(('.jpg', '.jpeg')):
-                    mime_type = 'image/jpeg'
-                else:
-                    mime_type = 'image/png'
-                encoded = base64.b64encode(image_data).decode('utf-8')
-                print(f"Loaded signature from: {file_path} ({len(image_data)} bytes, {mime_type})")
-                return encoded  # Return just the base64 string without data URL prefix
-        print(f"Warning: Signature file not found at {file_path}")
-        return ""
-    except Exception as e:
-        print(f"Error loading signature from {file_path}: {e}")
-        return ""
-
-# Load signatures from build directory for president and secretary, static for chairman
+# Signatures and logo, read, validated and base64-encoded once at import so
+# gunicorn workers forked from the preloaded app share one copy
 build_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'build')
 static_dir = os.path.join(os.path.dirname(__file__), 'static')
-PRESIDENT_SIGNATURE = load_signature_from_path(os.path.join(build_dir, 'president-signature.png'))
-CHAIRMAN_SIGNATURE = load_signature_from_path(os.path.join(static_dir, 'chairman-signature.png'))
-SECRETARY_SIGNATURE = load_signature_from_path(os.path.join(build_dir, 'Dr_Augustine_Duru_signature.png'))
-
-# Load logo file
-MDCAN_LOGO = load_signature_file('logo-mdcan.jpeg')
+certificate_assets = CertificateAssetRegistry()
+certificate_assets.define('president_signature', [os.path.join(build_dir, 'president-signature.png')])
+certificate_assets.define('chairman_signature', [os.path.join(static_dir, 'chairman-signature.png')])
+certificate_assets.define('secretary_signature', [os.path.join(build_dir, 'Dr_Augustine_Duru_signature.png')])
+certificate_assets.define('logo', [os.path.join(static_dir, 'logo-mdcan.jpeg'), 'logo-mdcan.jpeg'])
+certificate_assets.load()
+app.before_request(certificate_assets.refresh_if_stale)
+
+def certificate_asset_context():
+    """Template values for the certificate images (signatures as bare base64, logo as a data URI)"""
+    return {
+        'president_signature': certificate_assets.base64('president_signature'),
+        'chairman_signature': certificate_assets.base64('chairman_signature'),
+        'secretary_signature': certificate_assets.base64('secretary_signature'),
+        'logo': certificate_assets.data_uri('logo')
+    }
 
-print(f"Signatures loaded - President: {'✓' if PRESIDENT_SIGNATURE else '✗'}, Chairman: {'✓' if CHAIRMAN_SIGNATURE else '✗'}, Secretary: {'✓' if SECRETARY_SIGNATURE else '✗'}")
-print(f"Logo loaded: {'✓' if MDCAN_LOGO else '✗'}")
+print(f"Signatures loaded - President: {'✓' if certificate_assets.get('president_signature') else '✗'}, Chairman: {'✓' if certificate_assets.get('chairman_signature') else '✗'}, Secretary: {'✓' if certificate_assets.get('secretary_signature') else '✗'}")
+print(f"Logo loaded: {'✓' if certificate_assets.get('logo') else '✗'}")
 
 # Certificate templates
 PARTICIPATION_CERTIFICATE_TEMPLATE = """
@@ -661,6 +633,40 @@ SERVICE_CERTIFICATE_TEMPLATE = """
 </html>
 """
 
+# Compile certificate templates once; autoescape matches render_template_string
+certificate_templates = CertificateTemplateRegistry(
+    context_builder=lambda participant: {
+        'name': participant.name,
+        'certificate_id': participant.certificate_id,
+        **certificate_asset_context()
+    },
+    type_getter=lambda participant: participant.cert_type,
+    autoescape=True
+)
+certificate_templates.register('participation', PARTICIPATION_CERTIFICATE_TEMPLATE, context={
+    'event_text': CERT_EVENT_TEXT
+})
+certificate_templates.register('service', SERVICE_CERTIFICATE_TEMPLATE, context={
+    'service_text': CERT_SERVICE_TEXT
+})
+
+# Rendered certificate PDFs keyed by everything that affects their content
+certificate_cache = CertificateCache()
+CERTIFICATE_RENDER_FIELDS = ('name', 'cert_type', 'certificate_id')
+
+def get_certificate_pdf(participant, options=None, timeout=30):
+    """Return certificate PDF bytes for a participant, rendering only on a cache miss"""
+    compiled = certificate_templates.get(participant.cert_type)
+    cache_key = certificate_key(participant.name, compiled.cert_type, participant.certificate_id,
+                                compiled.version, options=options,
+                                asset_fingerprints=certificate_assets.fingerprints())
+    return certificate_cache.get_or_render(
+        cache_key,
+        lambda: generate_pdf_with_timeout(certificate_templates.render(participant, compiled.cert_type),
+                                          globals().get('PDF_CONFIG'), options, timeout=timeout),
+        participant.id
+    )
+
 @app.route('/test-simple')
 def test_simple():
     """Simple test route to verify routing is working"""
@@ -687,6 +693,17 @@ def health():
             "environment": os.environ.get('FLASK_ENV', 'development'),
             "port": os.environ.get('PORT', '8080'),
             "pdf_generation": globals().get('PDF_GENERATION_AVAILABLE', False),
+            "pdf_renderer": certificate_renderer.stats(),
+            "certificate_cache": certificate_cache.stats(),
+            "certificate_jobs": certificate_jobs.stats(),
+            "mail_transport": mail_transport.stats(),
+            "email_outbox": email_outbox.stats(),
+            "certificate_assets": {
+                "version": certificate_assets.version,
+                "missing": certificate_assets.describe()['missing']
+            },
+            "dashboard_counters": dashboard_counters.stats(),
+            "response_cache": response_cache.stats(),
             "frontend_build": bool(FRONTEND_BUILD_FOLDER and os.path.exists(FRONTEND_BUILD_FOLDER)),
             "deployment": "DIGITAL_OCEAN_TARGETED_FIXES_v3"
         }
@@ -1383,6 +1400,10 @@ def update_participant(id):
                 
         db.session.commit()
         
+        # Drop cached PDFs if a field printed on the certificate changed
+        if any(key in data for key in CERTIFICATE_RENDER_FIELDS):
+            certificate_cache.invalidate(participant.id)
+        
         return jsonify({
             "status": "success",
             "message": "Participant updated successfully",
@@ -1431,27 +1452,7 @@ def generate_certificate(participant_id):
             }), 404
             
         # Generate certificate HTML
-        if participant.cert_type == 'service':
-            html = render_template_string(
-                SERVICE_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                service_text=CERT_SERVICE_TEXT,
-                certificate_id=participant.certificate_id,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                secretary_signature=SECRETARY_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
-        else:
-            # Default to participation certificate
-            html = render_template_string(
-                PARTICIPATION_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                event_text=CERT_EVENT_TEXT,
-                certificate_id=participant.certificate_id,
-                president_signature=PRESIDENT_SIGNATURE,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
+        html = certificate_templates.render(participant)
             
         # Generate PDF
         try:
@@ -1463,7 +1464,7 @@ def generate_certificate(participant_id):
                     "available_features": ["registration", "admin_portal", "database"]
                 }), 503
                 
-            pdf = pdfkit.from_string(html, False, configuration=PDF_CONFIG)
+            pdf = get_certificate_pdf(participant)
         except Exception as e:
             # For environments where wkhtmltopdf might not be available
             return jsonify({
@@ -1473,25 +1474,8 @@ def generate_certificate(participant_id):
                 "troubleshooting": "This may indicate missing system dependencies like wkhtmltopdf"
             }), 500
             
-        # Create a temporary file to serve
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_file.write(pdf)
-        temp_file.close()
-        
-        @after_this_request
-        def cleanup(response):
-            try:
-                os.unlink(temp_file.name)
-            except:
-                pass
-            return response
-            
-        return send_file(
-            temp_file.name, 
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"certificate_{participant.name.replace(' ', '_')}.pdf"
-        )
+        # Serve the bytes directly; no temporary file is left behind
+        return pdf_response(pdf, f"certificate_{participant.name.replace(' ', '_')}.pdf", as_attachment=True)
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -1504,6 +1488,22 @@ def generate_certificate(participant_id):
 @app.route('/api/participants', methods=['GET'])
 def get_participants():
     try:
+        if participant_listing.requested(request.args):
+            # One keyset page, newest first by (date_registered, id)
+            try:
+                page = participant_listing.page(db.session, request.args)
+            except ListingError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+            return jsonify({
+                "status": "success",
+                "count": len(page['items']),
+                "participants": page['items'],
+                "limit": page['limit'],
+                "sort": page['sort'],
+                "next_cursor": page['next_cursor'],
+                "has_more": page['has_more']
+            })
+        
         participants = Participant.query.all()
         return jsonify({
             "status": "success",
@@ -1737,50 +1737,6 @@ def get_participant_dashboard(email):
             "message": str(e)
         }), 500
 
-def send_email(recipient_email, subject, body, attachment_path=None):
-    """Send email with optional attachment"""
-    try:
-        if not all([EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD]):
-            print("[EMAIL] Email configuration incomplete")
-            return False
-            
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = recipient_email
-        msg['Subject'] = subject
-        
-        # Add body
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Add attachment if provided
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as attachment:
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(attachment.read())
-                
-            encoders.encode_base64(part)
-            
-            filename = os.path.basename(attachment_path)
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename= {filename}",
-            )
-            msg.attach(part)
-        
-        # Send email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"[EMAIL] Email sent successfully to {recipient_email}")
-        return True
-        
-    except Exception as e:
-        print(f"[EMAIL] Error sending email to {recipient_email}: {e}")
-        return False
-
 # Email certificate function
 @app.route('/api/send-certificate/<int:participant_id>', methods=['POST'])
 def send_certificate(participant_id):
@@ -1876,27 +1832,7 @@ def send_certificate(participant_id):
         print(f"[CERTIFICATE] Generating certificate for: {participant.name}")
         
         # Generate certificate PDF first
-        if participant.cert_type == 'service':
-            html = render_template_string(
-                SERVICE_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                service_text=CERT_SERVICE_TEXT,
-                certificate_id=participant.certificate_id,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                secretary_signature=SECRETARY_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
-        else:
-            # Default to participation certificate
-            html = render_template_string(
-                PARTICIPATION_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                event_text=CERT_EVENT_TEXT,
-                certificate_id=participant.certificate_id,
-                president_signature=PRESIDENT_SIGNATURE,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
+        html = certificate_templates.render(participant)
         
         # Generate PDF
         try:
@@ -1928,7 +1864,7 @@ def send_certificate(participant_id):
             }
             
             # Generate PDF with 30-second timeout
-            pdf = generate_pdf_with_timeout(html, PDF_CONFIG, pdf_options, timeout=30)
+            pdf = get_certificate_pdf(participant, pdf_options, timeout=30)
             print(f"[CERTIFICATE] PDF generated successfully, size: {len(pdf)} bytes")
         except Exception as e:
             print(f"[CERTIFICATE] PDF generation error: {str(e)}")
@@ -1938,26 +1874,6 @@ def send_certificate(participant_id):
                 "troubleshooting": "This may indicate missing system dependencies like wkhtmltopdf"
             }), 500
             
-        # Create a temporary file for the PDF
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        temp_file.write(pdf)
-        temp_file.close()
-        print(f"[CERTIFICATE] PDF saved to temporary file: {temp_file.name}")
-        
-        # Check if email configuration is available (already checked above, but for safety)
-        if not all([EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD]):
-            os.unlink(temp_file.name)
-            return jsonify({
-                "status": "error",
-                "message": "Email configuration is incomplete"
-            }), 500
-            
-        # Setup email message
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = participant.email
-        msg['Subject'] = f"Your MDCAN BDM 2025 Certificate - {participant.name}"
-        
         # Email body
         email_body = f"""
         Dear {participant.name},
@@ -1972,227 +1888,255 @@ def send_certificate(participant_id):
         MDCAN BDM 2025 Team
         """
         
-        msg.attach(MIMEText(email_body, 'plain'))
-        
-        # Attach the PDF certificate
-        with open(temp_file.name, "rb") as attachment:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(attachment.read())
-            
-        encoders.encode_base64(part)
-        
-        filename = f"MDCAN_Certificate_{participant.name.replace(' ', '_')}.pdf"
-        part.add_header(
-            "Content-Disposition",
-            f"attachment; filename= {filename}",
+        # The rendered PDF stays in the certificate cache; the outbox
+        # dispatcher attaches it and sends with retries
+        message = queue_certificate_email(
+            participant,
+            f"Your MDCAN BDM 2025 Certificate - {participant.name}",
+            email_body,
+            f"MDCAN_Certificate_{participant.name.replace(' ', '_')}.pdf",
+            resend=participant.cert_sent
         )
-        
-        msg.attach(part)
-        
-        # Send email in a separate thread to avoid blocking
-        def send_email_task():
-            try:
-                print(f"[EMAIL] Starting email send to {participant.email}")
-                server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-                server.starttls()
-                server.login(EMAIL_USER, EMAIL_PASSWORD)
-                server.send_message(msg)
-                server.quit()
-                print(f"[EMAIL] Email sent successfully to {participant.email}")
-                
-                # Update participant record
-                with app.app_context():
-                    participant.cert_sent = True
-                    participant.cert_sent_date = datetime.utcnow()
-                    db.session.commit()
-                    print(f"[EMAIL] Updated participant record for {participant.name}")
-            except Exception as e:
-                print(f"[EMAIL] Error sending email to {participant.email}: {e}")
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(temp_file.name)
-                    print(f"[EMAIL] Cleaned up temporary file: {temp_file.name}")
-                except:
-                    pass
-                    
-        # Start email thread
-        email_thread = Thread(target=send_email_task)
-        email_thread.start()
-        print(f"[CERTIFICATE] Email queued for {participant.name}")
+        print(f"[CERTIFICATE] Email queued for {participant.name} (outbox #{message.id})")
         
         return jsonify({
             "status": "success",
-            "message": "Certificate has been queued for sending"
+            "message": "Certificate has been queued for sending",
+            "outbox_id": message.id
         })
     except Exception as e:
         print(f"[CERTIFICATE] Error in send_certificate: {str(e)}")
-        # Clean up temp file if it exists
-        try:
-            if 'temp_file' in locals():
-                os.unlink(temp_file.name)
-                print(f"[CERTIFICATE] Cleaned up temp file after error")
-        except:
-            pass
-            
+        db.session.rollback()
         return jsonify({
             "status": "error",
             "message": str(e),
             "participant_id": participant_id
         }), 500
 
+# PDF options used for emailed certificates
+EMAIL_PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '0.75in',
+    'margin-right': '0.75in', 
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'load-error-handling': 'ignore',
+    'load-media-error-handling': 'ignore',
+    'javascript-delay': 1000,
+    'print-media-type': None
+}
+
+def deliver_certificate_email(message, payload):
+    """Outbox sender that attaches the (usually cached) certificate PDF and emails it"""
+    participant = db.session.get(Participant, message.participant_id)
+    if participant is None:
+        return
+    pdf = get_certificate_pdf(participant, EMAIL_PDF_OPTIONS, timeout=30)
+    if not pdf:
+        raise RuntimeError("PDF generation failed")
+    
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_FROM
+    msg['To'] = message.recipient
+    msg['Subject'] = message.subject
+    msg.attach(MIMEText(payload.get('body', ''), 'plain'))
+    
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(pdf)
+    encoders.encode_base64(part)
+    part.add_header(
+        "Content-Disposition",
+        f"attachment; filename= {payload.get('filename', 'MDCAN_Certificate.pdf')}",
+    )
+    msg.attach(part)
+    
+    mail_transport.send(msg)
+    print(f"[EMAIL] Email sent successfully to {message.recipient}")
+    
+    participant.cert_sent = True
+    participant.cert_sent_date = datetime.utcnow()
+    db.session.commit()
+
+email_outbox = OutboxDispatcher(app, db, EmailOutbox)
+email_outbox.register('certificate', deliver_certificate_email)
+
+def queue_certificate_email(participant, subject, body, filename, resend=False):
+    """Queue a participant's certificate email; repeated calls send it once"""
+    idempotency_key = f"certificate:{participant.id}:{participant.certificate_id or ''}"
+    if resend:
+        # An explicit resend is a new message, de-duplicated per minute
+        idempotency_key += f":resend:{datetime.utcnow().strftime('%Y%m%d%H%M')}"
+    return email_outbox.enqueue(
+        'certificate', participant.email,
+        subject=subject,
+        payload={'body': body, 'filename': filename},
+        idempotency_key=idempotency_key,
+        participant_id=participant.id
+    )
+
+def process_certificate_job_item(participant_id, params):
+    """Render one participant's certificate and queue its email as part of a bulk job"""
+    participant = db.session.get(Participant, participant_id)
+    if participant is None or (participant.cert_sent and not params.get('resend')):
+        return 'skipped'
+    
+    # Check certificate sending schedule (same logic as individual send)
+    now = datetime.now()
+    current_date = now.date()
+    august_2025_start = datetime(2025, 8, 1).date()
+    august_2025_end = datetime(2025, 8, 31).date()
+    conference_start = datetime(2025, 9, 5, 17, 0, 0)
+    if not (august_2025_start <= current_date <= august_2025_end or now >= conference_start):
+        print(f"[BULK SEND] Skipping {participant.name} - outside allowed time window")
+        return 'skipped'
+    
+    if not globals().get('PDF_GENERATION_AVAILABLE', False):
+        raise RuntimeError("PDF generation not available")
+    
+    # Rendering here warms the certificate cache for the outbox dispatcher
+    pdf = get_certificate_pdf(participant, EMAIL_PDF_OPTIONS, timeout=30)
+    if not pdf:
+        raise RuntimeError("PDF generation failed")
+    
+    cert_type_text = "Service" if participant.cert_type == 'service' else "Participation"
+    subject = f"MDCAN BDM 14th - 2025 Certificate of {cert_type_text}"
+    body = f"""
+Dear {participant.name},
+
+Please find attached your Certificate of {cert_type_text} for the MDCAN BDM 14th - 2025.
+
+Best regards,
+MDCAN BDM 2025 Organizing Committee
+"""
+    filename = f"MDCAN_BDM_2025_Certificate_{participant.name.replace(' ', '_')}.pdf"
+    queue_certificate_email(participant, subject, body, filename, resend=bool(params.get('resend')))
+    print(f"[BULK SEND] Queued certificate email for {participant.name}")
+    return 'succeeded'
+
+certificate_jobs = BulkJobEngine(app, db, BulkJob, BulkJobItem)
+certificate_jobs.register('send_certificates', process_certificate_job_item)
+
 # Send all certificates endpoint
 @app.route('/api/send-all-certificates', methods=['POST'])
 def send_all_certificates():
     try:
-        print("[BULK SEND] Starting bulk certificate send process")
+        print("[BULK SEND] Queueing bulk certificate send job")
+        data = request.get_json(silent=True) or {}
         
         # Get all participants who haven't received certificates yet
-        participants = Participant.query.filter_by(cert_sent=False).all()
+        participant_ids = [row.id for row in db.session.query(Participant.id).filter_by(cert_sent=False).order_by(Participant.id)]
         
-        if not participants:
+        if not participant_ids:
             return jsonify({
                 "status": "info",
                 "message": "No participants found who need certificates",
                 "count": 0
             })
         
-        print(f"[BULK SEND] Found {len(participants)} participants to send certificates to")
-        
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for participant in participants:
-            try:
-                print(f"[BULK SEND] Processing {participant.name} ({participant.email})")
-                
-                # Check certificate sending schedule (same logic as individual send)
-                now = datetime.now()
-                current_date = now.date()
-                
-                # Allow sending during August 2025 (entire month for testing)
-                august_2025_start = datetime(2025, 8, 1).date()
-                august_2025_end = datetime(2025, 8, 31).date()
-                
-                # Allow sending from September 5, 2025 at 5:00 PM onwards
-                conference_start = datetime(2025, 9, 5, 17, 0, 0)
-                
-                if not (august_2025_start <= current_date <= august_2025_end or now >= conference_start):
-                    print(f"[BULK SEND] Skipping {participant.name} - outside allowed time window")
-                    continue
-                
-                # Generate certificate based on type
-                if participant.cert_type == 'service':
-                    html = render_template_string(
-                        SERVICE_CERTIFICATE_TEMPLATE,
-                        name=participant.name,
-                        service_text=CERT_SERVICE_TEXT,
-                        certificate_id=participant.certificate_id,
-                        chairman_signature=CHAIRMAN_SIGNATURE,
-                        secretary_signature=SECRETARY_SIGNATURE,
-                        logo=MDCAN_LOGO
-                    )
-                else:
-                    html = render_template_string(
-                        PARTICIPATION_CERTIFICATE_TEMPLATE,
-                        name=participant.name,
-                        event_text=CERT_EVENT_TEXT,
-                        certificate_id=participant.certificate_id,
-                        president_signature=PRESIDENT_SIGNATURE,
-                        chairman_signature=CHAIRMAN_SIGNATURE,
-                        logo=MDCAN_LOGO
-                    )
-                
-                # Generate PDF
-                if not globals().get('PDF_GENERATION_AVAILABLE', False):
-                    print(f"[BULK SEND] PDF generation not available, skipping {participant.name}")
-                    error_count += 1
-                    errors.append(f"{participant.name}: PDF generation not available")
-                    continue
-                
-                # PDF generation options
-                pdf_options = {
-                    'page-size': 'A4',
-                    'margin-top': '0.75in',
-                    'margin-right': '0.75in', 
-                    'margin-bottom': '0.75in',
-                    'margin-left': '0.75in',
-                    'encoding': "UTF-8",
-                    'no-outline': None,
-                    'enable-local-file-access': None,
-                    'load-error-handling': 'ignore',
-                    'load-media-error-handling': 'ignore',
-                    'javascript-delay': 1000,
-                    'print-media-type': None
-                }
-                
-                # Generate PDF with timeout
-                pdf = generate_pdf_with_timeout(html, PDF_CONFIG, pdf_options, timeout=30)
-                
-                if not pdf:
-                    print(f"[BULK SEND] PDF generation failed for {participant.name}")
-                    error_count += 1
-                    errors.append(f"{participant.name}: PDF generation failed")
-                    continue
-                
-                # Create temporary file for email
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-                temp_file.write(pdf)
-                temp_file.close()
-                
-                # Send email with certificate
-                cert_type_text = "Service" if participant.cert_type == 'service' else "Participation"
-                subject = f"MDCAN BDM 14th - 2025 Certificate of {cert_type_text}"
-                body = f"""
-Dear {participant.name},
-
-Please find attached your Certificate of {cert_type_text} for the MDCAN BDM 14th - 2025.
-
-Best regards,
-MDCAN BDM 2025 Organizing Committee
-"""
-                
-                # Send email
-                if send_email(participant.email, subject, body, temp_file.name):
-                    participant.cert_sent = True
-                    participant.cert_sent_date = datetime.utcnow()
-                    db.session.commit()
-                    success_count += 1
-                    print(f"[BULK SEND] Successfully sent certificate to {participant.name}")
-                else:
-                    error_count += 1
-                    errors.append(f"{participant.name}: Email sending failed")
-                    print(f"[BULK SEND] Failed to send certificate to {participant.name}")
-                
-                # Clean up temp file
-                try:
-                    os.unlink(temp_file.name)
-                except:
-                    pass
-                    
-            except Exception as e:
-                error_count += 1
-                errors.append(f"{participant.name}: {str(e)}")
-                print(f"[BULK SEND] Error processing {participant.name}: {e}")
-        
-        print(f"[BULK SEND] Bulk send completed. Success: {success_count}, Errors: {error_count}")
+        job = certificate_jobs.submit('send_certificates', participant_ids, params={'source': 'send_all'},
+                                      concurrency=data.get('concurrency'))
+        print(f"[BULK SEND] Job {job.id} queued for {job.total} participants")
         
         return jsonify({
-            "status": "success",
-            "message": f"Bulk certificate send completed",
-            "success_count": success_count,
-            "error_count": error_count,
-            "errors": errors[:10] if errors else []  # Limit error list to first 10
-        })
+            "status": "accepted",
+            "message": f"Bulk certificate job {job.id} queued for {job.total} participants",
+            "job_id": job.id,
+            "status_url": f"/api/certificate-jobs/{job.id}",
+            "job": job.to_dict()
+        }), 202
         
     except Exception as e:
+        db.session.rollback()
         print(f"[BULK SEND] Error in send_all_certificates: {str(e)}")
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+@app.route('/api/certificate-jobs', methods=['GET'])
+def get_certificate_jobs():
+    """List recent bulk certificate jobs"""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({
+        "status": "success",
+        "jobs": [job.to_dict() for job in certificate_jobs.recent(limit)]
+    })
+
+@app.route('/api/certificate-jobs/<int:job_id>', methods=['GET'])
+def get_certificate_job(job_id):
+    """Progress, throughput and recent failures of a bulk certificate job"""
+    job = certificate_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+    return jsonify({
+        "status": "success",
+        "job": job.to_dict(),
+        "failures": certificate_jobs.failures(job_id, limit=request.args.get('failures', 20, type=int))
+    })
+
+@app.route('/api/certificate-jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_certificate_job(job_id):
+    """Stop a bulk certificate job once in-flight participants finish"""
+    try:
+        job = certificate_jobs.cancel(job_id)
+    except JobStateError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 409
+    return jsonify({
+        "status": "success",
+        "message": f"Certificate job {job_id} cancelled",
+        "job": job.to_dict()
+    })
+
+@app.route('/api/certificate-jobs/<int:job_id>/resume', methods=['POST'])
+def resume_certificate_job(job_id):
+    """Resume a cancelled, failed or interrupted bulk certificate job"""
+    data = request.get_json(silent=True) or {}
+    try:
+        job = certificate_jobs.resume(job_id, retry_failed=bool(data.get('retry_failed')))
+    except JobStateError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 409
+    return jsonify({
+        "status": "accepted",
+        "message": f"Certificate job {job_id} resumed",
+        "job": job.to_dict()
+    }), 202
+
+@app.route('/api/email-outbox', methods=['GET'])
+def get_email_outbox():
+    """Outbox counts by status and kind, plus recent messages (e.g. ?status=dead)"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    messages = email_outbox.messages(request.args.get('status'), request.args.get('kind'), limit)
+    return jsonify({
+        "status": "success",
+        "summary": email_outbox.summary(),
+        "messages": [message.to_dict() for message in messages]
+    })
+
+@app.route('/api/email-outbox/<int:message_id>/retry', methods=['POST'])
+def retry_email_outbox_message(message_id):
+    """Requeue a dead-lettered (or waiting) email for immediate delivery"""
+    if not email_outbox.retry(message_id):
+        return jsonify({
+            "status": "error",
+            "message": "Message not found or not retryable"
+        }), 404
+    return jsonify({
+        "status": "accepted",
+        "message": f"Email {message_id} requeued"
+    }), 202
+
 # Favicon route to prevent 404 errors
 @app.route('/favicon.ico')
 def favicon():
@@ -2208,8 +2152,13 @@ def favicon():
         return '', 204
 
 # Bulk operations
+# Participant fields a bulk upsert may change on an existing participant
+BULK_UPDATE_FIELDS = ('role', 'cert_type', 'phone', 'gender', 'specialty', 'state', 'hospital',
+                      'registration_status', 'registration_fee_paid')
+
 @app.route('/api/bulk/participants', methods=['POST'])
 def bulk_add_participants():
+    """Add participants in bulk; ?mode=upsert updates those already registered under the same email"""
     try:
         data = request.json
         if not data or not isinstance(data, list):
@@ -2218,50 +2167,83 @@ def bulk_add_participants():
                 "message": "Invalid data format. Expected a list of participants."
             }), 400
             
-        added_participants = []
-        errors = []
+        mode = (request.args.get('mode') or 'insert').lower()
+        if mode not in ('insert', 'upsert'):
+            return jsonify({
+                "status": "error",
+                "message": "Import mode must be insert or upsert."
+            }), 400
         
-        for item in data:
-            try:
+        # One pass over the payload; validation needs no database round-trips
+        rows = []
+        rejected = []
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                rejected.append((index, "Expected a participant object"))
+                continue
+            name = str(item.get('name') or '').strip()
+            email = str(item.get('email') or '').strip()
+            if not name or not email:
+                rejected.append((index, "Missing name or email"))
+                continue
+            if mode == 'upsert':
+                # Only the fields sent are written, so omitted ones are never reset to defaults
+                values = {field: item[field] for field in BULK_UPDATE_FIELDS if field in item}
+            else:
+                values = {
+                    'role': item.get('role', 'Attendee'),
+                    'cert_type': item.get('cert_type', 'participation'),
+                    'phone': item.get('phone'),
+                    'gender': item.get('gender'),
+                    'specialty': item.get('specialty'),
+                    'state': item.get('state'),
+                    'hospital': item.get('hospital'),
+                    'registration_status': item.get('registration_status', 'Pending'),
+                    'registration_fee_paid': item.get('registration_fee_paid', False)
+                }
+            rows.append((index, {
+                **values,
+                'name': name,
+                'email': email,
                 # Generate a unique registration number if not provided
-                if not item.get('registration_number'):
-                    item['registration_number'] = f"MDCAN-{uuid.uuid4().hex[:8].upper()}"
-                    
-                # Generate a unique certificate ID
-                item['certificate_id'] = f"CERT-{uuid.uuid4().hex[:12].upper()}"
-                
-                new_participant = Participant(
-                    name=item.get('name'),
-                    email=item.get('email'),
-                    role=item.get('role', 'Attendee'),
-                    cert_type=item.get('cert_type', 'participation'),
-                    registration_number=item.get('registration_number'),
-                    phone=item.get('phone'),
-                    gender=item.get('gender'),
-                    specialty=item.get('specialty'),
-                    state=item.get('state'),
-                    hospital=item.get('hospital'),
-                    certificate_id=item.get('certificate_id'),
-                    registration_status=item.get('registration_status', 'Pending'),
-                    registration_fee_paid=item.get('registration_fee_paid', False)
-                )
-                
-                db.session.add(new_participant)
-                db.session.flush()
-                added_participants.append(new_participant.to_dict())
-            except Exception as e:
-                errors.append({
-                    "data": item,
-                    "error": str(e)
-                })
-                
-        db.session.commit()
+                'registration_number': item.get('registration_number') or f"MDCAN-{uuid.uuid4().hex[:8].upper()}",
+                'certificate_id': f"CERT-{uuid.uuid4().hex[:12].upper()}"
+            }))
+        
+        # Duplicates are resolved with batched IN lookups and rows inserted in chunks
+        importer = BulkImporter(db, Participant, unique_keys=('email', 'registration_number'),
+                                serialize=Participant.to_dict, mode=mode,
+                                update_columns=('name',) + BULK_UPDATE_FIELDS)
+        events = importer.run(rows, rejected)
+        
+        def with_data(event):
+            if 'row' in event:
+                event = {**event, "data": data[event['row']]}
+            return event
+        
+        if wants_stream(request):
+            return stream_import(events, transform=with_data)
+        
+        errors, summary = collect_import(events)
+        errors = [with_data(error) for error in errors]
+        if mode == 'upsert':
+            return jsonify({
+                "status": "success",
+                "message": f"Inserted {summary['added']}, updated {summary['updated']} and left {summary['unchanged']} participants unchanged with {len(errors)} errors",
+                "inserted": summary['added'],
+                "updated": summary['updated'],
+                "unchanged": summary['unchanged'],
+                "errors": errors,
+                "duration_seconds": summary['duration_seconds']
+            })
+        added_participants = importer.inserted
         
         return jsonify({
             "status": "success",
             "message": f"Added {len(added_participants)} participants with {len(errors)} errors",
             "added": added_participants,
-            "errors": errors
+            "errors": errors,
+            "duration_seconds": summary['duration_seconds']
         })
     except Exception as e:
         db.session.rollback()
@@ -2316,20 +2298,22 @@ def debug_files():
     return jsonify(file_structure)
 
 @app.route('/api/statistics', methods=['GET'])
+@response_cache.cached('stats')
 def get_statistics():
     try:
-        total_participants = Participant.query.count()
-        participation_certs = Participant.query.filter_by(cert_type='participation').count()
-        service_certs = Participant.query.filter_by(cert_type='service').count()
-        certificates_sent = Participant.query.filter_by(cert_sent=True).count()
+        counts = dashboard_counters.read()['participants']
+        total_participants = counts['total']
+        participation_certs = counts['by_cert_type'].get('participation', 0)
+        service_certs = counts['by_cert_type'].get('service', 0)
+        certificates_sent = counts['sent']
         
         # Registration status stats
-        pending_registrations = Participant.query.filter_by(registration_status='Pending').count()
-        approved_registrations = Participant.query.filter_by(registration_status='Approved').count()
-        rejected_registrations = Participant.query.filter_by(registration_status='Rejected').count()
+        pending_registrations = counts['by_registration_status'].get('Pending', 0)
+        approved_registrations = counts['by_registration_status'].get('Approved', 0)
+        rejected_registrations = counts['by_registration_status'].get('Rejected', 0)
         
         # Fee payment stats
-        fees_paid = Participant.query.filter_by(registration_fee_paid=True).count()
+        fees_paid = counts['fees_paid']
         
         return jsonify({
             "status": "success",
@@ -2508,31 +2492,12 @@ def test_certificate(participant_id):
             }), 403
         
         # Generate certificate HTML
-        if participant.cert_type == 'service':
-            html = render_template_string(
-                SERVICE_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                service_text=CERT_SERVICE_TEXT,
-                certificate_id=participant.certificate_id,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                secretary_signature=SECRETARY_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
-        else:
-            html = render_template_string(
-                PARTICIPATION_CERTIFICATE_TEMPLATE,
-                name=participant.name,
-                event_text=CERT_EVENT_TEXT,
-                certificate_id=participant.certificate_id,
-                president_signature=PRESIDENT_SIGNATURE,
-                chairman_signature=CHAIRMAN_SIGNATURE,
-                logo=MDCAN_LOGO
-            )
+        html = certificate_templates.render(participant)
         
         # Test PDF generation
         if globals().get('PDF_GENERATION_AVAILABLE', False):
             try:
-                pdf = pdfkit.from_string(html, False, configuration=PDF_CONFIG)
+                pdf = get_certificate_pdf(participant)
                 print(f"[TEST-CERT] PDF generated successfully, size: {len(pdf)} bytes")
                 pdf_status = "success"
                 pdf_size = len(pdf)
@@ -2574,6 +2539,72 @@ def test_certificate(participant_id):
             "message": str(e)
         }), 500
 
+@app.route('/api/certificates/templates', methods=['GET'])
+def get_certificate_templates():
+    """List compiled certificate templates and their versions"""
+    return jsonify({
+        "status": "success",
+        "templates": certificate_templates.versions()
+    })
+
+@app.route('/api/certificates/templates/reload', methods=['POST'])
+def reload_certificate_templates():
+    """Hot-reload certificate templates after CERTIFICATE_TEMPLATE_DIR was edited"""
+    data = request.get_json(silent=True) or {}
+    try:
+        # Sources are only re-read from CERTIFICATE_TEMPLATE_DIR
+        changes = certificate_templates.reload(cert_type=data.get('cert_type'))
+    except TemplateNotFound as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown certificate type: {e}"
+        }), 404
+    except Exception as e:
+        print(f"[TEMPLATES] Reload failed: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    
+    print(f"[TEMPLATES] Reloaded certificate templates: {changes}")
+    return jsonify({
+        "status": "success",
+        "templates": {
+            cert_type: {"previous_version": old, "version": new, "changed": old != new}
+            for cert_type, (old, new) in changes.items()
+        }
+    })
+
+@app.route('/api/certificates/assets', methods=['GET'])
+def get_certificate_assets():
+    """List the signature and logo files certificates are rendered with"""
+    return jsonify({
+        "status": "success",
+        **certificate_assets.describe()
+    })
+
+@app.route('/api/certificates/assets/reload', methods=['POST'])
+def reload_certificate_assets():
+    """Re-read certificate signatures and logo after they were replaced"""
+    try:
+        changes = certificate_assets.reload()
+    except Exception as e:
+        print(f"[ASSETS] Reload failed: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+    
+    print(f"[ASSETS] Reloaded certificate assets v{certificate_assets.version}: {changes}")
+    return jsonify({
+        "status": "success",
+        "version": certificate_assets.version,
+        "assets": {
+            name: {"previous_sha1": old, "sha1": new}
+            for name, (old, new) in changes.items()
+        }
+    })
+
 @app.route('/api/programs', methods=['GET'])
 def get_programs():
     """Get all conference programs/sessions"""
@@ -2667,6 +2698,7 @@ def get_check_ins(day):
         return jsonify({"error": "Failed to fetch check-ins", "message": str(e)}), 500
 
 @app.route('/api/stats', methods=['GET'])
+@response_cache.cached('stats')
 def get_stats():
     """Get conference statistics"""
     try:
@@ -2679,21 +2711,13 @@ def get_stats():
         certificates_failed = 0
         
         try:
-            # Try to query the database
-            participants = Participant.query.all()
-            total_participants = len(participants)
-            
-            for participant in participants:
-                if participant.cert_sent:
-                    certificates_sent += 1
-                else:
-                    certificates_pending += 1
-                    
-                if participant.cert_type == 'participation':
-                    participation_certificates += 1
-                elif participant.cert_type == 'service':
-                    service_certificates += 1
-                    
+            # Read from the dashboard counters
+            counts = dashboard_counters.read()['participants']
+            total_participants = counts['total']
+            certificates_sent = counts['sent']
+            certificates_pending = counts['pending']
+            participation_certificates = counts['by_cert_type'].get('participation', 0)
+            service_certificates = counts['by_cert_type'].get('service', 0)
         except Exception as db_error:
             print(f"Database query error in stats: {db_error}")
             # Return default stats if database query fails
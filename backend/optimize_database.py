@@ -8,6 +8,8 @@ import sys
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
+from participant_search import search_expression, search_index_statements
+
 # Database connection parameters
 DB_NAME = os.environ.get('DB_NAME', 'mdcan042_db')
 DB_USER = os.environ.get('DB_USER', 'postgres')
@@ -62,6 +64,7 @@ def optimize_database():
             
             # Composite indexes for common queries
             "CREATE INDEX IF NOT EXISTS idx_participant_reg_cert_status ON participants(registration_status, certificate_status)",
+            "CREATE INDEX IF NOT EXISTS idx_participants_created_id ON participants(created_at, id)",
             "CREATE INDEX IF NOT EXISTS idx_attendance_participant_program ON attendance(participant_id, program_id)"
         ]
         
@@ -69,6 +72,17 @@ def optimize_database():
             print(f"Creating index: {index_query}")
             cursor.execute(index_query)
         
+        # Trigram index for the check-in desk search; built concurrently so
+        # check-ins can continue while it builds.  The expression must match
+        # the one ParticipantSearch queries (nullable columns are coalesced).
+        search_columns = [('name', False), ('email', False), ('certificate_number', True)]
+        try:
+            for index_query in search_index_statements('participants', search_expression(search_columns)):
+                print(f"Creating index: {index_query}")
+                cursor.execute(index_query)
+        except psycopg2.Error as e:
+            print(f"Participant search index not created, search uses its in-memory index: {str(e)}")
+        
         # Analyze tables for query optimization
         tables = ["participants", "programs", "notifications", "attendance"]
         for table in tables:
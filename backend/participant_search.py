@@ -0,0 +1,389 @@
+"""
+Participant search for the check-in desk.
+
+The check-in search used ``ILIKE '%q%'`` over name, email and certificate
+number, which no btree index can serve, so every keystroke at every desk was
+a sequential scan of ``participants`` followed by one ``check_ins`` query per
+result.  ``ParticipantSearch`` ranks matches through an index and loads the
+matching participants together with their check-in days in one query.
+
+On PostgreSQL with the ``pg_trgm`` extension a GIN trigram index over the
+searchable text serves both substring (``LIKE``) and fuzzy (``<%``, word
+similarity) matching.  The index is created ahead of time by
+``optimize_database.py`` (``CREATE INDEX CONCURRENTLY``, so check-ins are not
+blocked while it builds); search only looks it up.  Elsewhere -- SQLite, or
+PostgreSQL where the index has not been created -- an in-memory trigram index
+of the same text is used.  It is updated from this process's committed writes; a marker file
+touched on every participant write tells the other worker processes to
+rebuild theirs before their next search.
+
+Matches rank as prefix of a word, then substring, then fuzzy by similarity.
+"""
+
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Search configuration (overridable per deployment)
+SEARCH_BACKEND = os.environ.get('PARTICIPANT_SEARCH_BACKEND', 'auto')  # auto, trigram, memory
+SEARCH_FUZZY_THRESHOLD = float(os.environ.get('PARTICIPANT_SEARCH_FUZZY_THRESHOLD', 0.3))
+SEARCH_RELOAD_MARKER = os.environ.get(
+    'PARTICIPANT_SEARCH_RELOAD_MARKER', os.path.join(tempfile.gettempdir(), 'mdcan-participant-search.reload'))
+
+_TOKEN_SPLIT = re.compile(r'[\s@._\-+,]+')
+
+
+def search_expression(columns):
+    """Lowercased searchable text of ``(name, nullable)`` columns, as indexed and queried"""
+    parts = [f"coalesce({name}, '')" if nullable else name for name, nullable in columns]
+    return 'lower(' + " || ' ' || ".join(parts) + ')'
+
+
+def search_index_name(table_name):
+    return f'idx_{table_name}_search_trgm'
+
+
+def search_index_statements(table_name, expression):
+    """DDL for the trigram index; run outside a transaction, as CONCURRENTLY requires"""
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {search_index_name(table_name)} '
+        f'ON {table_name} USING gin (({expression}) gin_trgm_ops)',
+    ]
+
+
+def normalize(text):
+    return ' '.join(str(text or '').lower().split())
+
+
+def tokens(text):
+    return [token for token in _TOKEN_SPLIT.split(text) if token]
+
+
+def trigrams(token):
+    """pg_trgm-style trigrams of one word, padded with two leading and one trailing space"""
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(left, right):
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared) if shared else 0.0
+
+
+def _at_word_start(text, query):
+    """Whether ``query`` occurs in ``text`` at the start of a word"""
+    position = text.find(query)
+    while position != -1:
+        if position == 0 or not text[position - 1].isalnum():
+            return True
+        position = text.find(query, position + 1)
+    return False
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class _Document:
+    __slots__ = ('text', 'fields', 'words')
+
+    def __init__(self, fields):
+        self.fields = [normalize(field) for field in fields if field]
+        self.text = ' '.join(self.fields)
+        words = set()
+        for field in self.fields:
+            words.add(field)
+            words.update(tokens(field))
+        self.words = {word: trigrams(word) for word in words}
+
+
+class MemoryTrigramIndex:
+    """Trigram postings of the searchable text of every participant"""
+
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+
+    def add(self, row_id, fields):
+        self.remove(row_id)
+        document = self.documents[row_id] = _Document(fields)
+        for grams in document.words.values():
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(row_id)
+
+    def remove(self, row_id):
+        document = self.documents.pop(row_id, None)
+        if document is None:
+            return
+        for grams in document.words.values():
+            for gram in grams:
+                ids = self.postings.get(gram)
+                if ids is not None:
+                    ids.discard(row_id)
+                    if not ids:
+                        del self.postings[gram]
+
+    def _matching(self, grams):
+        """Ids present in the postings of every trigram in ``grams``"""
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        if not postings:
+            return set()
+        ids = set(postings[0])
+        for other in postings[1:]:
+            ids.intersection_update(other)
+            if not ids:
+                break
+        return ids
+
+    def search(self, query, limit, threshold=SEARCH_FUZZY_THRESHOLD):
+        """Ids of the best ``limit`` matches for ``query``, best first"""
+        query = normalize(query)
+        words = tokens(query)
+        if not words:
+            return []
+        ranked = {}
+
+        # Substring matches: a field starting with the query, then the query
+        # at the start of a word, then anywhere
+        inner = {query[i:i + 3] for i in range(len(query) - 2)}
+        for row_id in self._matching(inner) if inner else ():
+            document = self.documents[row_id]
+            if query not in document.text:
+                continue
+            if any(field.startswith(query) for field in document.fields):
+                ranked[row_id] = (0, 0.0)
+            elif _at_word_start(document.text, query):
+                ranked[row_id] = (1, 0.0)
+            else:
+                ranked[row_id] = (2, 0.0)
+
+        # Every query word starting some word of the row, in any order
+        prefixes = set().union(*(trigrams(word) - {f'{word[-2:]} '} for word in words))
+        for row_id in self._matching(prefixes):
+            document = self.documents[row_id]
+            if row_id not in ranked and all(any(word.startswith(query_word) for word in document.words)
+                                            for query_word in words):
+                ranked[row_id] = (3, 0.0)
+
+        # Fuzzy matches by trigram similarity, only when still short of results
+        if len(ranked) < limit:
+            query_grams = [trigrams(word) for word in words]
+            grams = sorted(set().union(*query_grams), key=lambda gram: len(self.postings.get(gram, ())))
+            total = sum(len(word_grams) for word_grams in query_grams)
+            # A row sharing at least ``needed`` trigrams has one of the rarest
+            # ``len(grams) - needed + 1``, so only their postings are scanned;
+            # trigrams found in most rows (such as the `` ng`` of every email)
+            # are skipped as they would make every row a candidate
+            needed = max(1, math.ceil(total * threshold))
+            common = max(limit, len(self.documents) // 2)
+            scanned = [gram for gram in grams[:max(1, len(grams) - needed + 1)]
+                       if len(self.postings.get(gram, ())) <= common]
+            candidates = set().union(*(self.postings.get(gram, ()) for gram in scanned))
+            for row_id in candidates - ranked.keys():
+                shared = sum(1 for gram in grams if row_id in self.postings.get(gram, ()))
+                if shared < needed:
+                    continue
+                words_grams = self.documents[row_id].words.values()
+                score = sum(max(similarity(word_grams, other) for other in words_grams)
+                            for word_grams in query_grams) / len(query_grams)
+                if score >= threshold:
+                    ranked[row_id] = (4, -score)
+
+        best = sorted(ranked, key=lambda row_id: (*ranked[row_id], len(self.documents[row_id].text),
+                                                  self.documents[row_id].text))
+        return best[:limit]
+
+
+class ParticipantSearch:
+    """Ranked participant search returning each match's check-in days"""
+
+    def __init__(self, db, model, check_in_model, fields=('name', 'email', 'certificate_number'),
+                 backend=SEARCH_BACKEND, reload_marker=SEARCH_RELOAD_MARKER):
+        self.db = db
+        self.model = model
+        self.check_in_model = check_in_model
+        self.fields = tuple(fields)
+        self.backend = backend
+        self.reload_marker = reload_marker
+        self.table = model.__table__
+        # Text indexed by the trigram index; identical in the index and queries
+        self.expression = search_expression((name, self.table.c[name].nullable) for name in self.fields)
+        self._index = None
+        self._marker_mtime = None
+        self._lock = threading.Lock()
+        self._stats = {'searches': 0, 'rebuilds': 0, 'updates': 0}
+
+    def attach(self):
+        """Keep the in-memory index in step with this process's committed writes"""
+        sa.event.listen(self.db.session, 'after_flush', self._after_flush)
+        sa.event.listen(self.db.session, 'do_orm_execute', self._after_bulk_statement)
+        sa.event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa.event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    # Backend selection
+
+    def _choose_backend(self):
+        if self.backend != 'auto':
+            return self.backend
+        if self.db.session.get_bind().dialect.name != 'postgresql':
+            return 'memory'
+        # Only detect the index: building it here would block participant
+        # writes during the first search; optimize_database.py creates it
+        index_name = search_index_name(self.table.name)
+        try:
+            valid = self.db.session.execute(sa.text(
+                'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE c.relname = :name'), {'name': index_name}).scalar()
+        except sa.exc.SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.warning(f"Could not look up {index_name}, using the in-memory participant search index: {e}")
+            return 'memory'
+        if not valid:
+            logger.warning(f"{index_name} is missing or invalid (run optimize_database.py); "
+                           f"using the in-memory participant search index")
+            return 'memory'
+        return 'trigram'
+
+    # In-memory index maintenance
+
+    def _after_flush(self, session, flush_context):
+        changes = session.info.setdefault('participant_search_changes', {})
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, self.model):
+                state = sa.inspect(obj)
+                if obj in session.new or any(state.attrs[name].history.has_changes() for name in self.fields):
+                    changes[obj.id] = tuple(state.dict.get(name) for name in self.fields)
+        for obj in session.deleted:
+            if isinstance(obj, self.model):
+                changes[obj.id] = None
+
+    def _after_bulk_statement(self, orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        statement = orm_execute_state.statement
+        table = getattr(statement, 'table', None)
+        if table is None or table.name != self.table.name:
+            return
+        if orm_execute_state.is_update:
+            # Updates that set none of the searched columns (such as the
+            # attendance dates of a batch check-in) leave the index valid
+            assigned = {getattr(column, 'key', column) for column in getattr(statement, '_values', None) or ()}
+            if assigned and not assigned & set(self.fields):
+                return
+        orm_execute_state.session.info['participant_search_rebuild'] = True
+
+    def _after_commit(self, session):
+        changes = session.info.pop('participant_search_changes', None)
+        rebuild = session.info.pop('participant_search_rebuild', False)
+        if not changes and not rebuild:
+            return
+        with self._lock:
+            if self._index is not None:
+                if rebuild:
+                    self._index = None
+                else:
+                    for row_id, fields in changes.items():
+                        if fields is None:
+                            self._index.remove(row_id)
+                        else:
+                            self._index.add(row_id, fields)
+                    self._stats['updates'] += len(changes)
+            self._touch_marker()
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('participant_search_changes', None)
+        session.info.pop('participant_search_rebuild', None)
+
+    def _read_marker_mtime(self):
+        try:
+            return os.stat(self.reload_marker).st_mtime_ns
+        except OSError:
+            return None
+
+    def _touch_marker(self):
+        try:
+            with open(self.reload_marker, 'w') as f:
+                f.write('participants changed')
+            self._marker_mtime = self._read_marker_mtime()
+        except OSError as e:
+            logger.warning(f"Could not write participant search marker {self.reload_marker}: {e}")
+
+    def _memory_index(self):
+        """The in-memory index, rebuilt when missing or another process changed participants"""
+        mtime = self._read_marker_mtime()
+        with self._lock:
+            if self._index is not None and mtime == self._marker_mtime:
+                return self._index
+            index = MemoryTrigramIndex()
+            columns = [self.table.c.id] + [self.table.c[name] for name in self.fields]
+            for row in self.db.session.execute(sa.select(*columns)):
+                index.add(row[0], row[1:])
+            self._index = index
+            self._marker_mtime = mtime
+            self._stats['rebuilds'] += 1
+            logger.info(f"Participant search index built: {len(index.documents)} participants")
+            return index
+
+    # Searching
+
+    def _trigram_ranking(self, query, limit):
+        """Subquery of ``(id, position)`` for the best matches, served by the trigram index"""
+        expression = self.expression
+        return sa.text(f"""
+            SELECT id, row_number() OVER (ORDER BY
+                CASE WHEN {expression} LIKE :prefix OR {expression} LIKE :word_prefix THEN 0
+                     WHEN {expression} LIKE :contains THEN 1 ELSE 2 END,
+                word_similarity(:query, {expression}) DESC, id) AS position
+            FROM {self.table.name}
+            WHERE {expression} LIKE :contains OR :query <% {expression}
+            ORDER BY position
+            LIMIT :limit
+        """).bindparams(
+            query=query,
+            prefix=f'{_like_escape(query)}%',
+            word_prefix=f'% {_like_escape(query)}%',
+            contains=f'%{_like_escape(query)}%',
+            limit=limit
+        ).columns(id=sa.Integer, position=sa.Integer).subquery('ranked')
+
+    def search(self, query, limit=10):
+        """Best matches as ``[(participant, [check-in days])]``, best first"""
+        if self.backend == 'auto':
+            self.backend = self._choose_backend()
+        self._stats['searches'] += 1
+        query = normalize(query)
+        Participant, CheckIn = self.model, self.check_in_model
+
+        statement = sa.select(Participant, CheckIn.check_in_day).outerjoin(
+            CheckIn, CheckIn.participant_id == Participant.id)
+        if self.backend == 'trigram':
+            ranked = self._trigram_ranking(query, limit)
+            statement = statement.join(ranked, ranked.c.id == Participant.id).order_by(
+                ranked.c.position, CheckIn.check_in_day)
+            order = None
+        else:
+            order = self._memory_index().search(query, limit)
+            if not order:
+                return []
+            statement = statement.where(Participant.id.in_(order)).order_by(CheckIn.check_in_day)
+
+        results = {}
+        for participant, day in self.db.session.execute(statement):
+            days = results.setdefault(participant.id, (participant, []))[1]
+            if day is not None:
+                days.append(day)
+        if order is not None:
+            return [results[row_id] for row_id in order if row_id in results]
+        return list(results.values())
+
+    def stats(self):
+        indexed = len(self._index.documents) if self._index is not None else 0
+        return {'backend': self.backend, 'indexed': indexed, **self._stats}
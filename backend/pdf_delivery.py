@@ -0,0 +1,23 @@
+"""
+In-memory delivery of rendered certificate PDFs.
+
+Rendered PDFs used to be written to ``NamedTemporaryFile(delete=False)`` and
+read back for every email and download; files were not always removed, so
+/tmp grew with every bulk run.  PDFs now stay as bytes from the renderer (or
+certificate cache) to the MIME attachment or HTTP response, which is served
+from an ``io.BytesIO`` over the bytes already in memory.
+"""
+
+import io
+
+from flask import send_file
+
+
+def pdf_response(pdf_bytes, download_name=None, as_attachment=False):
+    """Flask response serving PDF bytes without leaving a file behind"""
+    return send_file(
+        io.BytesIO(pdf_bytes),
+        mimetype='application/pdf',
+        as_attachment=as_attachment,
+        download_name=download_name
+    )
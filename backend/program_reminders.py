@@ -0,0 +1,122 @@
+"""
+Per-program reminder jobs.
+
+Program reminders used to come from an interval job that every 15 minutes
+queried for programs starting within the next hour, so a reminder landed
+anywhere between 45 and 60 minutes early whatever the program's
+``reminder_minutes`` said, and the table was scanned 96 times a day for the
+handful of programs in a conference.
+
+``ProgramReminderPlanner`` schedules one ``date`` job per program, at
+``start_time - reminder_minutes``, when the program is created or edited:
+a changed time or reminder lead reschedules the job (same job id), and a
+program that is cancelled, completed, already reminded or already started
+loses its job.  ``sync`` re-plans every program from the table; it runs once
+when the scheduler starts, for programs saved before the planner existed.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.jobstores.base import JobLookupError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REMINDER_MINUTES = 30
+
+JOB_PREFIX = 'program_reminder_'
+
+
+def _as_utc(value):
+    """Program times are stored as naive UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class ProgramReminderPlanner:
+    """Keep one scheduled reminder job per upcoming program"""
+
+    def __init__(self, db, scheduler, program_model, send_func):
+        self.db = db
+        self.scheduler = scheduler
+        self.Program = program_model
+        # Module-level function taking the program id, so the job store can reference it
+        self.send_func = send_func
+        self._stats = {'planned': 0, 'cancelled': 0, 'synced': 0}
+
+    @staticmethod
+    def job_id(program_id):
+        return f'{JOB_PREFIX}{program_id}'
+
+    @staticmethod
+    def reminder_time(program):
+        """When the program's reminder is due, as an aware UTC datetime"""
+        minutes = program.reminder_minutes
+        if minutes is None or minutes < 0:
+            minutes = DEFAULT_REMINDER_MINUTES
+        return _as_utc(program.start_time) - timedelta(minutes=minutes)
+
+    def _due(self, program, now):
+        return (program.status == 'scheduled' and not program.notification_sent
+                and _as_utc(program.start_time) > now)
+
+    def plan(self, program):
+        """Schedule, move or cancel ``program``'s reminder to match its saved state.
+
+        Returns the reminder's run time, or None when no reminder is due.
+        """
+        now = datetime.now(timezone.utc)
+        if not self._due(program, now):
+            self.cancel(program.id)
+            return None
+        # A reminder lead longer than the time left is sent right away
+        run_date = max(self.reminder_time(program), now)
+        self.scheduler.add_job(
+            func=self.send_func,
+            trigger='date',
+            run_date=run_date,
+            args=[program.id],
+            id=self.job_id(program.id),
+            name=f'Reminder: {program.title}',
+            replace_existing=True,
+            # A late run (busy or restarted scheduler) still reminds until the program starts
+            misfire_grace_time=None
+        )
+        self._stats['planned'] += 1
+        return run_date
+
+    def cancel(self, program_id):
+        """Remove a program's pending reminder; returns whether there was one"""
+        try:
+            self.scheduler.remove_job(self.job_id(program_id))
+        except JobLookupError:
+            return False
+        self._stats['cancelled'] += 1
+        return True
+
+    def sync(self):
+        """Plan every upcoming program and drop the jobs of programs that no longer need one"""
+        now = datetime.now(timezone.utc)
+        Program = self.Program
+        programs = Program.query.filter(
+            Program.status == 'scheduled',
+            Program.notification_sent == False,
+            Program.start_time > now.replace(tzinfo=None)
+        ).all()
+        planned = set()
+        for program in programs:
+            if self.plan(program):
+                planned.add(self.job_id(program.id))
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(JOB_PREFIX) and job.id not in planned:
+                self.cancel(job.id[len(JOB_PREFIX):])
+        self._stats['synced'] += 1
+        logger.info(f"Program reminders planned for {len(planned)} programs")
+        return len(planned)
+
+    def pending(self):
+        return sum(1 for job in self.scheduler.get_jobs() if job.id.startswith(JOB_PREFIX))
+
+    def stats(self):
+        return {'pending': self.pending(), **self._stats}
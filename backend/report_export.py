@@ -0,0 +1,100 @@
+"""
+Streamed report exports.
+
+``export_report`` used to build a DataFrame of every participant, write it to
+a timestamped file in the temp directory and ``send_file`` it; the file was
+never removed, and the client saw nothing until the whole report was built.
+CSV exports are now generated row by row from a server-side cursor and sent
+as a chunked response, so the header reaches the client at once and memory
+stays at one fetch batch however many participants there are.  XLSX exports
+are built with openpyxl's write-only workbook into a ``SpooledTemporaryFile``,
+which only spills to an anonymous file above ``EXPORT_SPOOL_MAX_MB`` and is
+deleted when the response is closed.
+"""
+
+import csv
+import io
+import os
+import tempfile
+from datetime import date, datetime
+
+from flask import Response, send_file, stream_with_context
+
+# Export tuning (overridable per deployment)
+EXPORT_FETCH_ROWS = int(os.environ.get('EXPORT_FETCH_ROWS', 1000))
+EXPORT_CSV_FLUSH_BYTES = int(os.environ.get('EXPORT_CSV_FLUSH_BYTES', 64 * 1024))
+EXPORT_SPOOL_MAX_MB = float(os.environ.get('EXPORT_SPOOL_MAX_MB', 16))
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_value(value):
+    """Cell value as written to reports; timestamps use the report date format"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def statement_header(statement):
+    """Column labels of a select statement, used as the report header"""
+    return list(statement.selected_columns.keys())
+
+
+def stream_rows(engine, statement, fetch_rows=EXPORT_FETCH_ROWS):
+    """Yield the statement's rows as report values, ``fetch_rows`` at a time.
+
+    ``stream_results`` makes PostgreSQL use a server-side cursor, so only one
+    batch is held in memory; the connection is returned when the generator
+    finishes or is closed.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=fetch_rows).execute(statement)
+        for partition in result.partitions(fetch_rows):
+            for row in partition:
+                yield tuple(export_value(value) for value in row)
+
+
+def csv_response(filename, header, rows, flush_bytes=EXPORT_CSV_FLUSH_BYTES):
+    """Chunked CSV download of ``rows``, sent as they are produced"""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(header)
+        # The header goes out before the query runs
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= flush_bytes:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def xlsx_response(filename, sheets, max_size=None):
+    """XLSX download of ``sheets`` (``(title, header, rows)`` tuples) from a spooled buffer"""
+    from openpyxl import Workbook
+
+    max_size = int(EXPORT_SPOOL_MAX_MB * 1024 * 1024) if max_size is None else max_size
+    workbook = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        if header:
+            sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size, suffix='.xlsx')
+    workbook.save(spool)
+    spool.seek(0)
+    # werkzeug closes (and so deletes) the spool when the response is closed
+    return send_file(spool, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
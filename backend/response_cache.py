@@ -0,0 +1,151 @@
+"""
+Short-lived cache for hot read-only API responses.
+
+Programs, announcements, materials, notifications and the statistics
+endpoints are polled by every open frontend tab, and each poll used to query
+and serialize everything again.  ``ResponseCache.cached`` keeps a view's
+successful response per route and query string for a few seconds and tags it
+with an ETag, so repeated polls are answered from memory and clients that send
+``If-None-Match`` get an empty ``304 Not Modified``.
+
+Write handlers call ``invalidate(group)`` after committing.  Invalidation
+touches a marker file per group, so the other worker processes drop their
+copies on their next lookup instead of serving them until the TTL expires.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+# Response cache configuration (overridable per deployment)
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 15))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+RESPONSE_CACHE_MARKER_DIR = os.environ.get('RESPONSE_CACHE_MARKER_DIR', tempfile.gettempdir())
+
+
+class CachedResponse:
+    __slots__ = ('body', 'status', 'mimetype', 'etag', 'expires', 'generation')
+
+    def __init__(self, body, status, mimetype, etag, expires, generation):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+        self.expires = expires
+        self.generation = generation
+
+
+class ResponseCache:
+    """Per-process TTL cache of GET responses, invalidated by named group"""
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL_SECONDS, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 marker_dir=RESPONSE_CACHE_MARKER_DIR, enabled=RESPONSE_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.marker_dir = marker_dir
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+    def _marker(self, group):
+        return os.path.join(self.marker_dir, f'mdcan-response-cache.{group}')
+
+    def _generation(self, group):
+        """Last invalidation time of ``group`` by any process"""
+        try:
+            return os.stat(self._marker(group)).st_mtime_ns
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _key(group):
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        return (group, request.path, args)
+
+    def invalidate(self, *groups):
+        """Drop the cached responses of ``groups`` in every process"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in groups]:
+                del self._entries[key]
+        for group in groups:
+            self._stats['invalidations'] += 1
+            try:
+                with open(self._marker(group), 'w') as f:
+                    f.write(str(time.time()))
+            except OSError as e:
+                logger.warning(f"Could not write response cache marker for {group}: {e}")
+
+    def _lookup(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic() or entry.generation != generation:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _respond(self, response, etag):
+        response.set_etag(etag)
+        # Clients revalidate every poll, so invalidations are seen at once
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self._stats['not_modified'] += 1
+        return response
+
+    def cached(self, group, ttl=None):
+        """Decorate a GET view to serve its 200 responses from the cache for ``ttl`` seconds"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+                key = self._key(group)
+                # Read before running the view: an invalidation while it runs
+                # leaves the stored response already out of date
+                generation = self._generation(group)
+                entry = self._lookup(key, generation)
+                if entry is not None:
+                    self._stats['hits'] += 1
+                    response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return self._respond(response, entry.etag)
+
+                self._stats['misses'] += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                self._store(key, CachedResponse(body, response.status_code, response.mimetype, etag,
+                                                time.monotonic() + (self.ttl if ttl is None else ttl), generation))
+                response.headers['X-Cache'] = 'MISS'
+                return self._respond(response, etag)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {'enabled': self.enabled, 'entries': entries, 'ttl_seconds': self.ttl, **self._stats}
@@ -0,0 +1,364 @@
+"""
+Cluster-safe background scheduler.
+
+The APScheduler instance used to be started at import time in every process:
+each gunicorn worker (and the preloading master) ran its own copy of every
+interval job, so program reminders were checked and sent once per process,
+and jobs scheduled at runtime lived only in the memory of the worker that
+happened to create them.
+
+``ClusterScheduler`` keeps jobs in a shared SQLAlchemy job store, so they
+survive restarts and every worker sees the same schedule, and elects one
+leader that actually runs them:
+
+- on PostgreSQL the leader holds a session-level ``pg_try_advisory_lock`` on a
+  dedicated connection, which the server releases if the process dies,
+- elsewhere (SQLite deployments run on one host) it holds an exclusive lock on
+  ``SCHEDULER_LOCK_FILE``.
+
+Every serving process starts the scheduler paused, so it can add and inspect
+jobs; only the leader resumes it.  Followers retry the election every
+``SCHEDULER_LEADER_POLL_SECONDS`` and take over when the leader goes away.
+Each run is recorded in ``scheduler_runs`` for the jobs endpoint.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+from apscheduler.events import (EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED,
+                                EVENT_JOB_SUBMITTED)
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration (overridable per deployment)
+SCHEDULER_LEADER_BACKEND = os.environ.get('SCHEDULER_LEADER_BACKEND', 'auto')  # auto, advisory, file, always
+SCHEDULER_LEADER_POLL_SECONDS = int(os.environ.get('SCHEDULER_LEADER_POLL_SECONDS', 15))
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'mdcan-scheduler.lock'))
+SCHEDULER_LOCK_NAME = os.environ.get('SCHEDULER_LOCK_NAME', 'mdcan-scheduler')
+SCHEDULER_JOBS_TABLE = os.environ.get('SCHEDULER_JOBS_TABLE', 'apscheduler_jobs')
+SCHEDULER_RUN_HISTORY_DAYS = int(os.environ.get('SCHEDULER_RUN_HISTORY_DAYS', 7))
+
+RUN_STATUSES = ['running', 'succeeded', 'failed', 'missed', 'skipped', 'interrupted']
+
+
+def create_scheduler_run_model(db):
+    """Define the ``scheduler_runs`` history table on ``db``"""
+
+    class SchedulerRun(db.Model):
+        __tablename__ = 'scheduler_runs'
+
+        id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+        job_id = db.Column(db.String(191), nullable=False, index=True)
+        scheduled_at = db.Column(db.DateTime)
+        started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+        finished_at = db.Column(db.DateTime)
+        status = db.Column(db.String(20), nullable=False, default='running', index=True)
+        owner = db.Column(db.String(100))
+        error = db.Column(db.Text)
+
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'job_id': self.job_id,
+                'scheduled_at': self.scheduled_at.isoformat() if self.scheduled_at else None,
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'status': self.status,
+                'owner': self.owner,
+                'error': self.error
+            }
+
+    return SchedulerRun
+
+
+def _utc_naive(value):
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class AdvisoryLockElection:
+    """Leadership held as a PostgreSQL session advisory lock"""
+
+    name = 'advisory'
+
+    def __init__(self, engine, lock_name=SCHEDULER_LOCK_NAME):
+        self.engine = engine
+        # Advisory lock keys are signed 64-bit integers
+        self.key = int.from_bytes(hashlib.sha1(lock_name.encode('utf-8')).digest()[:8], 'big', signed=True)
+        self._connection = None
+
+    def acquire(self):
+        connection = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        try:
+            acquired = connection.execute(sa.text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key}).scalar()
+        except sa.exc.SQLAlchemyError:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def held(self):
+        """Whether the lock's connection is still alive (the server drops the lock with it)"""
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(sa.text('SELECT 1'))
+            return True
+        except sa.exc.SQLAlchemyError:
+            self.release()
+            return False
+
+    def release(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            connection.execute(sa.text('SELECT pg_advisory_unlock(:key)'), {'key': self.key})
+        except sa.exc.SQLAlchemyError:
+            pass
+        finally:
+            connection.close()
+
+
+class FileLockElection:
+    """Leadership held as an exclusive lock on a file shared by the host's processes"""
+
+    name = 'file'
+
+    def __init__(self, path=SCHEDULER_LOCK_FILE):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        handle = open(self.path, 'a+')
+        try:
+            try:
+                import fcntl
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:  # Windows development machines
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(f'{socket.gethostname()}:{os.getpid()}\n')
+        handle.flush()
+        self._file = handle
+        return True
+
+    def held(self):
+        return self._file is not None
+
+    def release(self):
+        handle, self._file = self._file, None
+        if handle is not None:
+            # Closing the file releases the lock
+            handle.close()
+
+
+class AlwaysLeader:
+    """Every process leads; for single-process development servers"""
+
+    name = 'always'
+
+    def __init__(self):
+        self._held = False
+
+    def acquire(self):
+        self._held = True
+        return True
+
+    def held(self):
+        return self._held
+
+    def release(self):
+        self._held = False
+
+
+class ClusterScheduler:
+    """Runs ``scheduler``'s persistent jobs in exactly one elected process"""
+
+    def __init__(self, app, db, scheduler, run_model, backend=SCHEDULER_LEADER_BACKEND,
+                 poll_seconds=SCHEDULER_LEADER_POLL_SECONDS, jobs_table=SCHEDULER_JOBS_TABLE):
+        self.app = app
+        self.db = db
+        self.scheduler = scheduler
+        self.Run = run_model
+        self.backend = backend
+        self.poll_seconds = poll_seconds
+        self.jobs_table = jobs_table
+        self.election = None
+        self.is_leader = False
+        self._engine = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'elections_won': 0, 'leadership_lost': 0, 'runs_recorded': 0}
+        self.scheduler.configure(job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300})
+
+        # Started in the serving process, not in a preloading master: the
+        # scheduler thread and the leader lock would not survive the fork
+        app.before_request(self.ensure_started)
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _choose_election(self):
+        backend = self.backend
+        if backend == 'auto':
+            backend = 'advisory' if self._engine.dialect.name == 'postgresql' else 'file'
+        if backend == 'advisory':
+            return AdvisoryLockElection(self._engine)
+        if backend == 'always':
+            return AlwaysLeader()
+        return FileLockElection()
+
+    def ensure_started(self):
+        """Start the paused scheduler and the election thread once per process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            with self.app.app_context():
+                self._engine = self.db.engine
+            self.scheduler.configure(jobstores={
+                'default': SQLAlchemyJobStore(engine=self._engine, tablename=self.jobs_table)
+            })
+            self.scheduler.add_listener(self._record_run, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+                                        | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+            self.scheduler.start(paused=True)
+            self.election = self._choose_election()
+            self._elect()
+            threading.Thread(target=self._run, name='scheduler-election', daemon=True).start()
+            logger.info(f"Scheduler started in {self.owner} ({self.election.name} election, "
+                        f"{'leader' if self.is_leader else 'follower'})")
+
+    def _elect(self):
+        try:
+            if self.is_leader:
+                if not self.election.held():
+                    self.is_leader = False
+                    self._stats['leadership_lost'] += 1
+                    self.scheduler.pause()
+                    logger.warning(f"Scheduler leadership lost by {self.owner}")
+                    return
+                # Jobs added by other processes are only in the shared store
+                self.scheduler.wakeup()
+            elif self.election.acquire():
+                self.is_leader = True
+                self._stats['elections_won'] += 1
+                self._close_orphaned_runs()
+                self.scheduler.resume()
+                logger.info(f"Scheduler leadership taken by {self.owner}")
+        except Exception as e:
+            logger.warning(f"Scheduler election failed: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            self._elect()
+            if self.is_leader:
+                self._prune_history()
+
+    def _close_orphaned_runs(self):
+        """Runs left 'running' by a previous leader ended with its process"""
+        runs = self.Run.__table__
+        try:
+            with self._engine.begin() as connection:
+                connection.execute(sa.update(runs).where(runs.c.status == 'running', runs.c.owner != self.owner)
+                                   .values(status='interrupted', finished_at=datetime.utcnow()))
+        except sa.exc.SQLAlchemyError as e:
+            logger.debug(f"Orphaned scheduler runs not closed: {e}")
+
+    def _prune_history(self):
+        cutoff = datetime.utcnow() - timedelta(days=SCHEDULER_RUN_HISTORY_DAYS)
+        try:
+            with self._engine.begin() as connection:
+                connection.execute(sa.delete(self.Run.__table__).where(self.Run.__table__.c.started_at < cutoff))
+        except sa.exc.SQLAlchemyError as e:
+            logger.debug(f"Scheduler run history not pruned: {e}")
+
+    def _record_run(self, event):
+        """Keep a ``scheduler_runs`` row per run, for the jobs endpoint"""
+        runs = self.Run.__table__
+        now = datetime.utcnow()
+        try:
+            with self._engine.begin() as connection:
+                if event.code == EVENT_JOB_SUBMITTED:
+                    for run_time in event.scheduled_run_times:
+                        connection.execute(sa.insert(runs).values(
+                            job_id=event.job_id, scheduled_at=_utc_naive(run_time), started_at=now,
+                            status='running', owner=self.owner))
+                    self._stats['runs_recorded'] += 1
+                    return
+                if event.code == EVENT_JOB_MAX_INSTANCES:
+                    # The previous run was still going, so these were skipped
+                    for run_time in event.scheduled_run_times:
+                        connection.execute(sa.insert(runs).values(
+                            job_id=event.job_id, scheduled_at=_utc_naive(run_time), started_at=now,
+                            finished_at=now, status='skipped', owner=self.owner))
+                    return
+                if event.code == EVENT_JOB_MISSED:
+                    connection.execute(sa.insert(runs).values(
+                        job_id=event.job_id, scheduled_at=_utc_naive(event.scheduled_run_time), started_at=now,
+                        finished_at=now, status='missed', owner=self.owner))
+                    return
+                error = None
+                if event.code == EVENT_JOB_ERROR:
+                    error = f'{type(event.exception).__name__}: {event.exception}'[:2000]
+                connection.execute(sa.update(runs).where(
+                    runs.c.job_id == event.job_id,
+                    runs.c.scheduled_at == _utc_naive(event.scheduled_run_time),
+                    runs.c.status == 'running'
+                ).values(finished_at=now, status='failed' if error else 'succeeded', error=error))
+        except sa.exc.SQLAlchemyError as e:
+            # The history must never break the job itself
+            logger.debug(f"Scheduler run of {event.job_id} not recorded: {e}")
+
+    def upcoming(self):
+        """Scheduled jobs from the shared store, soonest first"""
+        jobs = []
+        for job in self.scheduler.get_jobs():
+            jobs.append({
+                'id': job.id,
+                'name': job.name,
+                'trigger': str(job.trigger),
+                'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None,
+                'paused': job.next_run_time is None
+            })
+        return sorted(jobs, key=lambda job: (job['next_run_time'] is None, job['next_run_time'] or ''))
+
+    def running(self):
+        return [run.to_dict() for run in self.Run.query.filter_by(status='running').order_by(self.Run.started_at)]
+
+    def recent(self, limit=20):
+        return [run.to_dict() for run in self.Run.query.order_by(self.Run.started_at.desc()).limit(limit)]
+
+    def stats(self):
+        return {
+            'owner': self.owner,
+            'is_leader': self.is_leader,
+            'election': self.election.name if self.election else None,
+            'started': self._pid == os.getpid(),
+            'poll_seconds': self.poll_seconds,
+            **self._stats
+        }
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import ParticipantForm from './components/ParticipantForm';
 import ParticipantList from './components/ParticipantList';
@@ -8,6 +8,7 @@ import ConferenceRegistration from './components/ConferenceRegistration';
 import ProgramSchedule from './components/ProgramSchedule';
 import ParticipantDashboard from './components/ParticipantDashboard';
 import AdminDashboard from './components/AdminDashboard';
+import { describeCertificateJob, isJobFinished, watchCertificateJob } from './certificateJobs';
 import NotificationCenter from './components/NotificationCenter';
 import AttendanceManagement from './components/AttendanceManagement';
 import MaterialsUpload from './components/MaterialsUpload';
@@ -333,13 +334,29 @@ function App() {
     }
   };
 
+  const stopWatchingCertificateJob = useRef(null);
+
   const sendAllCertificates = async () => {
     try {
       setLoading(true);
-      await axios.post('/api/send-all-certificates');
-      setMessage('All certificates sent successfully!');
-      loadParticipants(); // Refresh list to update statuses
-      setTimeout(() => setMessage(''), 3000);
+      const response = await axios.post('/api/send-all-certificates');
+      setMessage(response.data.message);
+      if (!response.data.status_url) {
+        setTimeout(() => setMessage(''), 3000);
+        return;
+      }
+      // Certificates are sent by a background job; follow its progress
+      if (stopWatchingCertificateJob.current) stopWatchingCertificateJob.current();
+      stopWatchingCertificateJob.current = watchCertificateJob(response.data.status_url, (job) => {
+        setMessage(describeCertificateJob(job));
+        if (isJobFinished(job)) {
+          loadParticipants(); // Refresh list to update statuses
+          setTimeout(() => setMessage(''), 3000);
+        }
+      }, (error) => {
+        console.error('Error checking certificate job:', error);
+        setMessage('Certificates are being sent, but their progress could not be loaded.');
+      });
     } catch (error) {
       console.error('Error sending certificates:', error);
       setMessage('Error sending certificates. Please try again.');
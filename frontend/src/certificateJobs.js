@@ -0,0 +1,47 @@
+/**
+ * Bulk certificate sends run as background jobs on the server.
+ * The send endpoints answer 202 with a job id and status URL; these helpers
+ * describe a job and poll its progress until it finishes.
+ */
+import axios from 'axios';
+
+const POLL_INTERVAL_MS = 3000;
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
+export const isJobFinished = (job) => FINISHED_STATUSES.includes(job.status);
+
+export const describeCertificateJob = (job) => {
+  const counts = `${job.processed}/${job.total} processed, ${job.succeeded} sent, ${job.failed} failed`;
+  if (isJobFinished(job)) {
+    return `Certificate job ${job.id} ${job.status}: ${counts}`;
+  }
+  return `Certificate job ${job.id} ${job.status} (${job.progress_percent}%): ${counts}`;
+};
+
+/**
+ * Poll a certificate job until it finishes.
+ * onUpdate receives each job snapshot; returns a function that stops polling.
+ */
+export const watchCertificateJob = (statusUrl, onUpdate, onError) => {
+  let stopped = false;
+  let timer = null;
+
+  const poll = async () => {
+    try {
+      const response = await axios.get(statusUrl);
+      if (stopped) return;
+      onUpdate(response.data);
+      if (!isJobFinished(response.data)) {
+        timer = setTimeout(poll, POLL_INTERVAL_MS);
+      }
+    } catch (error) {
+      if (!stopped && onError) onError(error);
+    }
+  };
+
+  timer = setTimeout(poll, POLL_INTERVAL_MS);
+  return () => {
+    stopped = true;
+    clearTimeout(timer);
+  };
+};
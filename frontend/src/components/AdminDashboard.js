@@ -1,10 +1,15 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import axios from 'axios';
+import { describeCertificateJob, isJobFinished, watchCertificateJob } from '../certificateJobs';
 
 const AdminDashboard = ({ stats, onRefresh }) => {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState('');
   const [actionLoading, setActionLoading] = useState({});
+  const stopWatchingJob = useRef(null);
+
+  // Stop polling the certificate job when the dashboard unmounts
+  useEffect(() => () => stopWatchingJob.current && stopWatchingJob.current(), []);
 
   const handleBulkCertificateGeneration = async () => {
     try {
@@ -25,8 +30,21 @@ const AdminDashboard = ({ stats, onRefresh }) => {
       setActionLoading({ sendAll: true });
       const response = await axios.post('/api/send-all-certificates');
       setMessage(`✅ ${response.data.message}`);
-      if (onRefresh) onRefresh();
-      setTimeout(() => setMessage(''), 5000);
+      if (!response.data.status_url) {
+        setTimeout(() => setMessage(''), 5000);
+        return;
+      }
+      // Certificates are sent by a background job; follow its progress
+      if (stopWatchingJob.current) stopWatchingJob.current();
+      stopWatchingJob.current = watchCertificateJob(response.data.status_url, (job) => {
+        setMessage(`${job.status === 'completed' ? '✅' : isJobFinished(job) ? '❌' : '⏳'} ${describeCertificateJob(job)}`);
+        if (isJobFinished(job)) {
+          if (onRefresh) onRefresh();
+          setTimeout(() => setMessage(''), 5000);
+        }
+      }, (error) => {
+        setMessage(`❌ ${error.response?.data?.error || 'Failed to check certificate job progress'}`);
+      });
     } catch (error) {
       setMessage(`❌ ${error.response?.data?.error || 'Failed to send certificates'}`);
     } finally {
@@ -1,11 +1,17 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import axios from 'axios';
+import { describeCertificateJob, isJobFinished, watchCertificateJob } from '../certificateJobs';
 
 const BulkUpload = ({ onParticipantsUpdated }) => {
   const [file, setFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const [uploadResult, setUploadResult] = useState(null);
   const [sendingCertificates, setSendingCertificates] = useState(false);
+  const [certificateJob, setCertificateJob] = useState(null);
+  const stopWatchingJob = useRef(null);
+
+  // Stop polling the certificate job when the component unmounts
+  useEffect(() => () => stopWatchingJob.current && stopWatchingJob.current(), []);
 
   const handleFileChange = (event) => {
     const selectedFile = event.target.files[0];
@@ -65,19 +71,28 @@ const BulkUpload = ({ onParticipantsUpdated }) => {
     try {
       const response = await axios.post('/api/bulk-send-certificates');
       
-      alert(`${response.data.message}\nSent: ${response.data.sent_count}\nFailed: ${response.data.failed_count}`);
-      
-      // Notify parent component to refresh participant list
-      if (onParticipantsUpdated) {
-        onParticipantsUpdated();
-      }
+      // Certificates are sent by a background job; follow its progress
+      setCertificateJob(response.data.job);
+      if (stopWatchingJob.current) stopWatchingJob.current();
+      stopWatchingJob.current = watchCertificateJob(response.data.status_url, (job) => {
+        setCertificateJob(job);
+        if (isJobFinished(job)) {
+          setSendingCertificates(false);
+          // Notify parent component to refresh participant list
+          if (onParticipantsUpdated) {
+            onParticipantsUpdated();
+          }
+        }
+      }, (error) => {
+        console.error('Certificate job status failed:', error);
+        setSendingCertificates(false);
+      });
       
     } catch (error) {
       console.error('Bulk send failed:', error);
-      alert(error.response?.data?.error || 'Bulk send failed');
+      alert(error.response?.data?.error || error.response?.data?.message || 'Bulk send failed');
+      setSendingCertificates(false);
     }
-
-    setSendingCertificates(false);
   };
 
   return (
@@ -165,6 +180,9 @@ const BulkUpload = ({ onParticipantsUpdated }) => {
         >
           {sendingCertificates ? '⏳ Sending Certificates...' : '📧 Send All Certificates'}
         </button>
+        {certificateJob && (
+          <p className="certificate-job-status">{describeCertificateJob(certificateJob)}</p>
+        )}
       </div>
     </div>
   );
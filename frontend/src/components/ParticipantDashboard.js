@@ -123,7 +123,7 @@ const ParticipantDashboard = ({ participantEmail, onDataUpdate }) => {
     );
   }
 
-  const { participant, registered_sessions, upcoming_programs, recent_notifications, statistics } = dashboardData;
+  const { participant, registered_sessions, upcoming_programs, recent_notifications, statistics, check_in_token, check_in_qr_url } = dashboardData;
 
   return (
     <div className="participant-dashboard">
@@ -146,6 +146,14 @@ const ParticipantDashboard = ({ participantEmail, onDataUpdate }) => {
             <h4>Registration #</h4>
             <span className="registration-number">{participant.certificate_number}</span>
           </div>
+
+          {check_in_token && (
+            <div className="info-card">
+              <h4>Check-in Code</h4>
+              {check_in_qr_url && <img src={check_in_qr_url} alt="Check-in QR code" width="160" height="160" />}
+              <span className="registration-number">{check_in_token}</span>
+            </div>
+          )}
         </div>
       </div>
 
@@ -11,7 +11,8 @@ import logging
 bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
 
 # Resource configuration optimized for apps-s-2vcpu-4gb
-workers = 2
+# Exported so the mail transport splits its SMTP rate limit across workers
+workers = int(os.environ.setdefault('WEB_CONCURRENCY', '2'))
 worker_class = "sync"
 timeout = 120  # Increased for startup
 keepalive = 2